@@ -0,0 +1,62 @@
+"""
+Measures how long a fresh interpreter takes to import the client, from
+start-up to exit, and which heavy modules each step loads:
+
+    python -m benchmarks.imports --runs 20
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+HEAVY = ('requests', 'urllib3', 'multiprocessing', 'concurrent.futures', 'orjson',
+         'aiohttp', 'mmap')
+
+SCENARIOS = [
+    ('python', 'pass'),
+    ('import', 'import wilddog'),
+    ('client_class', 'from wilddog import WilddogApplication'),
+    ('client', "from wilddog import WilddogApplication\n"
+               "WilddogApplication('https://bench.wilddogio.com')"),
+]
+
+REPORT = "\nimport sys\nprint(' '.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+
+
+def run(code):
+    """
+    Runs ``code`` in a new interpreter and returns the seconds it took and
+    the heavy modules it had loaded.
+    """
+    start = time.time()
+    output = subprocess.check_output([sys.executable, '-c', code + REPORT])
+    return time.time() - start, output.decode('utf-8').split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='interpreters per scenario')
+    parser.add_argument('--output', help='file to write the results to')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, code in SCENARIOS:
+        timings = []
+        for _ in range(args.runs):
+            elapsed, modules = run(code)
+            timings.append(elapsed)
+        timings.sort()
+        results[name] = {'min_ms': timings[0] * 1000,
+                         'median_ms': timings[len(timings) // 2] * 1000,
+                         'modules': modules}
+        print('%-14s min %8.1f ms  median %8.1f ms  %s' % (
+            name, results[name]['min_ms'], results[name]['median_ms'], ' '.join(modules) or '-'))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
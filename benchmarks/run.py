@@ -0,0 +1,228 @@
+"""
+Benchmarks the client against a local ``MockWilddogServer`` running in a
+separate process.
+
+Measures requests per second and p50/p99 latency of the synchronous and
+``*_async`` methods, token generation and JSON encoding, and writes the
+results as JSON so that runs can be compared:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from wilddog.executors import ThreadPoolBackend
+from wilddog.jsonutil import JSONSerializer, OrjsonSerializer, orjson
+from wilddog.token_cache import TokenCache
+from wilddog.wilddog import WilddogApplication, WilddogAuthentication
+from wilddog.wilddog_token_generator import create_token
+
+from .server import make_certificate
+
+SECRET = 'benchmark-secret'
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(latencies, elapsed):
+    return {'ops': len(latencies),
+            'ops_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000}
+
+
+def measure(fn, n):
+    """
+    Calls ``fn(i)`` ``n`` times in a row.
+    """
+    latencies = []
+    start = time.time()
+    for i in range(n):
+        t = time.time()
+        fn(i)
+        latencies.append(time.time() - t)
+    return summarize(latencies, time.time() - start)
+
+
+def measure_async(submit, n):
+    """
+    Calls ``submit(i)``, which returns a future, ``n`` times without waiting
+    and measures each future from submission to completion.
+    """
+    latencies = []
+    lock = threading.Lock()
+    futures = []
+    start = time.time()
+    for i in range(n):
+        submitted = time.time()
+
+        def done(future, submitted=submitted):
+            with lock:
+                latencies.append(time.time() - submitted)
+
+        future = submit(i)
+        future.add_done_callback(done)
+        futures.append(future)
+    for future in futures:
+        future.result()
+    return summarize(latencies, time.time() - start)
+
+
+def make_payload(size):
+    """
+    Returns a dict of records whose JSON encoding takes about ``size`` bytes.
+    """
+    record = {'name': 'benchmark', 'active': True, 'score': 12.5, 'tags': ['a', 'b']}
+    count = max(1, size // (len(json.dumps(record)) + 12))
+    return dict(('r%06d' % i, dict(record, id=i)) for i in range(count))
+
+
+def bench_requests(app, n, payload):
+    app.put('/bench', 'payload', payload)
+    return {
+        'get': measure(lambda i: app.get('/bench', 'payload'), n),
+        'put': measure(lambda i: app.put('/bench/put', str(i % 100), payload), n),
+        'post': measure(lambda i: app.post('/bench/post', payload), n),
+        'patch': measure(lambda i: app.patch('/bench/patch', {str(i % 100): payload}), n),
+        'delete': measure(lambda i: app.delete('/bench/put', str(i % 100)), n),
+        'get_async': measure_async(lambda i: app.get_async('/bench', 'payload'), n),
+        'put_async': measure_async(lambda i: app.put_async('/bench/put', str(i % 100), payload), n),
+        'post_async': measure_async(lambda i: app.post_async('/bench/post', payload), n),
+    }
+
+
+def bench_tokens(n):
+    data = {'uid': '1'}
+    cache = TokenCache()
+    return {
+        'create_token': measure(lambda i: create_token(SECRET, data), n),
+        'token_cache': measure(lambda i: cache.get(SECRET, data), n),
+    }
+
+
+def bench_json(n, payload):
+    serializers = [('json', JSONSerializer())]
+    if orjson is not None:
+        serializers.append(('orjson', OrjsonSerializer()))
+    results = {}
+    for name, serializer in serializers:
+        encoded = serializer.dumps(payload)
+        results['%s_dumps' % name] = measure(lambda i: serializer.dumps(payload), n)
+        results['%s_loads' % name] = measure(lambda i: serializer.loads(encoded), n)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the change of every measurement against ``baseline`` and returns
+    the names of those whose throughput dropped by more than ``threshold``.
+    """
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        old, new = baseline[name]['ops_per_sec'], results[name]['ops_per_sec']
+        change = (new - old) / old if old else 0.0
+        print('%-16s %12.1f -> %12.1f ops/s  %+6.1f%%   p99 %8.2f -> %8.2f ms' % (
+            name, old, new, change * 100, baseline[name]['p99_ms'], results[name]['p99_ms']))
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def start_server(certfile, keyfile, latency):
+    """
+    Runs ``benchmarks.server`` in its own process, so that it does not share
+    the GIL with the client being measured, and returns the process and its
+    URL.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.server', '--port', '0',
+                                '--certfile', certfile, '--keyfile', keyfile,
+                                '--latency', str(latency), '--require-auth'],
+                               cwd=root, stdout=subprocess.PIPE)
+    line = process.stdout.readline().decode('utf-8')
+    if not line.startswith('Serving on '):
+        process.kill()
+        process.wait()
+        raise RuntimeError('the benchmark server did not start.')
+    return process, line[len('Serving on '):].strip()
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait()
+    process.stdout.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500, help='requests per method')
+    parser.add_argument('--iterations', type=int, default=10000,
+                        help='iterations of the token and JSON benchmarks')
+    parser.add_argument('--payload-size', type=int, default=1024, help='bytes per write')
+    parser.add_argument('--latency', type=float, default=0, help='server latency in seconds')
+    parser.add_argument('--workers', type=int, default=10, help='threads for *_async calls')
+    parser.add_argument('--output', help='file to write the results to')
+    parser.add_argument('--compare', help='results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='throughput drop reported as a regression')
+    args = parser.parse_args(argv)
+
+    payload = make_payload(args.payload_size)
+    directory = tempfile.mkdtemp()
+    try:
+        certfile, keyfile = make_certificate(directory)
+        # The pooled sessions verify against the stand-in's certificate.
+        os.environ['REQUESTS_CA_BUNDLE'] = certfile
+        server, url = start_server(certfile, keyfile, args.latency)
+        auth = WilddogAuthentication(SECRET, 'bench@wilddog.com', extra={'uid': '1'})
+        app = WilddogApplication(url, auth, executor=ThreadPoolBackend(args.workers))
+        try:
+            results = bench_requests(app, args.requests, payload)
+        finally:
+            app.close()
+            stop_server(server)
+    finally:
+        shutil.rmtree(directory)
+    results.update(bench_tokens(args.iterations))
+    results.update(bench_json(args.iterations, payload))
+
+    report = {'meta': {'python': platform.python_version(),
+                       'implementation': platform.python_implementation(),
+                       'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                       'options': vars(args)},
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    else:
+        for name in sorted(results):
+            result = results[name]
+            print('%-16s %12.1f ops/s  p50 %8.3f ms  p99 %8.3f ms' % (
+                name, result['ops_per_sec'], result['p50_ms'], result['p99_ms']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
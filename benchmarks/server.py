@@ -0,0 +1,221 @@
+"""
+Local stand-in for the Wilddog REST API, for benchmarks.
+
+Serves an in-memory tree over HTTPS with the REST semantics the client
+relies on: ``.json`` paths, the ``auth`` query parameter, GET (with
+``shallow``), PUT, PATCH (multi-location), POST (generated child keys),
+DELETE and ``print=silent``. Every response can be delayed by a fixed
+latency to mimic a remote backend.
+
+    python -m benchmarks.server --port 8443 --certfile cert.pem --keyfile key.pem
+"""
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import sys
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qs
+except ImportError:
+    # py2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qs
+
+from wilddog.stream import LocalTree
+
+__all__ = ['MockWilddogServer', 'make_certificate']
+
+
+def make_certificate(directory):
+    """
+    Writes a self-signed certificate for localhost/127.0.0.1 into
+    ``directory`` with the ``openssl`` command and returns the paths of the
+    certificate and of its key.
+    """
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                           '-days', '1', '-subj', '/CN=localhost',
+                           '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1',
+                           '-keyout', keyfile, '-out', certfile],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return certfile, keyfile
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in one segment instead of waiting on a
+    # delayed ACK of the headers.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _request(self):
+        """
+        Returns the node path and query of the request, or None after
+        answering it with an error.
+        """
+        url = urlsplit(self.path)
+        query = dict((key, values[-1]) for key, values in parse_qs(url.query).items())
+        if not url.path.endswith('.json'):
+            self._respond(404, {'error': 'Paths must end with .json'})
+            return None
+        if self.server.require_auth and 'auth' not in query:
+            self._respond(401, {'error': 'Permission denied'})
+            return None
+        return url.path[:-len('.json')] or '/', query
+
+    def _body(self):
+        data = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        encoding = self.headers.get('Content-Encoding')
+        if encoding == 'gzip':
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            data = zlib.decompress(data)
+        return json.loads(data.decode('utf-8')) if data else None
+
+    def _write(self, query, status, value):
+        if query.get('print') == 'silent':
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self._respond(status, value)
+
+    def do_GET(self):
+        request = self._request()
+        if request is None:
+            return
+        path, query = request
+        with self.server.lock:
+            value = self.server.tree.get(path)
+            if query.get('shallow') == 'true' and isinstance(value, dict):
+                value = dict((key, True) for key in value)
+            body = json.loads(json.dumps(value))
+        self._respond(200, body)
+
+    def do_PUT(self):
+        request = self._request()
+        if request is None:
+            return
+        path, query = request
+        value = self._body()
+        with self.server.lock:
+            self.server.tree.put(path, value)
+        self._write(query, 200, value)
+
+    def do_PATCH(self):
+        request = self._request()
+        if request is None:
+            return
+        path, query = request
+        value = self._body()
+        with self.server.lock:
+            self.server.tree.patch(path, value)
+        self._write(query, 200, value)
+
+    def do_POST(self):
+        request = self._request()
+        if request is None:
+            return
+        path, query = request
+        value = self._body()
+        with self.server.lock:
+            key = self.server.next_key()
+            self.server.tree.put('%s/%s' % (path, key), value)
+        self._write(query, 200, {'name': key})
+
+    def do_DELETE(self):
+        request = self._request()
+        if request is None:
+            return
+        path, query = request
+        with self.server.lock:
+            self.server.tree.put(path, None)
+        self._write(query, 200, None)
+
+
+class MockWilddogServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTPS server holding the data in a ``LocalTree``. ``latency`` is
+    added to every response; with ``require_auth`` requests without an
+    ``auth`` parameter get a 401. Use ``start`` to serve on a daemon thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, certfile=None, keyfile=None, latency=0, require_auth=False):
+        HTTPServer.__init__(self, ('127.0.0.1', port), _Handler)
+        if certfile is not None:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.scheme = 'https' if certfile is not None else 'http'
+        self.latency = latency
+        self.require_auth = require_auth
+        self.tree = LocalTree()
+        self.lock = threading.Lock()
+        self._keys = 0
+
+    @property
+    def url(self):
+        return '%s://localhost:%d' % (self.scheme, self.server_address[1])
+
+    def next_key(self):
+        # Push keys sort in creation order, like the real ones.
+        self._keys += 1
+        return '-K%016d' % self._keys
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8443, help='0 picks a free port')
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every response')
+    parser.add_argument('--require-auth', action='store_true')
+    args = parser.parse_args()
+    server = MockWilddogServer(args.port, args.certfile, args.keyfile, args.latency,
+                               args.require_auth)
+    print('Serving on %s' % server.url)
+    # benchmarks.run reads the URL from the pipe.
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,7 @@ setup(name='wilddog-python',
       license='MIT',
       packages=['wilddog'],
       test_suite='tests.all_tests',
-      install_requires=['requests>=1.1.0'],
+      install_requires=['requests>=1.1.0', 'futures; python_version < "3.2"'],
+      extras_require={'asyncio': ['aiohttp'], 'fast': ['orjson']},
       zip_safe=False,
       )
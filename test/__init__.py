@@ -2,10 +2,47 @@ import unittest
 
 from .jsonutil_test import JSONTestCase
 from .wilddog_test import WilddogTestCase
+from .pool_test import ConnectionPoolTestCase
+from .aio_test import AsyncWilddogTestCase
+from .bulk_test import WriteBatchTestCase, ReadManyTestCase
+from .stream_test import SSEParserTestCase, SubscriptionTestCase
+from .cache_test import ResponseCacheTestCase
+from .paging_test import PagingTestCase
+from .jsonstream_test import JSONStreamTestCase
+from .compression_test import CompressionTestCase
+from .retry_test import RetryTestCase
+from .deadline_test import DeadlineTestCase
+from .ratelimit_test import RateLimiterTestCase
+from .writequeue_test import WriteQueueTestCase
+from .wal_test import WriteAheadLogTestCase
+from .mirror_test import MirrorTestCase
+from .metrics_test import MetricsTestCase
+from .token_generator_test import TokenSignerTestCase, TokenVerifierTestCase
+from .lazy_test import LazyInstanceTestCase
 
 
 def all_tests():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(JSONTestCase))
     suite.addTest(unittest.makeSuite(WilddogTestCase))
+    suite.addTest(unittest.makeSuite(ConnectionPoolTestCase))
+    suite.addTest(unittest.makeSuite(AsyncWilddogTestCase))
+    suite.addTest(unittest.makeSuite(WriteBatchTestCase))
+    suite.addTest(unittest.makeSuite(ReadManyTestCase))
+    suite.addTest(unittest.makeSuite(SSEParserTestCase))
+    suite.addTest(unittest.makeSuite(SubscriptionTestCase))
+    suite.addTest(unittest.makeSuite(ResponseCacheTestCase))
+    suite.addTest(unittest.makeSuite(PagingTestCase))
+    suite.addTest(unittest.makeSuite(JSONStreamTestCase))
+    suite.addTest(unittest.makeSuite(CompressionTestCase))
+    suite.addTest(unittest.makeSuite(RetryTestCase))
+    suite.addTest(unittest.makeSuite(DeadlineTestCase))
+    suite.addTest(unittest.makeSuite(RateLimiterTestCase))
+    suite.addTest(unittest.makeSuite(WriteQueueTestCase))
+    suite.addTest(unittest.makeSuite(WriteAheadLogTestCase))
+    suite.addTest(unittest.makeSuite(MirrorTestCase))
+    suite.addTest(unittest.makeSuite(MetricsTestCase))
+    suite.addTest(unittest.makeSuite(TokenSignerTestCase))
+    suite.addTest(unittest.makeSuite(TokenVerifierTestCase))
+    suite.addTest(unittest.makeSuite(LazyInstanceTestCase))
     return suite
@@ -0,0 +1,130 @@
+import unittest
+import json
+import threading
+
+try:
+    import asyncio
+    from wilddog.aio import AsyncWilddogApplication
+except (ImportError, SyntaxError):
+    AsyncWilddogApplication = None
+
+from wilddog.ratelimit import RateLimiter
+from wilddog.wilddog import WilddogAuthentication
+
+
+def _done(value):
+    future = asyncio.get_event_loop().create_future()
+    future.set_result(value)
+    return future
+
+
+class MockAsyncResponse(object):
+    def __init__(self, status, content, delay=0):
+        self.status = status
+        self.content = content
+        self.delay = delay
+
+    def read(self):
+        return asyncio.ensure_future(asyncio.sleep(self.delay, self.content))
+
+    @staticmethod
+    def raise_for_status():
+        raise Exception('Fake HTTP Error')
+
+
+class MockRequestContext(object):
+    def __init__(self, session, response):
+        self.session = session
+        self.response = response
+
+    def __aenter__(self):
+        self.session.active += 1
+        self.session.peak = max(self.session.peak, self.session.active)
+        return _done(self.response)
+
+    def __aexit__(self, *exc_info):
+        self.session.active -= 1
+        return _done(None)
+
+
+class MockAsyncSession(object):
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+
+    def request(self, method, url, params, headers, data):
+        self.requests.append((method, url, params, data))
+        return MockRequestContext(self, self.response)
+
+    def close(self):
+        return _done(None)
+
+
+@unittest.skipIf(AsyncWilddogApplication is None, 'asyncio client is not available')
+class AsyncWilddogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.DSN = 'https://scm.wilddogio.com'
+        self.authentication = WilddogAuthentication('FAKE_WILDDOG_SECRET', 'wilddog-python@wilddog.com',
+                                                    extra={'uid': '123'})
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def _app(self, response, **kwargs):
+        return AsyncWilddogApplication(self.DSN, self.authentication,
+                                       session=MockAsyncSession(response), **kwargs)
+
+    def test_get(self):
+        wilddog = self._app(MockAsyncResponse(200, b'{"1": "John Doe"}'))
+        result = self._run(wilddog.get('/users', None))
+        self.assertEqual(result, {'1': 'John Doe'})
+        method, url, params, data = wilddog._session.requests[0]
+        self.assertEqual((method, url), ('GET', self.DSN + '/users/.json'))
+        self.assertTrue('auth' in params)
+
+    def test_put(self):
+        wilddog = self._app(MockAsyncResponse(200, b''))
+        self.assertEqual(self._run(wilddog.put('/users', '1', {'name': 'x'})), None)
+        self.assertEqual(json.loads(wilddog._session.requests[0][3]), {'name': 'x'})
+
+    def test_error(self):
+        wilddog = self._app(MockAsyncResponse(500, b''))
+        self.assertRaises(Exception, self._run, wilddog.delete('/users', '1'))
+
+    def test_concurrency(self):
+        wilddog = self._app(MockAsyncResponse(200, b'1', delay=0.01), concurrency=3)
+        coro = asyncio.gather(*[wilddog.get('/users', str(i)) for i in range(10)])
+        self.assertEqual(self._run(coro), [1] * 10)
+        self.assertEqual(wilddog._session.peak, 3)
+
+    def test_timeout(self):
+        wilddog = self._app(MockAsyncResponse(200, b'1', delay=1), timeout=0.01)
+        self.assertRaises(asyncio.TimeoutError, self._run, wilddog.get('/users', None))
+
+    def test_blocking_rate_limiter(self):
+        limiter = RateLimiter(100)
+        limiter.blocking = True
+        threads = []
+        reserve = limiter.reserve
+
+        def recording_reserve(url, tokens=1):
+            threads.append(threading.current_thread())
+            return reserve(url, tokens)
+
+        limiter.reserve = recording_reserve
+        wilddog = self._app(MockAsyncResponse(200, b'1'), rate_limiter=limiter)
+        self.assertEqual(self._run(wilddog.get('/users', None)), 1)
+        self.assertEqual(len(threads), 1)
+        self.assertFalse(threads[0] is threading.current_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import json
+
+from wilddog.bulk import WriteBatch, iter_reads
+from wilddog.jsonutil import JSONSerializer
+
+
+class MockApplication(object):
+    serializer = JSONSerializer()
+
+    def __init__(self, fail_on=None):
+        self.requests = []
+        self.fail_on = fail_on
+
+    def get(self, url, name, params=None, deadline=None):
+        if url == self.fail_on:
+            raise Exception('Fake HTTP Error')
+        return url
+
+    def _patch_raw(self, url, data, deadline=None):
+        if url == self.fail_on:
+            raise Exception('Fake HTTP Error')
+        self.requests.append((url, json.loads(data.decode('utf-8'))))
+
+
+class WriteBatchTestCase(unittest.TestCase):
+    def test_common_ancestor(self):
+        app = MockApplication()
+        with WriteBatch(app) as batch:
+            batch.put('/users/1/name', 'John Doe')
+            batch.update('/users/2', {'name': 'Jane Doe', 'age': 30})
+        self.assertEqual(app.requests, [('/users', {'1/name': 'John Doe',
+                                                    '2/name': 'Jane Doe',
+                                                    '2/age': 30})])
+        self.assertEqual(list(batch.results), ['/users/1/name', '/users/2/name', '/users/2/age'])
+
+    def test_single_path(self):
+        app = MockApplication()
+        with WriteBatch(app) as batch:
+            batch.put('/users/1', {'name': 'John Doe'})
+        self.assertEqual(app.requests, [('/users', {'1': {'name': 'John Doe'}})])
+
+    def test_last_write_wins(self):
+        app = MockApplication()
+        with WriteBatch(app) as batch:
+            batch.put('/a/b', 1)
+            batch.put('/a/b', 2)
+        self.assertEqual(app.requests, [('/a', {'b': 2})])
+
+    def test_overlapping_paths_keep_order(self):
+        app = MockApplication()
+        with WriteBatch(app) as batch:
+            batch.put('/a/b/c', 1)
+            batch.delete('/a/b')
+            batch.put('/a/b/d', 2)
+        self.assertEqual(app.requests, [('/a/b', {'c': 1}), ('/a', {'b': None}), ('/a/b', {'d': 2})])
+
+    def test_split_by_size(self):
+        app = MockApplication()
+        batch = WriteBatch(app, max_body_size=40)
+        for i in range(6):
+            batch.put('/logs/%d' % i, 'x' * 10)
+        batch.commit()
+        self.assertTrue(len(app.requests) > 1)
+        merged = {}
+        for url, body in app.requests:
+            merged.update(body)
+        self.assertEqual(len(merged), 6)
+
+    def test_errors_are_reported_per_path(self):
+        app = MockApplication(fail_on='/')
+        batch = WriteBatch(app)
+        batch.put('/a/1', 1)
+        batch.put('/a', 2)
+        batch.put('/b/1', 3)
+        results = batch.commit()
+        self.assertEqual(results['/a/1'], ('/a/1', 1, None))
+        self.assertTrue(results['/a'].error is not None)
+        self.assertTrue(results['/b/1'].error is not None)
+
+
+class ReadManyTestCase(unittest.TestCase):
+    def test_iter_reads(self):
+        app = MockApplication(fail_on='/users/2')
+        results = dict((r.path, r) for r in iter_reads(app, ['/users/1', '/users/2', '/users/3'], 2))
+        self.assertEqual(results['/users/1'], ('/users/1', '/users/1', None))
+        self.assertEqual(results['/users/3'].value, '/users/3')
+        self.assertTrue(results['/users/2'].error is not None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import json
+
+from wilddog.cache import ResponseCache
+from wilddog.wilddog import WilddogApplication
+
+from .wilddog_test import MockConnection, MockResponse
+
+
+class CountingConnection(MockConnection):
+    def __init__(self, response):
+        super(CountingConnection, self).__init__(response)
+        self.calls = []
+
+    def get(self, url, params, headers, *args, **kwargs):
+        self.calls.append(('GET', url, headers.get('If-None-Match')))
+        return self.response
+
+    def put(self, url, *args, **kwargs):
+        self.calls.append(('PUT', url, None))
+        return self.response
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.DSN = 'https://scm.wilddogio.com'
+        self.cache = ResponseCache(max_entries=3, max_bytes=100, ttl=60)
+
+    def key(self, path):
+        return self.cache.make_key(self.DSN + path, {'auth': 'token'})
+
+    def test_lru(self):
+        for i in range(3):
+            self.cache.set(self.key('/users/%d.json' % i), '1')
+        self.cache.get(self.key('/users/0.json'))
+        self.cache.set(self.key('/users/3.json'), '1')
+        self.assertEqual(self.cache.get(self.key('/users/1.json')), None)
+        self.assertEqual(self.cache.get(self.key('/users/0.json')), '1')
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 1, 'evictions': 1,
+                                              'revalidations': 0, 'entries': 3, 'bytes': 3})
+
+    def test_memory_bound(self):
+        self.cache.set(self.key('/a.json'), 'x' * 60)
+        self.cache.set(self.key('/b.json'), 'x' * 60)
+        self.assertEqual(self.cache.get(self.key('/a.json')), None)
+        self.cache.set(self.key('/c.json'), 'x' * 101)
+        self.assertEqual(self.cache.stats()['bytes'], 60)
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=-1)
+        cache.set(self.key('/a.json'), '1')
+        self.assertEqual(cache.get(self.key('/a.json')), None)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_invalidate(self):
+        for path in ('/.json', '/users/.json', '/users/1.json', '/users/1/name.json', '/users10.json'):
+            self.cache.max_entries = 10
+            self.cache.set(self.key(path), '1')
+        self.cache.invalidate(self.DSN + '/users/1.json')
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.assertEqual(self.cache.get(self.key('/users10.json')), '1')
+
+    def test_read_through(self):
+        connection = CountingConnection(MockResponse(200, json.dumps({'name': 'John'})))
+        wilddog = WilddogApplication(self.DSN, cache=self.cache)
+        self.assertEqual(wilddog.get('/users', '1', connection=connection), {'name': 'John'})
+        self.assertEqual(wilddog.get('/users', '1', connection=connection), {'name': 'John'})
+        self.assertEqual(len(connection.calls), 1)
+        wilddog.put('/users/1', 'name', 'Jane', connection=connection)
+        wilddog.get('/users', '1', connection=connection)
+        self.assertEqual([c[0] for c in connection.calls], ['GET', 'PUT', 'GET'])
+
+    def test_etag_revalidation(self):
+        connection = CountingConnection(MockResponse(200, json.dumps({'name': 'John'}), {'ETag': '"abc"'}))
+        wilddog = WilddogApplication(self.DSN, cache=ResponseCache(ttl=-1))
+        self.assertEqual(wilddog.get('/users', '1', connection=connection), {'name': 'John'})
+        connection.response = MockResponse(304, '')
+        self.assertEqual(wilddog.get('/users', '1', connection=connection), {'name': 'John'})
+        self.assertEqual([c[2] for c in connection.calls], [None, '"abc"'])
+        self.assertEqual(wilddog.cache.stats()['revalidations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import gzip
+import io
+import json
+import zlib
+
+from wilddog.compression import compress, TransferStats
+from wilddog.pool import ConnectionPool
+from wilddog.wilddog import make_put_request
+
+from .wilddog_test import MockResponse
+
+
+class RecordingConnection(object):
+    def __init__(self, response, compress_threshold):
+        self.response = response
+        self.headers = {}
+        self.compress_threshold = compress_threshold
+        self.compression = 'gzip'
+        self.transfer_stats = TransferStats()
+        self.sent = None
+
+    def put(self, url, data, params, headers, *args, **kwargs):
+        self.sent = (data, headers)
+        return self.response
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.body = json.dumps({'log': ['entry'] * 100}).encode('utf-8')
+
+    def test_compress(self):
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(compress(self.body))).read(), self.body)
+        self.assertEqual(zlib.decompress(compress(self.body, 'deflate')), self.body)
+        self.assertRaises(ValueError, compress, self.body, 'br')
+
+    def test_large_body_is_compressed(self):
+        response = MockResponse(200, '{"ok": true}', {'Content-Length': '8'})
+        connection = RecordingConnection(response, compress_threshold=100)
+        make_put_request('https://scm.wilddogio.com/logs.json', self.body, {}, {},
+                         connection=connection)
+        data, headers = connection.sent
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertTrue(len(data) < len(self.body))
+        stats = connection.transfer_stats.snapshot()
+        self.assertEqual(stats['sent_logical'], len(self.body))
+        self.assertEqual(stats['sent_wire'], len(data))
+        self.assertEqual(stats['compressed_requests'], 1)
+        self.assertEqual((stats['received_logical'], stats['received_wire']), (12, 8))
+
+    def test_small_body_is_not_compressed(self):
+        connection = RecordingConnection(MockResponse(200, ''), compress_threshold=len(self.body) + 1)
+        make_put_request('https://scm.wilddogio.com/logs.json', self.body, {}, {},
+                         connection=connection)
+        self.assertEqual(connection.sent, (self.body, {}))
+
+    def test_pool_sessions(self):
+        with ConnectionPool(compress_threshold=1024, compression='deflate') as pool:
+            with pool.connection('https://scm.wilddogio.com') as session:
+                self.assertEqual(session.compress_threshold, 1024)
+                self.assertEqual(session.compression, 'deflate')
+                self.assertTrue(session.transfer_stats is pool.transfer_stats)
+                self.assertEqual(session.headers['Accept-Encoding'], 'gzip, deflate')
+
+
+if __name__ == '__main__':
+    unittest.main()
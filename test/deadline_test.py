@@ -0,0 +1,72 @@
+import time
+import unittest
+
+from wilddog.deadline import Deadline, DeadlineExceeded
+from wilddog.retry import RetryPolicy
+from wilddog.wilddog import WilddogApplication, make_get_request
+
+from .wilddog_test import MockConnectionPool, MockResponse
+
+
+class TimeoutRecordingConnection(object):
+    def __init__(self, responses=None):
+        self.headers = {}
+        self.responses = responses
+        self.timeouts = []
+
+    def get(self, url, params, headers, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        if self.responses:
+            return self.responses.pop(0)
+        return MockResponse(200, '{}')
+
+    patch = get
+
+
+class DeadlineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.connection = TimeoutRecordingConnection()
+        self.app = WilddogApplication('https://scm.wilddogio.com', timeout=(3, 20),
+                                      connection_pool=MockConnectionPool(self.connection))
+
+    def test_client_and_call_timeouts(self):
+        self.app.get('/users', '1')
+        self.app.get('/users', '1', timeout=(1, 5))
+        self.assertEqual(self.connection.timeouts, [(3, 20), (1, 5)])
+
+    def test_caller_connection_keeps_its_timeout(self):
+        self.connection.timeout = 7
+        make_get_request('https://scm.wilddogio.com/users.json', {}, {},
+                         connection=self.connection)
+        make_get_request('https://scm.wilddogio.com/users.json', {}, {},
+                         connection=self.connection, timeout=2)
+        self.assertEqual(self.connection.timeouts, [7, 2])
+        self.assertEqual(self.connection.timeout, 7)
+
+    def test_deadline_caps_timeout(self):
+        self.app.get('/users', '1', deadline=Deadline(1))
+        connect, read = self.connection.timeouts[0]
+        self.assertTrue(0 < connect <= 1 and 0 < read <= 1)
+        self.assertEqual(self.connection.deadline, None)
+
+    def test_deadline_bounds_retries(self):
+        self.connection.retry_policy = RetryPolicy(attempts=5, backoff=0.2, max_backoff=0.2)
+        self.connection.responses = [MockResponse(503, '')] * 5
+        start = time.time()
+        self.assertRaises(Exception, self.app.get, '/users', '1', deadline=Deadline(0.25))
+        self.assertTrue(len(self.connection.timeouts) < 5)
+        # Well short of the five backoffs, with some slack for the last attempt.
+        self.assertTrue(time.time() - start < 0.4)
+
+    def test_expired_deadline(self):
+        deadline = Deadline(0)
+        self.assertRaises(DeadlineExceeded, self.app.get, '/users', '1', deadline=deadline)
+        results = self.app.get_many(['/users/1', '/users/2'], deadline=deadline)
+        self.assertTrue(all(isinstance(r.error, DeadlineExceeded) for r in results.values()))
+        results = self.app.update_many({'/users/1/name': 'John'}, deadline=deadline)
+        self.assertTrue(isinstance(results['/users/1/name'].error, DeadlineExceeded))
+        self.assertEqual(self.connection.timeouts, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import json
+
+from wilddog.jsonstream import iter_events, iter_leaves, iter_items
+
+
+class JSONStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.data = {'users': [1, 2.5, {'name': 'John "JD" Doe', 'tags': []}],
+                     'empty': {},
+                     'active': True,
+                     'score': -1.5e3,
+                     'city': u'北京'}
+        self.content = json.dumps(self.data, ensure_ascii=False).encode('utf-8')
+
+    def chunks(self, size):
+        return [self.content[i:i + size] for i in range(0, len(self.content), size)]
+
+    def test_items(self):
+        for size in (1, 2, 5, len(self.content)):
+            self.assertEqual(dict(iter_items(self.chunks(size))), self.data)
+
+    def test_items_is_lazy(self):
+        items = iter_items(iter([b'{"a": 1, ', b'"b": 2', b'}']))
+        self.assertEqual(next(items), ('a', 1))
+        self.assertEqual(next(items), ('b', 2))
+
+    def test_array_and_scalar(self):
+        self.assertEqual(list(iter_items([b'[1, [2, 3], {"a": 4}]'])),
+                         [(0, 1), (1, [2, 3]), (2, {'a': 4})])
+        self.assertEqual(list(iter_items([b'1', b'2'])), [(None, 12)])
+        self.assertEqual(list(iter_items([b'nu', b'll'])), [(None, None)])
+
+    def test_leaves(self):
+        leaves = dict(iter_leaves(self.chunks(3)))
+        self.assertEqual(leaves[('users', 2, 'name')], 'John "JD" Doe')
+        self.assertEqual(leaves[('users', 2, 'tags')], [])
+        self.assertEqual(leaves[('empty',)], {})
+        self.assertEqual(leaves[('users', 1)], 2.5)
+
+    def test_events(self):
+        self.assertEqual(list(iter_events([b'{"a": [true]}'])),
+                         [('start_map', None), ('key', 'a'), ('start_array', None),
+                          ('value', True), ('end_array', None), ('end_map', None)])
+
+    def test_truncated(self):
+        self.assertRaises(ValueError, list, iter_items([b'{"a": "b']))
+        self.assertRaises(ValueError, list, iter_items([b'{"a": 1, "b": {"c": 2']))
+        self.assertRaises(ValueError, list, iter_items([b'[1, 2', b', 3']))
+        self.assertRaises(ValueError, list, iter_items([]))
+
+    def test_malformed(self):
+        for document in (b'{"a" 1 2 ]', b'1 2', b'{"a": 1 "b": 2}', b'[1, 2}', b'{"a": 1,}',
+                         b'[,1]', b'{1: 2}', b'{"a"}', b']', b'[1] [2]'):
+            self.assertRaises(ValueError, list, iter_events([document]))
+        self.assertRaises(ValueError, list, iter_items([b'{"a": 1} {"b": 2}']))
+        self.assertEqual(list(iter_items([b' {} '])), [])
+        self.assertEqual(list(iter_items([b'[[], {}]'])), [(0, []), (1, {})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,7 @@ import datetime
 import decimal
 import json
 
-from wilddog.jsonutil import JSONEncoder
+from wilddog.jsonutil import JSONEncoder, JSONSerializer, OrjsonSerializer, orjson
 
 
 class JSONTestCase(unittest.TestCase):
@@ -11,7 +11,7 @@ class JSONTestCase(unittest.TestCase):
         self.data = {'now': datetime.datetime.now(),
                      'oneday': datetime.timedelta(days=1),
                      'five': decimal.Decimal(5),
-                     'date': datetime.date(2014, 03, 11)}
+                     'date': datetime.date(2014, 3, 11)}
 
     def test_conversion(self):
         serialized = json.dumps(self.data, cls=JSONEncoder)
@@ -35,6 +35,34 @@ class JSONTestCase(unittest.TestCase):
 
         self.assertEqual(total_seconds(delta), 1303506.74)
 
+    def test_serializer(self):
+        serialized = JSONSerializer().dumps(self.data)
+        self.assertTrue(isinstance(serialized, bytes))
+        self.assertEqual(serialized, json.dumps(self.data, cls=JSONEncoder).encode('utf-8'))
+        self.assertEqual(JSONSerializer().loads(serialized), json.loads(serialized.decode('utf-8')))
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_serializer(self):
+        self.data[1] = 2 ** 70 + 1
+        serialized = OrjsonSerializer().dumps(self.data)
+        loaded = OrjsonSerializer().loads(serialized)
+        self.assertEqual(loaded, json.loads(json.dumps(self.data, cls=JSONEncoder)))
+        self.assertTrue(type(loaded['1']) is int)
+        del self.data[1]
+        serialized = OrjsonSerializer().dumps(self.data)
+        self.assertEqual(OrjsonSerializer().loads(serialized),
+                         json.loads(json.dumps(self.data, cls=JSONEncoder)))
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_loads_wide_integers(self):
+        for data in (b'{"n": 12345678901234567890123}', u'[-12345678901234567890123, 1.5]'):
+            value = OrjsonSerializer().loads(data)
+            number = value['n'] if isinstance(value, dict) else value[0]
+            self.assertTrue(type(number) is int)
+            self.assertEqual(abs(number), 12345678901234567890123)
+        self.assertEqual(OrjsonSerializer().loads(b'{"n": 123456789012345678}'), {'n': 123456789012345678})
+
+
 if __name__ == '__main__':
     unittest.main()
 
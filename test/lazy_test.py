@@ -0,0 +1,60 @@
+import threading
+import unittest
+
+from wilddog.lazy import LazyInstance
+from wilddog.executors import ThreadPoolBackend
+
+
+class LazyInstanceTestCase(unittest.TestCase):
+
+    def test_created_once(self):
+        created = []
+        start = threading.Event()
+
+        def factory():
+            start.wait(0.05)
+            created.append(object())
+            return created[-1]
+
+        lazy = LazyInstance(factory)
+        self.assertFalse(lazy.created)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(lazy.get())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(created), 1)
+        self.assertEqual(set(map(id, results)), set([id(created[0])]))
+        self.assertTrue(lazy.created)
+
+    def test_replace(self):
+        lazy = LazyInstance(list)
+        first = lazy.get()
+        self.assertIs(lazy.replace(), first)
+        self.assertFalse(lazy.created)
+        second = lazy.get()
+        self.assertIsNot(second, first)
+        replacement = ['x']
+        self.assertIs(lazy.replace(replacement), second)
+        self.assertIs(lazy.get(), replacement)
+
+    def test_forked(self):
+        lazy = LazyInstance(list)
+        parent = lazy.get()
+        # As seen from a child process forked after the instance was made.
+        lazy._pid = -1
+        self.assertFalse(lazy.created)
+        self.assertIsNot(lazy.get(), parent)
+        lazy._pid = -1
+        self.assertIsNone(lazy.replace())
+
+    def test_thread_pool_resize(self):
+        backend = ThreadPoolBackend(size=1)
+        self.assertEqual(backend.submit(lambda url: url, ('/a',)).result(), '/a')
+        backend.resize(3)
+        self.assertEqual(backend._executor.get()._max_workers, 3)
+        self.assertEqual(backend.submit(lambda url: url, ('/b',)).result(), '/b')
+        backend.shutdown()
+        self.assertFalse(backend._executor.created)
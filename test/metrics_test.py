@@ -0,0 +1,76 @@
+import unittest
+
+import requests
+
+from wilddog.metrics import Metrics, Histogram
+from wilddog.wilddog import WilddogApplication, WilddogAuthentication, make_get_request
+
+from .wilddog_test import MockConnection, MockConnectionPool, MockResponse
+
+
+class FailingConnection(MockConnection):
+    def get(self, url, params, headers, *args, **kwargs):
+        raise requests.ConnectionError('unreachable')
+
+
+class MetricsTestCase(unittest.TestCase):
+    URL = 'https://scm.wilddogio.com/users/1.json'
+
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.1, 1))
+
+    def test_histogram(self):
+        histogram = Histogram(buckets=(1, 2))
+        for value in (0.5, 1, 1.5, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.snapshot(), {'buckets': [(1, 2), (2, 3), ('+Inf', 4)],
+                                                'sum': 6.0, 'count': 4})
+
+    def test_request_metrics_and_hooks(self):
+        calls = []
+        self.metrics.add_hook('before_send', lambda method, url, kwargs: calls.append(method))
+        self.metrics.add_hook('after_response', lambda method, url, response, seconds:
+                              calls.append(response.status_code))
+        connection = MockConnection(MockResponse(200, '{"name": "John"}', {'Content-Length': '16'}))
+        connection.metrics = self.metrics
+        make_get_request(self.URL, {}, {}, connection=connection)
+        self.assertEqual(calls, ['GET', 200])
+        snapshot = self.metrics.snapshot()
+        labels = {'method': 'GET', 'endpoint': '/users'}
+        self.assertEqual(snapshot['requests_total'], [(dict(labels, status=200), 1)])
+        self.assertEqual(snapshot['bytes_received_total'], [(labels, 16)])
+        self.assertEqual(snapshot['request_seconds'][0][1]['count'], 1)
+        self.assertEqual(snapshot['parse_seconds'][0][1]['count'], 1)
+
+    def test_errors(self):
+        errors = []
+        self.metrics.add_hook('on_error', lambda method, url, error, seconds: errors.append(error))
+        connection = FailingConnection(None)
+        connection.metrics = self.metrics
+        self.assertRaises(requests.ConnectionError, make_get_request, self.URL, {}, {},
+                          connection=connection)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.metrics.snapshot()['errors_total'],
+                         [({'method': 'GET', 'endpoint': '/users', 'error': 'ConnectionError'}, 1)])
+        self.assertRaises(ValueError, self.metrics.add_hook, 'on_retry', None)
+
+    def test_application(self):
+        connection = MockConnection(MockResponse(200, '{}'))
+        auth = WilddogAuthentication('secret', 'wilddog@wilddog.com', extra={'uid': '1'})
+        app = WilddogApplication('https://scm.wilddogio.com', auth, metrics=self.metrics,
+                                 connection_pool=MockConnectionPool(connection))
+        app.get('/users', '1')
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['token_seconds'][0][1]['count'], 1)
+        self.assertEqual(snapshot['async_pending'], [({}, 0)])
+        text = self.metrics.to_prometheus()
+        self.assertTrue('# TYPE wilddog_request_seconds histogram\n' in text)
+        self.assertTrue('wilddog_request_seconds_bucket{endpoint="/users",method="GET",le="+Inf"} 1\n'
+                        in text)
+        self.assertTrue('wilddog_requests_total{endpoint="/users",method="GET",status="200"} 1\n'
+                        in text)
+        self.assertTrue('wilddog_write_queue_pending 0\n' in text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+
+import requests
+
+from wilddog.mirror import Mirror
+from wilddog.stream import StreamEvent
+
+
+class MockApplication(object):
+    def __init__(self, data):
+        self.data = data
+        self.listeners = []
+        self.errors = []
+        self.stream_error = None
+
+    def get(self, url, name):
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.data
+
+    def listen(self, url, callback, on_error=None):
+        self.listeners.append(callback)
+        if self.stream_error is not None:
+            on_error(self.stream_error)
+        else:
+            callback(StreamEvent('put', '/', self.data))
+        return MockSubscription()
+
+
+class MockSubscription(object):
+    error = None
+
+    def close(self, timeout=None):
+        pass
+
+
+class MirrorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = MockApplication({'ann': {'age': 31, 'city': 'Beijing'},
+                                    'bob': {'age': 19, 'city': 'Shanghai'},
+                                    'cid': {'age': 25},
+                                    '10': {'age': 25, 'city': 'Beijing'},
+                                    '9': {'age': 'unknown'}})
+        self.mirror = Mirror(self.app, '/users', indexes=['age', 'city']).start()
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_key_order(self):
+        self.assertEqual(list(self.mirror.query()), ['9', '10', 'ann', 'bob', 'cid'])
+        self.assertEqual(list(self.mirror.query(start_at='b', limit_to_first=1)), ['bob'])
+
+    def test_value_queries(self):
+        self.assertEqual(list(self.mirror.query('age')), ['bob', '10', 'cid', 'ann', '9'])
+        self.assertEqual(list(self.mirror.query('age', start_at=20, end_at=31)), ['10', 'cid', 'ann'])
+        self.assertEqual(list(self.mirror.query('age', equal_to=25, limit_to_last=1)), ['cid'])
+        self.assertEqual(list(self.mirror.query('city', equal_to='Beijing')), ['10', 'ann'])
+        self.assertRaises(ValueError, self.mirror.query, 'name')
+
+    def test_stream_updates(self):
+        on_event = self.app.listeners[0]
+        on_event(StreamEvent('put', '/bob/age', 40))
+        on_event(StreamEvent('patch', '/', {'dan': {'age': 20}, 'ann': None}))
+        self.assertEqual(list(self.mirror.query('age', start_at=20)), ['dan', '10', 'cid', 'bob', '9'])
+        self.assertEqual(self.mirror.get('/bob'), {'age': 40, 'city': 'Shanghai'})
+        on_event(StreamEvent('put', '/', None))
+        self.assertEqual(list(self.mirror.query('age')), [])
+
+    def test_large_snapshot(self):
+        app = MockApplication(dict(('u%05d' % i, {'age': i % 100}) for i in range(20000)))
+        mirror = Mirror(app, '/users', indexes=['age']).start()
+        self.assertEqual(list(mirror.query('age', equal_to=7, limit_to_first=2)), ['u00007', 'u00107'])
+        app.listeners[0](StreamEvent('put', '/u00007/age', 200))
+        self.assertEqual(list(mirror.query('age', start_at=100)), ['u00007'])
+        mirror.close()
+
+    def test_polling(self):
+        mirror = Mirror(self.app, '/users', indexes=['age'], poll_interval=60).start()
+        self.app.data = {'bob': {'age': 19}, 'eve': {'age': 50}}
+        mirror._replace(self.app.data)
+        self.assertEqual(list(mirror.query('age', start_at=19)), ['bob', 'eve'])
+        mirror.close(1)
+
+    def test_polling_errors(self):
+        mirror = Mirror(self.app, '/users', poll_interval=0.01).start()
+        response = requests.Response()
+        response.status_code = 403
+        self.app.errors = [requests.ConnectionError(), requests.HTTPError(response=response)]
+        mirror._thread.join(5)
+        self.assertFalse(mirror._thread.is_alive())
+        self.assertTrue(isinstance(mirror.error, requests.HTTPError))
+        self.assertEqual(self.app.errors, [])
+        self.assertEqual(self.mirror.error, None)
+        mirror.close(1)
+
+    def test_stream_error_stops_start(self):
+        response = requests.Response()
+        response.status_code = 403
+        self.app.stream_error = requests.HTTPError(response=response)
+        mirror = Mirror(self.app, '/users')
+        self.assertRaises(requests.HTTPError, mirror.start)
+        self.assertTrue(mirror.error is self.app.stream_error)
+        mirror.close(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
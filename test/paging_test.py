@@ -0,0 +1,65 @@
+import unittest
+import json
+
+from wilddog.paging import iter_children
+
+
+class MockApplication(object):
+    """
+    Answers orderBy/startAt/equalTo/limitToFirst queries over ``data`` like
+    the Wilddog REST API does. ``order`` maps a (key, value) child to the
+    value it is ordered by.
+    """
+
+    def __init__(self, data, order):
+        self.data = data
+        self.order = order
+        self.requests = []
+
+    def get(self, url, name, params=None):
+        self.requests.append(params)
+        ordered = sorted(self.data.items(), key=lambda item: (self.order(item), item[0]))
+        if 'equalTo' in params:
+            value = json.loads(params['equalTo'])
+            return dict(item for item in ordered if self.order(item) == value)
+        if 'startAt' in params:
+            start = json.loads(params['startAt'])
+            if params['orderBy'] == '"$key"':
+                start = self.order((start, None))
+            ordered = [item for item in ordered if self.order(item) >= start]
+        return dict(ordered[:params['limitToFirst']])
+
+
+class PagingTestCase(unittest.TestCase):
+    def test_key_order(self):
+        data = dict(('k%03d' % i, i) for i in range(25))
+        app = MockApplication(data, lambda item: item[0])
+        children = list(iter_children(app, '/events', page_size=10))
+        self.assertEqual(children, sorted(data.items()))
+        self.assertEqual(len(app.requests), 3)
+        self.assertEqual(app.requests[1]['startAt'], '"k009"')
+        self.assertEqual(app.requests[1]['limitToFirst'], 11)
+
+    def test_integer_keys(self):
+        data = dict((str(i), i) for i in range(12))
+        data['a'] = 'a'
+        app = MockApplication(data, lambda item: (0, int(item[0])) if item[0].isdigit() else (1, item[0]))
+        children = list(iter_children(app, '/events', page_size=5, prefetch=False))
+        self.assertEqual([k for k, _ in children], [str(i) for i in range(12)] + ['a'])
+
+    def test_child_order_with_ties(self):
+        data = dict(('u%d' % i, {'age': i // 4}) for i in range(12))
+        app = MockApplication(data, lambda item: item[1]['age'])
+        children = list(iter_children(app, '/users', page_size=3, order_by='age'))
+        self.assertEqual([k for k, _ in children], sorted(data, key=lambda k: (data[k]['age'], k)))
+
+    def test_large_tie_group(self):
+        data = dict(('u%02d' % i, {'age': 1 if 2 <= i < 40 else i}) for i in range(45))
+        app = MockApplication(data, lambda item: item[1]['age'])
+        children = list(iter_children(app, '/users', page_size=5, order_by='age'))
+        self.assertEqual([k for k, _ in children], sorted(data, key=lambda k: (data[k]['age'], k)))
+        self.assertEqual(app.requests[2], {'orderBy': '"age"', 'equalTo': '1'})
+        self.assertEqual(len(app.requests), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from wilddog.pool import ConnectionPool
+from wilddog.ratelimit import RateLimiter
+from wilddog.retry import RetryPolicy
+from wilddog.wilddog import WilddogApplication
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.URL = 'https://scm.wilddogio.com/users/1.json'
+        self.pool = ConnectionPool(pool_size=2, max_idle=1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_reuse(self):
+        with self.pool.connection(self.URL) as first:
+            pass
+        with self.pool.connection('https://scm.wilddogio.com/.json') as second:
+            pass
+        self.assertTrue(first is second)
+        self.assertEqual(self.pool.stats(), {'hits': 1, 'misses': 1, 'in_use': 0, 'idle': 1})
+
+    def test_hosts_are_separate(self):
+        with self.pool.connection(self.URL) as first:
+            pass
+        with self.pool.connection('https://other.wilddogio.com/.json') as second:
+            pass
+        self.assertFalse(first is second)
+        self.assertEqual(self.pool.stats()['misses'], 2)
+
+    def test_max_idle(self):
+        first = self.pool.acquire(self.URL)
+        second = self.pool.acquire(self.URL)
+        self.assertEqual(self.pool.stats()['in_use'], 2)
+        self.pool.release(self.URL, first)
+        self.pool.release(self.URL, second)
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+    def test_blocking_timeout(self):
+        pool = ConnectionPool(pool_size=1, block=True)
+        pool.acquire(self.URL)
+        self.assertRaises(RuntimeError, pool.acquire, self.URL, 0.01)
+
+    def test_close(self):
+        with self.pool as pool:
+            pass
+        self.assertRaises(RuntimeError, pool.acquire, self.URL)
+
+    def test_configure(self):
+        with self.pool.connection(self.URL) as session:
+            self.assertEqual(session.compress_threshold, None)
+        policy = RetryPolicy()
+        self.pool.configure(compress_threshold=1024, retry_policy=policy)
+        with self.pool.connection(self.URL) as reused:
+            self.assertTrue(reused is session)
+            self.assertEqual(reused.compress_threshold, 1024)
+            self.assertTrue(reused.retry_policy is policy)
+        self.assertRaises(ValueError, self.pool.configure, timeout=1)
+        self.assertRaises(ValueError, self.pool.configure, compression='br')
+
+    def test_application_settings(self):
+        limiter = RateLimiter(10)
+        app = WilddogApplication('https://scm.wilddogio.com', connection_pool=self.pool,
+                                 rate_limiter=limiter, compress_threshold=512)
+        with app.connection_pool.connection(self.URL) as session:
+            self.assertTrue(session.rate_limiter is limiter)
+            self.assertEqual(session.compress_threshold, 512)
+        self.assertRaises(ValueError, WilddogApplication, 'https://scm.wilddogio.com',
+                          connection_pool=object(), rate_limiter=limiter)
+
+
+if __name__ == '__main__':
+    unittest.main()
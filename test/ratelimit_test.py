@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from wilddog.ratelimit import TokenBucket, RateLimiter, FileState, fcntl
+from wilddog.wilddog import make_get_request
+
+from .wilddog_test import MockConnection, MockResponse
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def test_bucket(self):
+        bucket = TokenBucket(10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        # The third token is reserved ahead, a tenth of a second away.
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+    def test_prefixes(self):
+        limiter = RateLimiter(100, prefixes={'/logs': (1, 1)})
+        self.assertEqual(limiter.reserve('https://scm.wilddogio.com/logs/1.json'), 0)
+        self.assertTrue(limiter.reserve('/logs/2') > 0.9)
+        self.assertEqual(limiter.reserve('/logsheet'), 0)
+        self.assertEqual(limiter.reserve('/users/1'), 0)
+
+    def test_requests_wait(self):
+        connection = MockConnection(MockResponse(200, '{}'))
+        connection.rate_limiter = RateLimiter(20, capacity=1)
+        start = time.time()
+        for _ in range(3):
+            make_get_request('https://scm.wilddogio.com/users.json', {}, {},
+                             connection=connection)
+        self.assertTrue(time.time() - start >= 0.09)
+
+    def test_file_state_is_shared(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'rate')
+            first, second = FileState(path), FileState(path)
+            self.assertEqual(TokenBucket(1, state=first).reserve(), 0)
+            self.assertTrue(TokenBucket(1, state=second).reserve() > 0.9)
+            first.close()
+            second.close()
+        finally:
+            shutil.rmtree(directory)
+
+    @unittest.skipIf(fcntl is None or not hasattr(os, 'fork'), 'requires fcntl and fork')
+    def test_file_state_after_fork(self):
+        directory = tempfile.mkdtemp()
+        try:
+            state = FileState(os.path.join(directory, 'rate'))
+            TokenBucket(1, state=state).reserve()
+            # Hold the lock through the descriptor the child inherits.
+            fcntl.flock(state._fd, fcntl.LOCK_EX)
+            pid = os.fork()
+            if pid == 0:
+                done = threading.Event()
+
+                def take():
+                    state.take('', 1, 1, 1)
+                    done.set()
+
+                thread = threading.Thread(target=take)
+                thread.daemon = True
+                thread.start()
+                os._exit(1 if done.wait(0.3) else 0)
+            _, status = os.waitpid(pid, 0)
+            fcntl.flock(state._fd, fcntl.LOCK_UN)
+            self.assertEqual(os.WEXITSTATUS(status), 0)
+            state.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
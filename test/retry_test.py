@@ -0,0 +1,86 @@
+import unittest
+
+import requests
+
+from wilddog.retry import RetryPolicy, CircuitBreaker, CircuitOpenError
+from wilddog.wilddog import make_get_request, make_post_request
+
+from .wilddog_test import MockResponse
+
+
+class ScriptedConnection(object):
+    """
+    Answers each request with the next item of ``outcomes``, raising it if it
+    is an exception.
+    """
+
+    def __init__(self, outcomes, retry_policy=None, circuit_breaker=None):
+        self.outcomes = list(outcomes)
+        self.headers = {}
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.calls = 0
+
+    def _next(self, *args, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    get = post = _next
+
+
+class RetryTestCase(unittest.TestCase):
+    URL = 'https://scm.wilddogio.com/users.json'
+
+    def setUp(self):
+        self.policy = RetryPolicy(attempts=3, backoff=0, max_backoff=1)
+
+    def test_retries_transient_failures(self):
+        connection = ScriptedConnection([requests.ConnectionError(),
+                                         MockResponse(503, ''),
+                                         MockResponse(200, '{"1": "John"}')], self.policy)
+        self.assertEqual(make_get_request(self.URL, {}, {}, connection=connection), {'1': 'John'})
+        self.assertEqual(connection.calls, 3)
+
+    def test_gives_up_after_attempts(self):
+        connection = ScriptedConnection([MockResponse(500, '')] * 3, self.policy)
+        self.assertRaises(Exception, make_get_request, self.URL, {}, {}, connection=connection)
+        self.assertEqual(connection.calls, 3)
+
+    def test_post_is_not_retried_by_default(self):
+        connection = ScriptedConnection([MockResponse(502, ''), MockResponse(200, '{}')], self.policy)
+        self.assertRaises(Exception, make_post_request, self.URL, '{}', {}, {}, connection=connection)
+        self.assertEqual(connection.calls, 1)
+        policy = RetryPolicy(attempts=2, backoff=0, retry_post=True)
+        connection = ScriptedConnection([MockResponse(502, ''), MockResponse(200, '{}')], policy)
+        self.assertEqual(make_post_request(self.URL, '{}', {}, {}, connection=connection), {})
+
+    def test_retry_after(self):
+        self.assertEqual(self.policy.next_delay('GET', 0, MockResponse(429, '', {'Retry-After': '0.5'})), 0.5)
+        # Longer than max_backoff: hand the 429 back instead of sleeping.
+        self.assertEqual(self.policy.next_delay('GET', 0, MockResponse(429, '', {'Retry-After': '120'})), None)
+        self.assertEqual(self.policy.next_delay('GET', 2), None)
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        connection = ScriptedConnection([MockResponse(500, '')] * 2, circuit_breaker=breaker)
+        for _ in range(2):
+            self.assertRaises(Exception, make_get_request, self.URL, {}, {}, connection=connection)
+        self.assertEqual(breaker.state('scm.wilddogio.com'), 'open')
+        self.assertRaises(CircuitOpenError, make_get_request, self.URL, {}, {}, connection=connection)
+        self.assertEqual(connection.calls, 2)
+        self.assertEqual(breaker.state('other.wilddogio.com'), 'closed')
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure('scm.wilddogio.com')
+        self.assertEqual(breaker.state('scm.wilddogio.com'), 'half-open')
+        connection = ScriptedConnection([MockResponse(200, '{}')], circuit_breaker=breaker)
+        self.assertEqual(make_get_request(self.URL, {}, {}, connection=connection), {})
+        self.assertEqual(breaker.state('scm.wilddogio.com'), 'closed')
+
+
+if __name__ == '__main__':
+    unittest.main()
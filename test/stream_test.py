@@ -0,0 +1,156 @@
+import unittest
+import json
+import threading
+
+import requests
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    # py3k
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from wilddog.pool import ConnectionPool
+from wilddog.stream import SSEParser, LocalTree, Subscription
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the Wilddog streaming endpoint: every connection is answered
+    with the next script of events and then closed.
+    """
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        script = self.server.scripts.pop(0) if self.server.scripts else []
+        if isinstance(script, int):
+            self.send_error(script)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for event, data in script:
+            message = 'event: %s\ndata: %s\n\n' % (event, json.dumps(data))
+            # Split every event in two writes to exercise partial parsing.
+            half = len(message) // 2
+            self.wfile.write(message[:half].encode('utf-8'))
+            self.wfile.flush()
+            self.wfile.write(message[half:].encode('utf-8'))
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class SSEParserTestCase(unittest.TestCase):
+    def test_incremental(self):
+        parser = SSEParser()
+        self.assertEqual(parser.feed('event: put\r\ndata: {"a"'), [])
+        self.assertEqual(parser.feed(': 1}\r'), [])
+        self.assertEqual(parser.feed('\n\r\n:comment\n'), [('put', '{"a": 1}')])
+        self.assertEqual(parser.feed('data: x\ndata: y\n\n'), [('message', 'x\ny')])
+
+    def test_local_tree(self):
+        tree = LocalTree()
+        tree.put('/', {'users': {'1': {'name': 'John'}}})
+        tree.patch('/users', {'2/name': 'Jane', '1': None})
+        tree.put('/users/2/age', 30)
+        self.assertEqual(tree.data, {'users': {'2': {'name': 'Jane', 'age': 30}}})
+        self.assertEqual(tree.get('/users/2/name'), 'Jane')
+
+
+class SubscriptionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), SSEHandler)
+        self.server.requests = []
+        self.server.scripts = []
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.endpoint = 'http://127.0.0.1:%d/users/.json' % self.server.server_port
+        self.tokens = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def authenticate(self, params, headers):
+        self.tokens.append('token%d' % len(self.tokens))
+        params['auth'] = self.tokens[-1]
+
+    def test_reconnect(self):
+        self.server.scripts = [
+            [('put', {'path': '/', 'data': {'1': 'John'}})],
+            [('keep-alive', None), ('patch', {'path': '/', 'data': {'2': 'Jane'}})],
+        ]
+        subscription = Subscription(self.endpoint, self.authenticate, ConnectionPool(),
+                                    backoff=0.01)
+        events = []
+        for event in subscription:
+            events.append(event)
+            if len(events) == 2:
+                subscription.close()
+        self.assertEqual([e.event for e in events], ['put', 'patch'])
+        self.assertEqual(subscription.tree.data, {'1': 'John', '2': 'Jane'})
+        self.assertEqual(self.tokens, ['token0', 'token1'])
+        self.assertTrue(self.server.requests[1].endswith('auth=token1'))
+
+    def test_callback(self):
+        self.server.scripts = [[('put', {'path': '/1', 'data': 'John'}), ('cancel', None)]]
+        received = threading.Event()
+        events = []
+
+        def callback(event):
+            events.append(event)
+            received.set()
+
+        subscription = Subscription(self.endpoint, self.authenticate, ConnectionPool(),
+                                    callback=callback).start()
+        self.assertTrue(received.wait(5))
+        subscription.close(5)
+        self.assertEqual(events, [('put', '/1', 'John')])
+        self.assertEqual(subscription.tree.data, {'1': 'John'})
+
+    def test_transient_error(self):
+        self.server.scripts = [503, [('put', {'path': '/', 'data': 'John'})]]
+        subscription = Subscription(self.endpoint, self.authenticate, ConnectionPool(),
+                                    backoff=0.01)
+        for event in subscription:
+            subscription.close()
+        self.assertEqual(event, ('put', '/', 'John'))
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_permanent_error(self):
+        self.server.scripts = [404, []]
+        subscription = Subscription(self.endpoint, self.authenticate, ConnectionPool(),
+                                    backoff=0.01)
+        self.assertRaises(requests.HTTPError, list, subscription)
+        self.assertEqual(len(self.server.requests), 1)
+
+        self.server.scripts = [[('put', 'not a delta')]]
+        errors = []
+        subscription = Subscription(self.endpoint, self.authenticate, ConnectionPool(),
+                                    callback=lambda event: None, on_error=errors.append).start()
+        subscription._thread.join(5)
+        self.assertTrue(isinstance(subscription.error, TypeError))
+        self.assertEqual(errors, [subscription.error])
+
+    def test_callback_error(self):
+        self.server.scripts = [[('put', {'path': '/1', 'data': 'John'}),
+                                ('put', {'path': '/2', 'data': 'Jane'}), ('cancel', None)]]
+        events = []
+
+        def callback(event):
+            events.append(event)
+            if len(events) == 1:
+                raise RuntimeError('callback failed')
+
+        subscription = Subscription(self.endpoint, self.authenticate, ConnectionPool(),
+                                    callback=callback).start()
+        subscription._thread.join(5)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(subscription.error, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
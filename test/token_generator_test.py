@@ -0,0 +1,84 @@
+import datetime
+import unittest
+
+from wilddog import wilddog_token_generator
+from wilddog.wilddog_token_generator import (create_token, decode_token, verify_token,
+                                             InvalidTokenError, TokenSigner, TokenVerifier)
+
+SECRET = 'moozooherpderp'
+
+
+class FrozenTime(object):
+    @classmethod
+    def time(cls):
+        return getattr(cls, 'now', 1400000000.5)
+
+
+class TokenSignerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Tokens carry the issue time, so compare them within the same second.
+        self.addCleanup(setattr, wilddog_token_generator, 'time', wilddog_token_generator.time)
+        wilddog_token_generator.time = FrozenTime
+        self.signer = TokenSigner(SECRET)
+
+    def test_matches_create_token(self):
+        options = {'admin': True, 'debug': True, 'expires': datetime.datetime(2030, 1, 1)}
+        for data, opts in [({'uid': '1'}, None),
+                           ({'uid': u'中', 'name': 'x'}, {'notBefore': 1400000000}),
+                           (None, options)]:
+            self.assertEqual(self.signer.create_token(data, opts and dict(opts)),
+                             create_token(SECRET, data, opts and dict(opts)))
+
+    def test_create_tokens(self):
+        datas = [{'uid': str(i)} for i in range(5)]
+        tokens = self.signer.create_tokens(datas, {'expires': 1500000000})
+        self.assertEqual(tokens, [create_token(SECRET, data, {'expires': 1500000000}) for data in datas])
+
+    def test_validation(self):
+        self.assertRaises(ValueError, TokenSigner, None)
+        self.assertRaises(ValueError, self.signer.create_token, {'name': 'no uid'})
+        self.assertRaises(ValueError, self.signer.create_tokens, [{'uid': '1'}, {}])
+
+
+class TokenVerifierTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, wilddog_token_generator, 'time', wilddog_token_generator.time)
+        wilddog_token_generator.time = FrozenTime
+
+    def test_verify(self):
+        token = create_token(SECRET, {'uid': '1'}, {'expires': 1400000100})
+        claims = verify_token(SECRET, token)
+        self.assertEqual(claims['d'], {'uid': '1'})
+        self.assertEqual(claims, decode_token(token))
+        self.assertRaises(InvalidTokenError, verify_token, 'other secret', token)
+        self.assertRaises(InvalidTokenError, verify_token, SECRET, token[:-2])
+        self.assertRaises(InvalidTokenError, verify_token, SECRET, 'not.a.token')
+        self.assertRaises(InvalidTokenError, decode_token, 'garbage')
+
+    def test_time_claims(self):
+        expired = create_token(SECRET, {'uid': '1'}, {'expires': 1400000000})
+        early = create_token(SECRET, {'uid': '1'}, {'notBefore': 1400000010})
+        self.assertRaises(InvalidTokenError, verify_token, SECRET, expired)
+        self.assertRaises(InvalidTokenError, verify_token, SECRET, early)
+        self.assertEqual(verify_token(SECRET, early, leeway=30)['nbf'], 1400000010)
+
+    def test_cache(self):
+        verifier = TokenVerifier(SECRET, cache_size=2)
+        tokens = [create_token(SECRET, {'uid': str(i)}, {'expires': 1400000100}) for i in range(3)]
+        for token in tokens:
+            verifier.verify_token(token)
+        self.assertEqual(len(verifier._verified), 2)
+        self.assertEqual(verifier.verify_token(tokens[2])['d'], {'uid': '2'})
+        # A token with a cached signature but other claims is verified again.
+        header, claims, signature = tokens[2].split('.')
+        forged = '.'.join([header, tokens[1].split('.')[1], signature])
+        self.assertRaises(InvalidTokenError, verifier.verify_token, forged)
+
+        FrozenTime.now = 1400000200
+        try:
+            self.assertRaises(InvalidTokenError, verifier.verify_token, tokens[2])
+        finally:
+            del FrozenTime.now
+        self.assertEqual(len(verifier._verified), 1)
@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from wilddog.wal import WriteAheadLog, WriteAheadLogFull
+from wilddog.wilddog import WilddogApplication
+
+from .wilddog_test import MockConnectionPool, MockResponse
+
+
+class FlakyConnection(object):
+    def __init__(self):
+        self.headers = {}
+        self.down = False
+        # number of requests answered before going down, if set
+        self.budget = None
+        self.refused = set()
+        self.attempts = 0
+        self.requests = []
+        # cleared to hold requests until it is set
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+
+    def _send(self, method, url, data=None):
+        self.attempts += 1
+        self.entered.set()
+        self.gate.wait(5)
+        if self.budget == 0:
+            self.down = True
+        if self.down:
+            raise requests.ConnectionError('unreachable')
+        if self.budget is not None:
+            self.budget -= 1
+        self.requests.append((method, url, json.loads(data) if data else None))
+        if url in self.refused:
+            return MockResponse(400, '{"error": "refused"}')
+        return MockResponse(200, '{}')
+
+    def put(self, url, data, params, headers, *args, **kwargs):
+        return self._send('PUT', url, data)
+
+    def patch(self, url, data, params, headers, *args, **kwargs):
+        return self._send('PATCH', url, data)
+
+    def post(self, url, data, params, headers, *args, **kwargs):
+        return self._send('POST', url, data)
+
+    def delete(self, url, params, headers, *args, **kwargs):
+        return self._send('DELETE', url)
+
+
+class WriteAheadLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'wilddog.wal')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_survives_reopen(self):
+        wal = WriteAheadLog(self.path, sync=False)
+        first = wal.append('PUT', '/a', 1)
+        wal.append('PATCH', '/b', {'x': 1})
+        wal.ack(first)
+        wal.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'{"seq": 3, "meth')
+        wal = WriteAheadLog(self.path, sync=False)
+        self.assertEqual(wal.pending(), [(2, 'PATCH', '/b', {'x': 1})])
+        self.assertEqual(wal.append('DELETE', '/c'), 3)
+        wal.ack(3)
+        self.assertEqual(len(wal), 0)
+        self.assertEqual(os.path.getsize(self.path), 0)
+        wal.close()
+
+    def test_compaction(self):
+        wal = WriteAheadLog(self.path, sync=False)
+        wal.append('PUT', '/users/1/name', 'John')
+        wal.append('POST', '/users/1/logins', {'at': 1})
+        wal.append('PATCH', '/users', {'2': 'Jane'})
+        wal.append('PUT', '/users/1', {'name': 'Johnny'})
+        wal.compact()
+        self.assertEqual([entry[0] for entry in wal.pending()], [3, 4])
+        wal.close()
+        wal = WriteAheadLog(self.path, max_bytes=os.path.getsize(self.path) + 10, sync=False)
+        self.assertEqual(len(wal), 2)
+        self.assertRaises(WriteAheadLogFull, wal.append, 'PUT', '/users/3', 'a long enough value')
+        wal.close()
+
+    def test_outage_is_buffered_and_replayed(self):
+        connection = FlakyConnection()
+        wal = WriteAheadLog(self.path, sync=False)
+        app = WilddogApplication('https://scm.wilddogio.com', wal=wal,
+                                 connection_pool=MockConnectionPool(connection))
+        connection.down = True
+        self.assertEqual(app.put('/users/1', 'name', 'John'), None)
+        self.assertEqual(app.patch('/users/1', {'age': 30}), None)
+        app.post('/logs', {'event': 'login'})
+        self.assertEqual(len(wal), 3)
+        connection.down = False
+        app.delete('/users', '2')
+        self.assertEqual(connection.requests, [
+            ('PATCH', 'https://scm.wilddogio.com/users/1/.json', {'name': 'John', 'age': 30}),
+            ('POST', 'https://scm.wilddogio.com/logs/.json', {'event': 'login'}),
+            ('DELETE', 'https://scm.wilddogio.com/users/2.json', None)])
+        self.assertEqual(len(wal), 0)
+        self.assertEqual(app.put('/users/1', 'name', 'Jane'), {})
+        app.close()
+
+    def test_own_write_is_answered_after_backlog(self):
+        connection = FlakyConnection()
+        wal = WriteAheadLog(self.path, sync=False)
+        app = WilddogApplication('https://scm.wilddogio.com', wal=wal,
+                                 connection_pool=MockConnectionPool(connection))
+        connection.down = True
+        app.put('/users/1', 'name', 'John')
+        connection.down = False
+        connection.refused.add('https://scm.wilddogio.com/users/2.json')
+        self.assertRaises(Exception, app.put, '/users', '2', 'Jane')
+        self.assertEqual(list(wal.rejected), [])
+        self.assertEqual(len(wal), 0)
+        connection.down = True
+        app.put('/users/1', 'name', 'Johnny')
+        connection.down = False
+        self.assertEqual(app.put('/users', '3', 'Jack'), {})
+        self.assertEqual(connection.requests[-2:], [
+            ('PATCH', 'https://scm.wilddogio.com/users/1/.json', {'name': 'Johnny'}),
+            ('PUT', 'https://scm.wilddogio.com/users/3.json', 'Jack')])
+        app.close()
+
+    def test_replay_stops_at_first_outage(self):
+        connection = FlakyConnection()
+        wal = WriteAheadLog(self.path, sync=False)
+        app = WilddogApplication('https://scm.wilddogio.com', wal=wal,
+                                 connection_pool=MockConnectionPool(connection))
+        for path, value in (('/a', 1), ('/a/b', 2), ('/a/b/c', 3)):
+            wal.append('PUT', path, value)
+        connection.budget = 1
+        self.assertRaises(requests.ConnectionError, app.replay_writes)
+        self.assertEqual(connection.requests, [
+            ('PATCH', 'https://scm.wilddogio.com/.json', {'a': 1})])
+        self.assertEqual(connection.attempts, 2)
+        self.assertEqual(len(wal), 3)
+        connection.down, connection.budget = False, None
+        self.assertEqual(app.replay_writes(), 3)
+        self.assertEqual(len(wal), 0)
+        app.close()
+
+    def test_replay_skips_writes_in_flight(self):
+        connection = FlakyConnection()
+        wal = WriteAheadLog(self.path, sync=False)
+        app = WilddogApplication('https://scm.wilddogio.com', wal=wal,
+                                 connection_pool=MockConnectionPool(connection))
+        connection.gate.clear()
+        thread = threading.Thread(target=app.post, args=('/logs', {'event': 'login'}))
+        thread.start()
+        self.assertTrue(connection.entered.wait(5))
+        self.assertEqual(app.replay_writes(), 0)
+        connection.gate.set()
+        thread.join(5)
+        self.assertEqual(connection.requests, [
+            ('POST', 'https://scm.wilddogio.com/logs/.json', {'event': 'login'})])
+        self.assertEqual(len(wal), 0)
+        app.close()
+
+    def test_discard_survives_reopen(self):
+        wal = WriteAheadLog(self.path, sync=False)
+        wal.append('PUT', '/a', 1)
+        second = wal.append('PUT', '/b', 2)
+        wal.discard(second)
+        wal.close()
+        wal = WriteAheadLog(self.path, sync=False)
+        self.assertEqual(wal.pending(), [(1, 'PUT', '/a', 1)])
+        wal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,12 @@
 import unittest
 import os
 import json
+import time
+from contextlib import contextmanager
 
-from wilddog.wilddog import (WilddogAuthentication, WilddogApplication,
+from wilddog.executors import ThreadPoolBackend
+from wilddog.token_cache import TokenCache
+from wilddog.wilddog import (WilddogAuthentication, WilddogApplication, PreconditionFailed,
                              make_get_request, make_post_request, make_put_request,
                              make_patch_request, make_delete_request)
 
@@ -28,15 +32,48 @@ class MockConnection(object):
         return self.response
 
 
+class MockConnectionPool(object):
+    def __init__(self, connection):
+        self.connection_obj = connection
+        self.checkouts = []
+
+    @contextmanager
+    def connection(self, url):
+        self.checkouts.append(url)
+        yield self.connection_obj
+
+    def acquire(self, url):
+        self.checkouts.append(url)
+        return self.connection_obj
+
+    def release(self, url, connection):
+        pass
+
+    def configure(self, **settings):
+        for name, value in settings.items():
+            setattr(self.connection_obj, name, value)
+
+    def close(self):
+        pass
+
+
 class MockResponse(object):
-    def __init__(self, status_code, content):
+    def __init__(self, status_code, content, headers=None):
         self.status_code = status_code
         self.content = content
+        self.headers = headers or {}
 
     @property
     def ok(self):
         return str(self.status_code).startswith('2')
 
+    def iter_content(self, chunk_size):
+        content = self.content.encode('utf-8')
+        return (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+
+    def close(self):
+        pass
+
     def json(self):
         if self.content:
             return json.loads(self.content)
@@ -63,6 +100,31 @@ class WilddogTestCase(unittest.TestCase):
         url2 = os.path.join(self.DSN, 'users/1/.json')
         self.assertEqual(self.wilddog._build_endpoint_url('/users/1', None), url2)
 
+    def test_token_cache(self):
+        first = self.authentication.get_user().wilddog_auth_token
+        second = self.authentication.get_user().wilddog_auth_token
+        self.assertTrue(first is second)
+        self.authentication.extra = {'uid': '456'}
+        self.assertNotEqual(self.authentication.get_user().wilddog_auth_token, first)
+
+    def test_token_cache_refresh(self):
+        cache = self.authentication.token_cache
+        first = cache.get(self.SECRET, {'uid': '123'})
+        key = list(cache._tokens)[0]
+        cache._tokens[key] = (first, int(time.time()) + cache.refresh_margin)
+        self.assertFalse(cache.get(self.SECRET, {'uid': '123'}) is first)
+
+    def test_token_cache_bounded(self):
+        cache = TokenCache(max_entries=2)
+        first = cache.get(self.SECRET, {'uid': '1'})
+        cache.get(self.SECRET, {'uid': '2'})
+        self.assertTrue(cache.get(self.SECRET, {'uid': '1'}) is first)
+        cache.get(self.SECRET, {'uid': '3'})
+        self.assertEqual(len(cache._tokens), 2)
+        # uid 2 was the least recently used.
+        self.assertEqual(sorted(key[1] for key in cache._tokens),
+                         [(('uid', '1'),), (('uid', '3'),)])
+
     def test_make_get_request(self):
         response = MockResponse(403, json.dumps({'error': 'Permission required.'}))
         connection = MockConnection(response)
@@ -98,6 +160,60 @@ class WilddogTestCase(unittest.TestCase):
                                      connection=connection)
         self.assertEqual(result, json.loads(response.content))
 
+    def test_get_with_etag(self):
+        response = MockResponse(200, json.dumps(3), {'ETag': '"abc"'})
+        result = self.wilddog.get_with_etag('/counters', 'visits', connection=MockConnection(response))
+        self.assertEqual(result, (3, '"abc"'))
+
+    def test_conditional_put(self):
+        connection = MockConnection(MockResponse(200, json.dumps(4)))
+        self.assertEqual(self.wilddog.put('/counters', 'visits', 4, if_match='"abc"',
+                                          connection=connection), 4)
+        connection = MockConnection(MockResponse(412, json.dumps(5), {'ETag': '"def"'}))
+        try:
+            self.wilddog.put('/counters', 'visits', 4, if_match='"abc"', connection=connection)
+            self.fail('PreconditionFailed not raised')
+        except PreconditionFailed as e:
+            self.assertEqual((e.etag, e.value), ('"def"', 5))
+
+    def test_get_stream(self):
+        response = MockResponse(200, json.dumps({'1': {'name': 'John'}, '2': {'name': 'Jane'}}))
+        wilddog = WilddogApplication(self.DSN, self.authentication,
+                                     connection_pool=MockConnectionPool(MockConnection(response)))
+        self.assertEqual(dict(wilddog.get_stream('/users', chunk_size=4)),
+                         {'1': {'name': 'John'}, '2': {'name': 'Jane'}})
+        self.assertEqual(sorted(wilddog.get_stream('/users', leaves=True)),
+                         [(('1', 'name'), 'John'), (('2', 'name'), 'Jane')])
+
+    def test_async_request(self):
+        response = MockResponse(200, json.dumps({'1': 'John Doe'}))
+        pool = MockConnectionPool(MockConnection(response))
+        wilddog = WilddogApplication(self.DSN, self.authentication, connection_pool=pool,
+                                     executor=ThreadPoolBackend(size=2))
+        results = []
+        future = wilddog.get_async('/users', None, callback=results.append)
+        self.assertEqual(future.result(), {'1': 'John Doe'})
+        wilddog.close()
+        self.assertEqual(results, [{'1': 'John Doe'}])
+        self.assertEqual(pool.checkouts, [self.DSN + '/users/.json'])
+
+    def test_async_request_error(self):
+        pool = MockConnectionPool(MockConnection(MockResponse(500, '')))
+        wilddog = WilddogApplication(self.DSN, self.authentication, connection_pool=pool)
+        results = []
+        future = wilddog.delete_async('/users', '1', callback=results.append)
+        self.assertRaises(Exception, future.result)
+        wilddog.close()
+        self.assertEqual(results, [])
+
+    def test_get_many(self):
+        pool = MockConnectionPool(MockConnection(MockResponse(200, json.dumps({'name': 'x'}))))
+        wilddog = WilddogApplication(self.DSN, self.authentication, connection_pool=pool)
+        results = wilddog.get_many(['/users/2', '/users/1'], concurrency=2)
+        self.assertEqual(list(results), ['/users/2', '/users/1'])
+        self.assertEqual(results['/users/1'].value, {'name': 'x'})
+        self.assertEqual(pool.checkouts, [self.DSN, self.DSN])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,123 @@
+import threading
+import unittest
+
+from wilddog.writequeue import WriteQueue, WriteQueueFull, _coalesce
+
+from .bulk_test import MockApplication
+
+
+class PostingApplication(MockApplication):
+    def __init__(self, fail_on=None):
+        super(PostingApplication, self).__init__(fail_on)
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _patch_raw(self, url, data, deadline=None):
+        self.gate.wait()
+        super(PostingApplication, self)._patch_raw(url, data, deadline)
+
+    def post(self, url, data):
+        self.requests.append(('POST', url, data))
+
+
+class WriteQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = PostingApplication()
+        self.queue = WriteQueue(self.app, workers=1, flush_interval=1)
+
+    def tearDown(self):
+        self.app.gate.set()
+        self.queue.close(1)
+
+    def test_coalesce(self):
+        ops = [('PUT', '/a', {'x': 1, 'y': 2}),
+               ('PATCH', '/a', {'y': None, 'z': 3}),
+               ('PATCH', '/b', {'x': 1}),
+               ('PATCH', '/b', {'y': 2}),
+               ('PUT', '/c', 1),
+               ('DELETE', '/c', None),
+               ('POST', '/d', 1),
+               ('POST', '/d', 2)]
+        self.assertEqual(_coalesce(ops), [('PUT', '/a', {'x': 1, 'z': 3}),
+                                          ('PATCH', '/b', {'x': 1, 'y': 2}),
+                                          ('DELETE', '/c', None),
+                                          ('POST', '/d', 1),
+                                          ('POST', '/d', 2)])
+
+    def test_coalesce_keeps_overwritten_keys_last(self):
+        merged = _coalesce([('PATCH', '/p', {'a': 1, 'a/b': 2}), ('PATCH', '/p', {'a': 3})])
+        self.assertEqual(merged, [('PATCH', '/p', {'a/b': 2, 'a': 3})])
+        self.assertEqual(list(merged[0][2]), ['a/b', 'a'])
+
+    def test_flush_sends_one_request(self):
+        for i in range(100):
+            self.queue.enqueue('PATCH', '/telemetry/device', {'reading': i})
+        self.queue.enqueue('PUT', '/telemetry/status', 'ok')
+        self.assertTrue(self.queue.flush(5))
+        self.assertEqual(self.app.requests, [('/telemetry', {'device/reading': 99,
+                                                             'status': 'ok'})])
+        self.assertEqual(self.queue.sent, 101)
+
+    def test_posts_keep_their_order(self):
+        self.queue.enqueue('PUT', '/events/last', 1)
+        self.queue.enqueue('POST', '/events', {'n': 1})
+        self.queue.enqueue('PUT', '/events/last', 2)
+        self.queue.flush(5)
+        self.assertEqual(self.app.requests, [('/events', {'last': 1}),
+                                             ('POST', '/events', {'n': 1}),
+                                             ('/events', {'last': 2})])
+
+    def test_root_writes_are_ordered(self):
+        queue = WriteQueue(self.app, workers=4, flush_interval=0)
+        self.app.gate.clear()
+        queue.enqueue('PUT', '/a/x', 1)
+        queue.enqueue('PATCH', '/', {'a/x': 2, 'b/y': 2})
+        queue.enqueue('PUT', '/b/y', 3)
+        self.app.gate.set()
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(self.app.requests, [('/a', {'x': 1}),
+                                             ('/', {'a/x': 2, 'b/y': 2}),
+                                             ('/b', {'y': 3})])
+        self.assertEqual(queue.sent, 3)
+        queue.close(5)
+
+    def test_backpressure(self):
+        queue = WriteQueue(self.app, max_pending=2, workers=1, flush_interval=0, block=False)
+        self.app.gate.clear()
+        queue.enqueue('PUT', '/a', 1)
+        queue.enqueue('PUT', '/b', 2)
+        self.assertRaises(WriteQueueFull, queue.enqueue, 'PUT', '/c', 3)
+        self.app.gate.set()
+        self.assertTrue(queue.flush(5))
+        queue.enqueue('PUT', '/c', 3)
+        queue.close(5)
+
+    def test_errors(self):
+        app = PostingApplication(fail_on='/a')
+        queue = WriteQueue(app, workers=1, flush_interval=0)
+        queue.enqueue('PUT', '/a/b', 1)
+        queue.close(5)
+        self.assertEqual([(e.path, str(e.error)) for e in queue.errors], [('/a/b', 'Fake HTTP Error')])
+        self.assertEqual(queue.sent, 0)
+
+    def test_worker_survives_bad_writes(self):
+        failures = []
+
+        def on_error(result):
+            failures.append(result.path)
+            raise RuntimeError('callback failed')
+
+        queue = WriteQueue(self.app, workers=1, flush_interval=0, on_error=on_error)
+        self.assertRaises(ValueError, queue.enqueue, 'PATCH', '/a', 5)
+        queue.enqueue('PUT', '/a', object())
+        self.assertTrue(queue.flush(5))
+        queue.enqueue('PUT', '/b', 1)
+        self.assertTrue(queue.flush(5))
+        queue.close(5)
+        self.assertEqual(failures, ['/a'])
+        self.assertEqual(self.app.requests, [('/', {'b': 1})])
+        self.assertEqual(queue.sent, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,30 @@
 import atexit
+import importlib
+import sys
 
-from .async import process_pool
-from wilddog import *
+__all__ = ['WilddogAuthentication', 'WilddogApplication', 'PreconditionFailed']
+
+# ``async`` is a keyword on Python 3.7+, hence import_module.
+if sys.version_info < (3, 7):
+    process_pool = importlib.import_module('.async', __name__).process_pool
+    from .wilddog import *
+else:
+    def __getattr__(name):
+        # The client, requests and multiprocessing are imported on first use.
+        if name in __all__:
+            from . import wilddog
+            return getattr(wilddog, name)
+        if name == 'process_pool':
+            return importlib.import_module('.async', __name__).process_pool
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 @atexit.register
 def close_process_pool():
     """
-    Clean up function that closes and terminates the process pool
-    defined in the ``async`` file.
+    Clean up function that closes the process pool defined in the ``async``
+    file, unless it was never created.
     """
-    process_pool.close()
-    process_pool.join()
-    process_pool.terminate()
+    module = sys.modules.get(__name__ + '.async')
+    if module is not None:
+        module.close_process_pool()
@@ -0,0 +1,160 @@
+"""
+asyncio 版本的 Wilddog 客户端，需要 Python 3.5+ 以及 aiohttp：
+    pip install wilddog-python[asyncio]
+"""
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .jsonutil import get_serializer
+from .wilddog import WilddogApplication
+
+__all__ = ['AsyncWilddogApplication']
+
+
+class AsyncWilddogApplication(object):
+    """
+    WilddogApplication 的 asyncio 版本，提供相同的 get/put/post/patch/delete 接口，
+    每个方法都是一个可以 await 的协程。同时进行中的请求数由 ``concurrency`` 限制，
+    ``timeout`` 是每次调用的超时时间（秒），超时或取消时请求会被中断。
+    指定 ``rate_limiter`` 时，请求发出前会以 ``asyncio.sleep`` 等待令牌，不会阻塞事件循环；
+    令牌保存在文件等会阻塞的存储中时，取令牌在线程池中进行。
+    auth = WilddogAuthentication(WILDDOG_SECRET, 'wilddog@wilddog.com', extra={'uid': '1'})
+    async with AsyncWilddogApplication('https://wilddog.localhost', auth) as wilddog:
+        users = await asyncio.gather(*[wilddog.get('/users', str(i)) for i in range(1000)])
+    """
+    NAME_EXTENSION = WilddogApplication.NAME_EXTENSION
+    URL_SEPERATOR = WilddogApplication.URL_SEPERATOR
+    HEADERS = WilddogApplication.HEADERS
+
+    def __init__(self, dsn, authentication=None, concurrency=100, timeout=60,
+                 session=None, serializer=None, rate_limiter=None):
+        assert dsn.startswith('https://'), 'DSN must be a secure URL'
+        if aiohttp is None and session is None:
+            raise ImportError("AsyncWilddogApplication requires aiohttp.")
+        self.token = None
+        self.dsn = dsn
+        self.authentication = authentication
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.serializer = serializer or get_serializer()
+        self.rate_limiter = rate_limiter
+        self._session = session
+        self._semaphore = None
+
+    set_token = WilddogApplication.set_token
+    _build_endpoint_url = WilddogApplication._build_endpoint_url
+    _authenticate = WilddogApplication._authenticate
+
+    def _get_session(self):
+        # 会话与信号量必须在事件循环中创建，因此延迟到第一次请求时
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers={'Content-type': 'application/json'})
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self):
+        """
+        关闭底层的 HTTP 会话及其连接池。
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _send(self, session, method, endpoint, params, headers, data):
+        async with session.request(method, endpoint, params=params,
+                                   headers=headers, data=data) as response:
+            if response.status < 400 or response.status == 403:
+                content = await response.read()
+                return self.serializer.loads(content) if content else None
+            else:
+                response.raise_for_status()
+
+    async def _request(self, method, endpoint, params, headers, data=None,
+                       timeout=None):
+        session = self._get_session()
+        if self.rate_limiter is not None:
+            if self.rate_limiter.blocking:
+                delay = await asyncio.get_event_loop().run_in_executor(
+                    None, self.rate_limiter.reserve, endpoint)
+            else:
+                delay = self.rate_limiter.reserve(endpoint)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with self._semaphore:
+            return await asyncio.wait_for(
+                self._send(session, method, endpoint, params, headers, data),
+                self.timeout if timeout is None else timeout)
+
+    async def get(self, url, name, params=None, headers=None, timeout=None):
+        """
+        异步 GET。
+        """
+        if name is None: name = ''
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, name)
+        self._authenticate(params, headers)
+        return await self._request('GET', endpoint, params, headers,
+                                   timeout=timeout)
+
+    async def put(self, url, name, data, params=None, headers=None, timeout=None):
+        """
+        异步 PUT。``data``必须是一个 JSON 对象。
+        """
+        assert name, 'Snapshot name must be specified'
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, name)
+        self._authenticate(params, headers)
+        data = self.serializer.dumps(data)
+        return await self._request('PUT', endpoint, params, headers, data,
+                                   timeout=timeout)
+
+    async def post(self, url, data, params=None, headers=None, timeout=None):
+        """
+        异步 POST。``data``必须是一个 JSON 对象。
+        """
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, None)
+        self._authenticate(params, headers)
+        data = self.serializer.dumps(data)
+        return await self._request('POST', endpoint, params, headers, data,
+                                   timeout=timeout)
+
+    async def patch(self, url, data, params=None, headers=None, timeout=None):
+        """
+        异步 PATCH。``data``必须是一个 JSON 对象。
+        """
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, None)
+        self._authenticate(params, headers)
+        data = self.serializer.dumps(data)
+        return await self._request('PATCH', endpoint, params, headers, data,
+                                   timeout=timeout)
+
+    async def delete(self, url, name, params=None, headers=None, timeout=None):
+        """
+        异步 DELETE。
+        """
+        if not name: name = ''
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, name)
+        self._authenticate(params, headers)
+        return await self._request('DELETE', endpoint, params, headers,
+                                   timeout=timeout)
@@ -1,17 +1,53 @@
 import multiprocessing
 
-from .lazy import LazyLoadProxy
+from .lazy import LazyInstance, LazyLoadProxy
 
-__all__ = ['process_pool']
+__all__ = ['process_pool', 'get_process_pool', 'resize_process_pool',
+           'replace_process_pool', 'close_process_pool']
 
-_process_pool = None
+_pool_size = 5
+_process_pool = LazyInstance(lambda: multiprocessing.Pool(processes=_pool_size))
 
 
-def get_process_pool(size=5):
-    global _process_pool
-    if _process_pool is None:
-        _process_pool = multiprocessing.Pool(processes=size)
-    return _process_pool
+def get_process_pool(size=None):
+    """
+    Returns the shared pool, creating it with ``size`` processes (5 by
+    default) on first use.
+    """
+    global _pool_size
+    if size is not None and not _process_pool.created:
+        _pool_size = size
+    return _process_pool.get()
+
+
+def replace_process_pool(pool):
+    """
+    Makes ``pool`` the shared pool. The previous one stops taking work and
+    is closed once its pending tasks are done.
+    """
+    old = _process_pool.replace(pool)
+    if old is not None and old is not pool:
+        old.close()
+
+
+def resize_process_pool(size):
+    """
+    Replaces the shared pool with one of ``size`` processes.
+    """
+    global _pool_size
+    _pool_size = size
+    replace_process_pool(multiprocessing.Pool(processes=size) if _process_pool.created else None)
+
+
+def close_process_pool():
+    """
+    Closes the shared pool and waits for its workers, if it was created in
+    this process.
+    """
+    pool = _process_pool.replace(None)
+    if pool is not None:
+        pool.close()
+        pool.join()
 
 
 process_pool = LazyLoadProxy(get_process_pool)
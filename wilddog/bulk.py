@@ -0,0 +1,176 @@
+import json
+from collections import namedtuple, OrderedDict
+
+__all__ = ['BulkResult', 'WriteBatch', 'iter_reads']
+
+BulkResult = namedtuple('BulkResult', ['path', 'value', 'error'])
+
+
+def _split_path(path):
+    return tuple(part for part in path.split('/') if part)
+
+
+def _common_ancestor(paths):
+    """
+    Returns the longest common prefix of ``paths`` that is a strict ancestor
+    of every one of them, so that no relative key ends up empty.
+    """
+    ancestor = min(paths, key=len)[:-1]
+    for path in paths:
+        i = 0
+        while i < len(ancestor) and path[i] == ancestor[i]:
+            i += 1
+        ancestor = ancestor[:i]
+    return ancestor
+
+
+class _Group(object):
+    """
+    Writes that can go out in the same multi-location PATCH, i.e. none of
+    their paths is an ancestor of another one.
+    """
+
+    def __init__(self):
+        self.writes = OrderedDict()
+        self._prefixes = set()
+
+    def conflicts(self, path):
+        if path in self._prefixes and path not in self.writes:
+            return True
+        return any(path[:i] in self.writes for i in range(len(path)))
+
+    def add(self, path, value):
+        self.writes[path] = value
+        for i in range(1, len(path) + 1):
+            self._prefixes.add(path[:i])
+
+
+class WriteBatch(object):
+    """
+    Collects writes to many paths and sends them as a handful of
+    multi-location PATCH requests instead of one round-trip per path.
+    Writes are merged under their common ancestor; a later write to the same
+    path replaces the earlier one, while a write to an ancestor or descendant
+    of a pending path starts a new request so that ordering is kept. Request
+    bodies larger than ``max_body_size`` bytes are split. Every request of the
+    batch is bounded by the same ``deadline``, if given.
+    with wilddog.batch() as batch:
+        batch.put('/users/1/name', 'John Doe')
+        batch.update('/users/2', {'name': 'Jane Doe', 'age': 30})
+    batch.results => OrderedDict([('/users/1/name', BulkResult(...)), ...])
+    """
+
+    def __init__(self, app, max_body_size=1 << 20, deadline=None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.deadline = deadline
+        self.results = None
+        self._groups = [_Group()]
+
+    def __len__(self):
+        return sum(len(group.writes) for group in self._groups)
+
+    def put(self, path, value):
+        """
+        Sets the node at ``path`` to ``value``.
+        """
+        parts = _split_path(path)
+        if not parts:
+            raise ValueError("the root node can not be written in a batch.")
+        group = self._groups[-1]
+        if group.conflicts(parts):
+            group = _Group()
+            self._groups.append(group)
+        group.add(parts, value)
+
+    def update(self, path, data):
+        """
+        Sets every child of ``path`` named in ``data``, like ``patch``.
+        """
+        for key, value in data.items():
+            self.put('%s/%s' % (path.rstrip('/'), key), value)
+
+    def delete(self, path):
+        self.put(path, None)
+
+    def _chunks(self, group):
+        chunk, size = [], 2
+        for path, value in group.writes.items():
+            encoded = self.app.serializer.dumps(value)
+            entry_size = len(encoded) + sum(len(p) + 1 for p in path) + 4
+            if chunk and size + entry_size > self.max_body_size:
+                yield chunk
+                chunk, size = [], 2
+            chunk.append((path, value, encoded))
+            size += entry_size
+        if chunk:
+            yield chunk
+
+    def _send(self, chunk):
+        ancestor = _common_ancestor([path for path, _, _ in chunk])
+        body = b'{' + b','.join(json.dumps('/'.join(path[len(ancestor):])).encode('utf-8') +
+                                b':' + encoded for path, _, encoded in chunk) + b'}'
+        self.app._patch_raw('/' + '/'.join(ancestor), body, deadline=self.deadline)
+
+    def commit(self, stop_on=None):
+        """
+        Sends every pending write and returns an ordered mapping of path to
+        ``BulkResult``. A failing request does not abort the batch; its
+        exception is reported on each of its paths. If ``stop_on(error)`` is
+        true for a failure, the requests after it are not sent and their
+        paths are left out of the results.
+        """
+        results = OrderedDict()
+        groups, self._groups = self._groups, [_Group()]
+        for group in groups:
+            for chunk in self._chunks(group):
+                try:
+                    self._send(chunk)
+                    error = None
+                except Exception as e:
+                    error = e
+                for path, value, _ in chunk:
+                    key = '/' + '/'.join(path)
+                    results[key] = BulkResult(key, None if error else value, error)
+                if error is not None and stop_on is not None and stop_on(error):
+                    self.results = results
+                    return results
+        self.results = results
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+
+def iter_reads(app, paths, concurrency=10, params=None, deadline=None):
+    """
+    Fetches ``paths`` with ``app.get`` on up to ``concurrency`` threads and
+    yields a ``BulkResult`` per path in completion order. Errors are captured
+    on the result instead of aborting the remaining reads. Reads not yet
+    started are cancelled when the generator is closed early. All the reads
+    share ``deadline``; those still pending when it passes fail with
+    ``DeadlineExceeded``.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    futures = {}
+    try:
+        for path in OrderedDict.fromkeys(paths):
+            future = executor.submit(app.get, path, None, dict(params or {}),
+                                     deadline=deadline)
+            futures[future] = path
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield BulkResult(path, future.result(), None)
+            except Exception as e:
+                yield BulkResult(path, None, e)
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
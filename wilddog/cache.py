@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+
+__all__ = ['ResponseCache']
+
+
+class ResponseCache(object):
+    """
+    In-process read-through cache for GET responses, keyed by endpoint URL and
+    query parameters. Entries are evicted least-recently-used first once
+    there are more than ``max_entries`` of them or they take up more than
+    ``max_bytes``, and expire ``ttl`` seconds after being stored. Expired
+    entries that carry an ETag are kept so they can be revalidated with a
+    conditional request instead of being downloaded again. Writes issued by
+    the client invalidate the written path together with its ancestors and
+    descendants.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 << 20, ttl=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(endpoint, params):
+        return endpoint, tuple(sorted(params.items()))
+
+    @staticmethod
+    def _node_path(endpoint):
+        if endpoint.endswith('.json'):
+            endpoint = endpoint[:-len('.json')]
+        return endpoint.rstrip('/')
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry[1])
+
+    def get(self, key):
+        """
+        Returns the cached body for ``key``, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.time():
+                if entry[3] is None:
+                    self._remove(key)
+                    self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.pop(key)
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def get_stale(self, key):
+        """
+        Returns ``(body, etag)`` of the entry for ``key`` whether it expired or
+        not, or ``(None, None)`` when there is no entry with an ETag.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] is None:
+                return None, None
+            return entry[1], entry[3]
+
+    def revalidate(self, key):
+        """
+        Marks the entry for ``key`` as fresh again after the server answered
+        304 Not Modified.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = (entry[0], entry[1], time.time() + self.ttl, entry[3])
+                self.revalidations += 1
+
+    def set(self, key, body, etag=None):
+        """
+        Stores ``body``, the serialized response of the endpoint in ``key``,
+        along with its ``etag`` if the server sent one.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._node_path(key[0]), body, time.time() + self.ttl, etag)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, endpoint):
+        """
+        Drops every entry for the node of ``endpoint``, its ancestors and its
+        descendants.
+        """
+        path = self._node_path(endpoint)
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                cached = entry[0]
+                if (cached == path or cached.startswith(path + '/') or
+                        path.startswith(cached + '/')):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'revalidations': self.revalidations,
+                    'entries': len(self._entries),
+                    'bytes': self._bytes}
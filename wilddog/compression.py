@@ -0,0 +1,63 @@
+import threading
+import zlib
+
+__all__ = ['compress', 'TransferStats']
+
+ENCODINGS = ('gzip', 'deflate')
+
+
+def compress(data, encoding='gzip'):
+    """
+    Compresses ``data`` for the given ``Content-Encoding``, ``gzip`` or
+    ``deflate`` (zlib stream).
+    """
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    elif encoding == 'deflate':
+        return zlib.compress(data, 6)
+    raise ValueError('Unsupported content encoding: %s' % encoding)
+
+
+class TransferStats(object):
+    """
+    Thread-safe counters of request and response bytes, both as they went
+    over the wire and after decompression.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.compressed_requests = 0
+        self.sent_logical = 0
+        self.sent_wire = 0
+        self.responses = 0
+        self.received_logical = 0
+        self.received_wire = 0
+        self._lock = threading.Lock()
+
+    def record_sent(self, logical, wire):
+        with self._lock:
+            self.requests += 1
+            if wire != logical:
+                self.compressed_requests += 1
+            self.sent_logical += logical
+            self.sent_wire += wire
+
+    def record_received(self, response):
+        logical = len(response.content or b'')
+        wire = response.headers.get('Content-Length')
+        wire = int(wire) if wire is not None else logical
+        with self._lock:
+            self.responses += 1
+            self.received_logical += logical
+            self.received_wire += wire
+
+    def snapshot(self):
+        with self._lock:
+            return {'requests': self.requests,
+                    'compressed_requests': self.compressed_requests,
+                    'sent_logical': self.sent_logical,
+                    'sent_wire': self.sent_wire,
+                    'responses': self.responses,
+                    'received_logical': self.received_logical,
+                    'received_wire': self.received_wire}
@@ -0,0 +1,42 @@
+import time
+
+import requests
+
+__all__ = ['Deadline', 'DeadlineExceeded']
+
+
+class DeadlineExceeded(requests.Timeout):
+    """
+    Raised instead of sending a request once its deadline has passed.
+    """
+
+
+class Deadline(object):
+    """
+    Point in time by which an operation, including its retries and every
+    sub-request of a batch, must be finished. Each request is sent with its
+    timeout cut down to the time left.
+    deadline = Deadline(2.5)
+    wilddog.get_many(paths, deadline=deadline)
+    """
+
+    def __init__(self, seconds):
+        self.expires = time.time() + seconds
+
+    def remaining(self):
+        return max(self.expires - time.time(), 0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def limit(self, timeout):
+        """
+        Returns ``timeout`` (seconds, a ``(connect, read)`` tuple or None)
+        capped to the time left. Raises ``DeadlineExceeded`` if there is none.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('Deadline exceeded')
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return remaining if timeout is None else min(timeout, remaining)
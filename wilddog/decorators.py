@@ -1,21 +1,56 @@
-import requests
 from functools import wraps
 
+_UNSET = object()
+
 
 def http_connection(timeout):
     """
     Decorator function that injects a requests.Session instance into
-    the decorated function's actual parameters if not given.
+    the decorated function's actual parameters if not given. When the
+    decorated function is a method of an object owning a ``connection_pool``,
+    the session is checked out of that pool and given back afterwards.
+
+    The request timeout (seconds or a ``(connect, read)`` tuple) is taken
+    from a ``timeout`` keyword argument, then from the ``timeout`` of a
+    session passed in by the caller, then from the ``timeout`` attribute of
+    the owning object, falling back to ``timeout``. A ``deadline`` keyword
+    argument is attached to the session for the duration of the call. Both
+    keyword arguments are consumed here and not passed on.
     """
     def wrapper(f):
         def wrapped(*args, **kwargs):
+            call_timeout = kwargs.pop('timeout', None)
+            deadline = kwargs.pop('deadline', None)
+            owner = args[0] if args else None
+            default = getattr(owner, 'timeout', None) or timeout
+            pool = None
             if not ('connection' in kwargs) or not kwargs['connection']:
-                connection = requests.Session()
+                pool = getattr(owner, 'connection_pool', None)
+                if pool is not None:
+                    connection = pool.acquire(owner.dsn)
+                else:
+                    import requests
+                    connection = requests.Session()
                 kwargs['connection'] = connection
+                previous = _UNSET
             else:
                 connection = kwargs['connection']
-            connection.timeout = timeout
+                # A session handed in keeps its own settings once the call is over.
+                previous = (getattr(connection, 'timeout', None),
+                            getattr(connection, 'deadline', None))
+                default = previous[0] or default
+            connection.timeout = call_timeout or default
+            if deadline is not None or previous is _UNSET:
+                connection.deadline = deadline
             connection.headers.update({'Content-type': 'application/json'})
-            return f(*args, **kwargs)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                if previous is _UNSET:
+                    connection.deadline = None
+                else:
+                    connection.timeout, connection.deadline = previous
+                if pool is not None:
+                    pool.release(owner.dsn, connection)
         return wraps(f)(wrapped)
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,147 @@
+import importlib
+import threading
+
+from .lazy import LazyInstance
+
+__all__ = ['ThreadPoolBackend', 'ProcessPoolBackend']
+
+
+def _add_callback(future, callback):
+    """
+    Feeds the result of ``future`` to ``callback`` once it succeeds, the way
+    ``multiprocessing.Pool.apply_async`` used to.
+    """
+    if callback is None:
+        return
+
+    def done(f):
+        if not f.cancelled() and f.exception() is None:
+            callback(f.result())
+
+    future.add_done_callback(done)
+
+
+class ThreadPoolBackend(object):
+    """
+    Runs the ``*_async`` requests on a pool of ``size`` threads. HTTP calls
+    are I/O bound, so threads avoid the fork and pickling costs of a process
+    pool and can share the client's keep-alive connection pool.
+    """
+
+    def __init__(self, size=10):
+        self.size = size
+        # Requests submitted and not finished yet.
+        self.pending = 0
+        self._executor = LazyInstance(self._create_executor)
+        self._lock = threading.Lock()
+
+    def _create_executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(max_workers=self.size)
+
+    @staticmethod
+    def _call(fn, args, connection_pool):
+        if connection_pool is None:
+            return fn(*args)
+        with connection_pool.connection(args[0]) as connection:
+            return fn(*args, connection=connection)
+
+    def submit(self, fn, args, callback=None, connection_pool=None):
+        """
+        Schedules ``fn(*args)`` and returns a ``concurrent.futures.Future``.
+        The first argument of ``fn`` must be the request URL; it is used to
+        check a connection out of ``connection_pool``.
+        """
+        executor = self._executor.get()
+        with self._lock:
+            self.pending += 1
+        try:
+            future = executor.submit(self._call, fn, args, connection_pool)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        _add_callback(future, callback)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    def resize(self, size):
+        """
+        Runs the requests submitted from now on on ``size`` threads; those
+        already submitted finish on the old ones.
+        """
+        self.size = size
+        executor = self._executor.replace(None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self, wait=True):
+        executor = self._executor.replace(None)
+        if executor is not None:
+            executor.shutdown(wait)
+
+
+def _call_capturing(fn, args):
+    # Runs in the child process; exceptions are sent back as values because
+    # ``apply_async`` has no error callback on Python 2.
+    try:
+        return True, fn(*args)
+    except Exception as e:
+        return False, e
+
+
+class ProcessPoolBackend(object):
+    """
+    Runs the ``*_async`` requests on a ``multiprocessing.Pool``, by default
+    the on-demand ``process_pool`` of the ``async`` module. Connections can
+    not be shared with the parent process, so each request opens its own.
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool
+        self._get_pool = None
+
+    @property
+    def pool(self):
+        if self._pool is not None:
+            return self._pool
+        if self._get_pool is None:
+            # ``async`` is a keyword on Python 3.7+, hence import_module.
+            self._get_pool = importlib.import_module('.async', __package__).get_process_pool
+        return self._get_pool()
+
+    def resize(self, size):
+        """
+        Replaces the pool with one of ``size`` processes; tasks already
+        submitted finish on the old one.
+        """
+        if self._pool is not None:
+            import multiprocessing
+            old, self._pool = self._pool, multiprocessing.Pool(processes=size)
+            old.close()
+        else:
+            importlib.import_module('.async', __package__).resize_process_pool(size)
+
+    def submit(self, fn, args, callback=None, connection_pool=None):
+        from concurrent.futures import Future
+
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        def done(outcome):
+            ok, value = outcome
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        self.pool.apply_async(_call_capturing, args=(fn, args), callback=done)
+        _add_callback(future, callback)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
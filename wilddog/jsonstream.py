@@ -0,0 +1,201 @@
+import codecs
+import re
+from json.decoder import scanstring
+
+__all__ = ['iter_events', 'iter_leaves', 'iter_items']
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_NUMBER_CHARS = re.compile(r'[-+0-9.eE]*')
+_STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+_LITERALS = (('true', True), ('false', False), ('null', None))
+
+
+def _scan(buf, pos, final):
+    """
+    Reads the token at ``pos``. Returns ``(kind, value, end)``, or None if the
+    token may continue past the end of ``buf`` and more data is expected.
+    """
+    c = buf[pos]
+    if c in '{}[]:,':
+        return c, None, pos + 1
+    if c == '"':
+        if _STRING_END.match(buf, pos + 1) is None:
+            if final:
+                raise ValueError('Unterminated string at %d' % pos)
+            return None
+        value, end = scanstring(buf, pos + 1)
+        return 'string', value, end
+    if c == '-' or c.isdigit():
+        # The number may go on in the next chunk unless something follows it.
+        if not final and _NUMBER_CHARS.match(buf, pos).end() == len(buf):
+            return None
+        match = _NUMBER.match(buf, pos)
+        if match is None:
+            raise ValueError('Invalid number at %d' % pos)
+        text = match.group()
+        if '.' in text or 'e' in text or 'E' in text:
+            return 'value', float(text), match.end()
+        return 'value', int(text), match.end()
+    for literal, value in _LITERALS:
+        if buf.startswith(literal, pos):
+            return 'value', value, pos + len(literal)
+        if not final and literal.startswith(buf[pos:]):
+            return None
+    raise ValueError('Unexpected character %r at %d' % (c, pos))
+
+
+def _tokens(chunks):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buf, pos = '', 0
+    chunks = iter(chunks)
+    final = False
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        token = _scan(buf, pos, final) if pos < len(buf) else None
+        if token is not None:
+            kind, value, pos = token
+            yield kind, value
+            continue
+        if final:
+            if pos < len(buf):
+                raise ValueError('Truncated JSON document')
+            return
+        buf = buf[pos:]
+        pos = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            final = True
+            buf += decoder.decode(b'', True)
+        else:
+            buf += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+
+def iter_events(chunks):
+    """
+    Parses a JSON document from an iterable of byte (or text) chunks and
+    yields ``(event, value)`` pairs: ``start_map``, ``end_map``,
+    ``start_array``, ``end_array``, ``key`` and ``value``. Only the current
+    token is kept in memory, however large the document. Raises ValueError
+    as soon as the document turns out to be malformed, including when it
+    ends before every object and array is closed.
+    """
+    # [container, what it expects next] for every open object and array
+    stack = []
+    done = False
+    for kind, value in _tokens(chunks):
+        if done:
+            raise ValueError('Extra data after the JSON document')
+        expect = stack[-1][1] if stack else 'value'
+        if expect == ':':
+            if kind != ':':
+                raise ValueError("Expected ':' after an object key")
+            stack[-1][1] = 'value'
+            continue
+        if expect == ',':
+            if kind == ',':
+                stack[-1][1] = 'key' if stack[-1][0] == 'map' else 'value'
+                continue
+            if kind != ('}' if stack[-1][0] == 'map' else ']'):
+                raise ValueError("Expected ',' or a closing bracket")
+        elif expect in ('key', 'first key'):
+            if kind == 'string':
+                stack[-1][1] = ':'
+                yield 'key', value
+                continue
+            if kind != '}' or expect != 'first key':
+                raise ValueError('Expected an object key')
+        elif kind == ']' and expect != 'first value':
+            raise ValueError('Unexpected %r' % kind)
+        if kind == '}' or kind == ']':
+            stack.pop()
+            yield 'end_map' if kind == '}' else 'end_array', None
+        elif kind == '{':
+            stack.append(['map', 'first key'])
+            yield 'start_map', None
+            continue
+        elif kind == '[':
+            stack.append(['array', 'first value'])
+            yield 'start_array', None
+            continue
+        elif kind == 'string' or kind == 'value':
+            yield 'value', value
+        else:
+            raise ValueError('Unexpected %r' % kind)
+        if stack:
+            stack[-1][1] = ','
+        else:
+            done = True
+    if not done:
+        raise ValueError('Truncated JSON document')
+
+
+def iter_leaves(chunks):
+    """
+    Yields ``(key_path, value)`` for every scalar and every empty object or
+    array of the document, ``key_path`` being the tuple of keys and indices
+    leading to it.
+    """
+    path = []
+    kinds = []
+    empty = False
+    for event, value in iter_events(chunks):
+        if event == 'key':
+            path[-1] = value
+            continue
+        if event == 'end_map' or event == 'end_array':
+            path.pop()
+            kinds.pop()
+            if empty:
+                yield tuple(path), {} if event == 'end_map' else []
+            empty = False
+            continue
+        if kinds and kinds[-1] == 'array':
+            path[-1] += 1
+        empty = False
+        if event == 'start_map':
+            kinds.append('map')
+            path.append(None)
+            empty = True
+        elif event == 'start_array':
+            kinds.append('array')
+            path.append(-1)
+            empty = True
+        else:
+            yield tuple(path), value
+
+
+def iter_items(chunks):
+    """
+    Yields the ``(key, value)`` children of the top-level object (or the
+    ``(index, value)`` items of a top-level array) one at a time, each fully
+    built, so memory use is bounded by the largest child rather than by the
+    whole document. A scalar document is yielded as ``(None, value)``.
+    """
+    stack = []
+    for event, value in iter_events(chunks):
+        if event == 'key':
+            stack[-1][1] = value
+            continue
+        if event == 'start_map' or event == 'start_array':
+            if stack and isinstance(stack[-1][0], list):
+                stack[-1][1] += 1
+            stack.append([{} if event == 'start_map' else [], -1 if event == 'start_array' else None])
+            continue
+        if event == 'end_map' or event == 'end_array':
+            value = stack.pop()[0]
+            if not stack:
+                # Read on to the end so that trailing garbage is reported.
+                continue
+        elif stack and isinstance(stack[-1][0], list):
+            stack[-1][1] += 1
+        if not stack:
+            yield None, value
+        elif len(stack) == 1:
+            yield stack[0][1], value
+        else:
+            container, key = stack[-1]
+            if isinstance(container, list):
+                container.append(value)
+            else:
+                container[key] = value
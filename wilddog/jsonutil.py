@@ -2,19 +2,82 @@ import datetime
 import json
 import decimal
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = ['JSONEncoder', 'JSONSerializer', 'OrjsonSerializer', 'get_serializer']
+
 try:
     total_seconds = datetime.timedelta.total_seconds
 except AttributeError:
     total_seconds = lambda self: ((self.days * 86400 + self.seconds) * 10 ** 6 + self.microseconds) / 10 ** 6.0
 
 
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    elif isinstance(obj, datetime.timedelta):
+        return total_seconds(obj)
+    elif isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError('%r is not JSON serializable' % (obj,))
+
+
 class JSONEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, (datetime.datetime, datetime.date)):
-            return obj.isoformat()
-        elif isinstance(obj, datetime.timedelta):
-            return total_seconds(obj)
-        elif isinstance(obj, decimal.Decimal):
-            return float(obj)
-        else:
+        try:
+            return _default(obj)
+        except TypeError:
             return json.JSONEncoder.default(self, obj)
+
+
+class JSONSerializer(object):
+    """
+    Serializer based on the standard library ``json`` module and
+    ``JSONEncoder``. ``dumps`` returns UTF-8 encoded bytes that can be handed
+    to ``requests`` as the request body without another copy.
+    """
+
+    def dumps(self, obj):
+        return json.dumps(obj, cls=JSONEncoder).encode('utf-8')
+
+    def loads(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonSerializer(object):
+    """
+    Serializer based on the C-backed ``orjson`` library. Datetimes, dates,
+    timedeltas and decimals are converted exactly as ``JSONEncoder`` does;
+    values orjson can not encode (such as integers wider than 64 bits) fall
+    back to ``JSONSerializer``. Documents are decoded by ``JSONSerializer``:
+    orjson turns integers wider than 64 bits into floats, and looking for
+    them first costs more than the C-accelerated stdlib decoder.
+    """
+
+    def __init__(self):
+        self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        self.fallback = JSONSerializer()
+
+    def dumps(self, obj):
+        try:
+            return orjson.dumps(obj, default=_default, option=self.options)
+        except TypeError:
+            return self.fallback.dumps(obj)
+
+    def loads(self, data):
+        return self.fallback.loads(data)
+
+
+def get_serializer():
+    """
+    Returns the fastest serializer available: ``OrjsonSerializer`` when
+    orjson is installed, ``JSONSerializer`` otherwise.
+    """
+    if orjson is not None:
+        return OrjsonSerializer()
+    return JSONSerializer()
@@ -1,3 +1,64 @@
+import os
+import threading
+
+
+class LazyInstance(object):
+    """
+    Creates ``factory()`` on the first ``get`` and returns that same object
+    afterwards, without the per-access indirection of ``LazyLoadProxy``:
+    callers bind ``get`` once and pay an attribute read and a pid check per
+    call. Concurrent first calls create a single instance. A process forked
+    after the instance was created gets its own on first use instead of the
+    parent's, whose threads or worker processes it does not own.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        value = self._value
+        if value is not None and self._pid == os.getpid():
+            return value
+        return self._create()
+
+    def _check_fork(self):
+        if self._pid is not None and self._pid != os.getpid():
+            # The lock may have been held by a thread that did not survive
+            # the fork.
+            self._lock = threading.Lock()
+            self._value = self._pid = None
+
+    def _create(self):
+        self._check_fork()
+        with self._lock:
+            if self._value is None:
+                self._value = self.factory()
+                self._pid = os.getpid()
+            return self._value
+
+    @property
+    def created(self):
+        """
+        Whether the instance exists in this process.
+        """
+        return self._value is not None and self._pid == os.getpid()
+
+    def replace(self, value=None):
+        """
+        Makes ``value`` the instance, or with None lets the next ``get``
+        create a new one. Returns the previous instance of this process, if
+        any, for the caller to dispose of.
+        """
+        self._check_fork()
+        with self._lock:
+            old, self._value = self._value, value
+            self._pid = None if value is None else os.getpid()
+            return old
+
+
 class LazyLoadProxy(object):
     # Taken from http://code.activestate.com/recipes/496741-object-proxying/
     __slots__ = ["_obj_fn", "__weakref__", "__proxy_storage"]
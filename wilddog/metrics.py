@@ -0,0 +1,184 @@
+import threading
+from bisect import bisect_left
+
+try:
+    import urlparse
+except ImportError:
+    # py3k
+    from urllib import parse as urlparse
+
+__all__ = ['Metrics', 'Histogram']
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_HELP = {
+    'requests_total': ('counter', 'Responses received, by status code.'),
+    'errors_total': ('counter', 'Requests that raised instead of returning a response.'),
+    'retries_total': ('counter', 'Requests sent again by the retry policy.'),
+    'bytes_sent_total': ('counter', 'Request body bytes sent.'),
+    'bytes_received_total': ('counter', 'Response body bytes received, per Content-Length.'),
+    'request_seconds': ('histogram', 'Time from sending a request to its response.'),
+    'response_wait_seconds': ('histogram', 'Time until the response headers arrived.'),
+    'parse_seconds': ('histogram', 'Time spent decoding response bodies.'),
+    'token_seconds': ('histogram', 'Time spent getting an auth token.'),
+}
+
+
+class Histogram(object):
+    """
+    Cumulative histogram with fixed upper bounds, like a Prometheus one.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {'buckets': cumulative, 'sum': self.sum, 'count': self.count}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                             for key, value in labels)
+
+
+class Metrics(object):
+    """
+    Request instrumentation. Once handed to ``WilddogApplication(metrics=...)``
+    every request attempt is timed and counted per method and endpoint, the
+    endpoint being the first ``endpoint_depth`` segments of its path to keep
+    the number of series bounded. Callables added with ``add_hook`` are
+    called as ``before_send(method, url, kwargs)``,
+    ``after_response(method, url, response, seconds)`` and
+    ``on_error(method, url, error, seconds)``. Gauges such as the pool usage
+    are read when a snapshot is taken. Without metrics, requests only pay
+    for a single attribute lookup.
+
+    ``response_wait_seconds`` comes from ``response.elapsed``, the time until
+    the headers arrived; requests does not expose DNS, connect and TLS
+    times separately, so they are part of it.
+    """
+    HOOKS = ('before_send', 'after_response', 'on_error')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, endpoint_depth=1):
+        self.buckets = buckets
+        self.endpoint_depth = endpoint_depth
+        self.hooks = dict((name, []) for name in self.HOOKS)
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, name, hook):
+        if name not in self.hooks:
+            raise ValueError("hook must be one of %s." % ', '.join(self.HOOKS))
+        self.hooks[name].append(hook)
+
+    def register_gauge(self, name, read):
+        """
+        Reports ``read()`` as the gauge ``name`` in every snapshot.
+        """
+        self._gauges[name] = read
+
+    def endpoint(self, url):
+        path = urlparse.urlsplit(url).path
+        if path.endswith('.json'):
+            path = path[:-len('.json')]
+        parts = [part for part in path.split('/') if part]
+        return '/' + '/'.join(parts[:self.endpoint_depth])
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    # Request lifecycle, called by ``retry.send`` for every attempt.
+
+    def before_send(self, method, url, attempt, kwargs):
+        endpoint = self.endpoint(url)
+        if attempt:
+            self.inc('retries_total', method=method, endpoint=endpoint)
+        data = kwargs.get('data')
+        if data:
+            self.inc('bytes_sent_total', len(data), method=method, endpoint=endpoint)
+        for hook in self.hooks['before_send']:
+            hook(method, url, kwargs)
+
+    def after_response(self, method, url, response, seconds):
+        endpoint = self.endpoint(url)
+        self.inc('requests_total', method=method, endpoint=endpoint,
+                 status=response.status_code)
+        self.observe('request_seconds', seconds, method=method, endpoint=endpoint)
+        elapsed = getattr(response, 'elapsed', None)
+        if elapsed is not None:
+            self.observe('response_wait_seconds', elapsed.total_seconds(),
+                         method=method, endpoint=endpoint)
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit():
+            self.inc('bytes_received_total', int(length), method=method, endpoint=endpoint)
+        for hook in self.hooks['after_response']:
+            hook(method, url, response, seconds)
+
+    def on_error(self, method, url, error, seconds):
+        endpoint = self.endpoint(url)
+        self.inc('errors_total', method=method, endpoint=endpoint,
+                 error=type(error).__name__)
+        for hook in self.hooks['on_error']:
+            hook(method, url, error, seconds)
+
+    def snapshot(self):
+        """
+        Returns every counter, histogram and gauge as a dict of
+        ``{name: [(labels, value), ...]}``.
+        """
+        result = {}
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items(), key=repr):
+                result.setdefault(name, []).append((dict(labels), value))
+            for (name, labels), histogram in sorted(self._histograms.items(), key=repr):
+                result.setdefault(name, []).append((dict(labels), histogram.snapshot()))
+        for name, read in sorted(self._gauges.items()):
+            result[name] = [({}, read())]
+        return result
+
+    def to_prometheus(self, prefix='wilddog'):
+        """
+        Formats the snapshot in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, series in sorted(self.snapshot().items()):
+            kind, help_text = _HELP.get(name, ('gauge', name.replace('_', ' ')))
+            metric = '%s_%s' % (prefix, name)
+            lines.append('# HELP %s %s' % (metric, help_text))
+            lines.append('# TYPE %s %s' % (metric, kind))
+            for labels, value in series:
+                labels = sorted(labels.items())
+                if kind != 'histogram':
+                    lines.append('%s%s %s' % (metric, _format_labels(labels), value))
+                    continue
+                for bound, count in value['buckets']:
+                    lines.append('%s_bucket%s %d' % (metric, _format_labels(labels + [('le', bound)]), count))
+                lines.append('%s_sum%s %s' % (metric, _format_labels(labels), value['sum']))
+                lines.append('%s_count%s %d' % (metric, _format_labels(labels), value['count']))
+        return '\n'.join(lines) + '\n'
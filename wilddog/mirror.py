@@ -0,0 +1,227 @@
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+from .paging import _child_value, _key_order, _value_order
+from .stream import LocalTree, _is_transient
+
+__all__ = ['Mirror']
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+# Sorts after the key order of any child, see _Index.range.
+_LAST_KEY = (2,)
+_FIRST_KEY = (-1,)
+
+
+class _Index(object):
+    """
+    The children of the mirrored node sorted by ``order_by`` the way the
+    server orders them, as a sorted list of ``(value order, key order, key)``.
+    """
+
+    def __init__(self, order_by):
+        self.order_by = order_by
+        self._entries = []
+        self._keys = {}
+
+    def _order(self, value):
+        return _value_order(_child_value(value, self.order_by))
+
+    def _entry(self, key, value, key_order=None):
+        if key_order is None:
+            key_order = _key_order(key)
+        if self.order_by == '$key':
+            return key_order, key_order, key
+        return self._order(value), key_order, key
+
+    def add(self, key, value):
+        entry = self._entry(key, value)
+        self._keys[key] = entry
+        insort(self._entries, entry)
+
+    def rebuild(self, children, key_orders):
+        """
+        Indexes ``children`` from scratch with a single sort.
+        """
+        self._keys = dict((key, self._entry(key, value, key_orders[key]))
+                          for key, value in children.items() if value is not None)
+        self._entries = sorted(self._keys.values())
+
+    def remove(self, key):
+        entry = self._keys.pop(key, None)
+        if entry is not None:
+            del self._entries[bisect_left(self._entries, entry)]
+
+    def keys(self):
+        return list(self._keys)
+
+    def range(self, start, end):
+        """
+        Returns the keys whose value lies between ``start`` and ``end``
+        inclusive, either of which may be _UNSET.
+        """
+        order = _key_order if self.order_by == '$key' else _value_order
+        lo = 0 if start is _UNSET else bisect_left(self._entries, (order(start), _FIRST_KEY))
+        hi = (len(self._entries) if end is _UNSET else
+              bisect_right(self._entries, (order(end), _LAST_KEY)))
+        return [entry[2] for entry in self._entries[lo:hi]]
+
+
+class Mirror(object):
+    """
+    Local copy of the node at ``url`` that answers ``orderBy``/``equalTo``/
+    ``startAt``/``endAt``/``limitToFirst``/``limitToLast`` queries on its
+    children without a round-trip. Children are indexed by key and by every
+    child field named in ``indexes`` (``'age'``, ``'address/city'`` or
+    ``'$value'``), so a query is a binary search rather than a scan.
+
+    The copy is kept current by the event stream of the node, or, with
+    ``poll_interval``, by reading the node again every that many seconds.
+    Outages are ridden out; an error that will not go away by retrying, such
+    as a 403, stops the updates and is kept in ``error``.
+    mirror = Mirror(wilddog, '/users', indexes=['age']).start()
+    mirror.query('age', start_at=18, end_at=30, limit_to_first=10)
+    """
+
+    def __init__(self, app, url, indexes=(), poll_interval=None):
+        self.app = app
+        self.url = url
+        self.poll_interval = poll_interval
+        self.tree = LocalTree()
+        self._indexes = dict((order_by, _Index(order_by)) for order_by in ('$key',) + tuple(indexes))
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._closed = threading.Event()
+        self._subscription = None
+        self._thread = None
+        self._error = None
+
+    def start(self, timeout=None):
+        """
+        Loads the node and starts following its changes in the background.
+        Waits up to ``timeout`` seconds for the first copy when streaming, and
+        raises the error of a stream that stopped before sending it.
+        """
+        if self.poll_interval is None:
+            self._subscription = self.app.listen(self.url, self._on_event,
+                                                 on_error=self._on_stream_error)
+        else:
+            self._replace(self.app.get(self.url, None))
+            self._thread = threading.Thread(target=self._poll)
+            self._thread.daemon = True
+            self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _on_stream_error(self, error):
+        self._error = error
+        self._ready.set()
+
+    def _children(self):
+        return self.tree.data if isinstance(self.tree.data, dict) else {}
+
+    def _reindex(self, keys):
+        children = self._children()
+        if len(keys) * 8 > len(children):
+            # e.g. a put of the whole node: one sort instead of an insort
+            # per child, which is quadratic
+            key_orders = dict((key, _key_order(key)) for key in children)
+            for index in self._indexes.values():
+                index.rebuild(children, key_orders)
+            return
+        for key in keys:
+            value = children.get(key)
+            for index in self._indexes.values():
+                index.remove(key)
+                if value is not None:
+                    index.add(key, value)
+
+    def _on_event(self, event):
+        with self._lock:
+            parts = LocalTree._split(event.path)
+            if event.event == 'put':
+                self.tree.put(event.path, event.data)
+            else:
+                self.tree.patch(event.path, event.data)
+            if parts:
+                keys = [parts[0]]
+            elif event.event == 'patch':
+                keys = set(LocalTree._split(key)[0] for key in event.data if LocalTree._split(key))
+            else:
+                keys = set(self._children()) | set(self._indexes['$key'].keys())
+            self._reindex(keys)
+        self._ready.set()
+
+    def _replace(self, data):
+        with self._lock:
+            old = self._children()
+            self.tree.data = data
+            new = self._children()
+            self._reindex([key for key in set(old) | set(new) if old.get(key) != new.get(key)])
+        self._ready.set()
+
+    @property
+    def error(self):
+        """
+        The error that stopped the updates, if any.
+        """
+        if self._error is None and self._subscription is not None:
+            return self._subscription.error
+        return self._error
+
+    def _poll(self):
+        while not self._closed.wait(self.poll_interval):
+            try:
+                self._replace(self.app.get(self.url, None))
+            except Exception as e:
+                if not _is_transient(e):
+                    self._error = e
+                    logger.exception('Polling of %s stopped', self.url)
+                    return
+                logger.debug('Polling of %s failed, retrying: %r', self.url, e)
+
+    def get(self, path='/'):
+        """
+        Returns the mirrored value at ``path`` relative to the node.
+        """
+        with self._lock:
+            return self.tree.get(path)
+
+    def query(self, order_by='$key', equal_to=_UNSET, start_at=_UNSET, end_at=_UNSET,
+              limit_to_first=None, limit_to_last=None):
+        """
+        Returns an ordered mapping of the children matching the query, with
+        the semantics of the REST query parameters of the same names.
+        ``order_by`` must be ``$key`` or one of the declared indexes.
+        """
+        index = self._indexes.get(order_by)
+        if index is None:
+            raise ValueError("%s is not indexed, declare it in indexes." % order_by)
+        if equal_to is not _UNSET:
+            start_at = end_at = equal_to
+        with self._lock:
+            keys = index.range(start_at, end_at)
+            if limit_to_first is not None:
+                keys = keys[:limit_to_first]
+            if limit_to_last is not None:
+                keys = keys[-limit_to_last:] if limit_to_last else []
+            children = self._children()
+            return OrderedDict((key, children[key]) for key in keys)
+
+    def close(self, timeout=None):
+        self._closed.set()
+        if self._subscription is not None:
+            self._subscription.close(timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
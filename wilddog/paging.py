@@ -0,0 +1,142 @@
+import json
+
+__all__ = ['iter_children']
+
+_MAX_INT_KEY = 2 ** 31 - 1
+
+
+def _key_order(key):
+    # Keys that parse as 32-bit integers come first, in numeric order.
+    if key[:1] not in ('-', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9'):
+        return 1, key
+    try:
+        number = int(key)
+    except ValueError:
+        return 1, key
+    if str(number) == key and -_MAX_INT_KEY - 1 <= number <= _MAX_INT_KEY:
+        return 0, number
+    return 1, key
+
+
+def _value_order(value):
+    if value is None:
+        return 0, None
+    if value is False or value is True:
+        return 1, value
+    if isinstance(value, (int, float)):
+        return 2, value
+    if isinstance(value, dict):
+        return 4, None
+    return 3, value
+
+
+def _child_value(value, order_by):
+    if order_by == '$value':
+        return value
+    for part in order_by.split('/'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class _Pager(object):
+    """
+    Computes the query parameters of each page and the order of the children
+    it returns.
+    """
+
+    def __init__(self, order_by, page_size):
+        self.order_by = order_by
+        self.page_size = page_size
+        self.start = None
+        self.seen = set()
+        # set when a page was all ties, to fetch the rest of them at once
+        self.tie = False
+
+    def sort_key(self, item):
+        key, value = item
+        if self.order_by == '$key':
+            return _key_order(key)
+        return _value_order(_child_value(value, self.order_by)), _key_order(key)
+
+    def _value(self, item):
+        key, value = item
+        return key if self.order_by == '$key' else _child_value(value, self.order_by)
+
+    def params(self):
+        if self.tie:
+            # The REST API can not start a page at a key within a value, so
+            # the rest of a large tie group is fetched with one query.
+            return {'orderBy': json.dumps(self.order_by), 'equalTo': json.dumps(self.start)}
+        # Children equal to ``start`` that were already yielded come back in
+        # the next page, so ask for that many more and skip them.
+        params = {'orderBy': json.dumps(self.order_by),
+                  'limitToFirst': self.page_size + len(self.seen)}
+        if self.start is not None:
+            params['startAt'] = json.dumps(self.start)
+        return params
+
+    def advance(self, page):
+        """
+        Returns the new children of ``page`` in order and whether another page
+        may follow.
+        """
+        tie, self.tie = self.tie, False
+        requested = self.page_size + len(self.seen)
+        if not isinstance(page, dict):
+            return [], False
+        items = sorted(page.items(), key=self.sort_key)
+        items = [item for item in items if item[0] not in self.seen]
+        if tie:
+            self.seen.update(page)
+            return items, True
+        full = len(page) >= requested
+        if not items:
+            # Only ties already yielded: fetch the rest of the group.
+            self.tie = full
+            return [], full
+        start = self._value(items[-1])
+        if start != self.start:
+            self.seen = set()
+        self.start = start
+        for item in items:
+            if self._value(item) == start:
+                self.seen.add(item[0])
+        self.tie = full and len(self.seen) >= self.page_size
+        return items, full
+
+
+def iter_children(app, url, page_size=100, order_by='$key', params=None, prefetch=True):
+    """
+    Yields the ``(key, value)`` children of ``url`` in ``order_by`` order,
+    fetching ``page_size`` of them at a time with ``orderBy``/``startAt``/
+    ``limitToFirst`` queries, so at most two pages are held in memory. When
+    a page is all children with the same value, the rest of them are fetched
+    with one ``equalTo`` query, as pages can not start within a value. With
+    ``prefetch`` the next page is requested in the background while the
+    current one is being consumed.
+    """
+    pager = _Pager(order_by, page_size)
+    executor = None
+    if prefetch:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=1)
+
+    def fetch():
+        page_params = dict(params or {})
+        page_params.update(pager.params())
+        return app.get(url, None, params=page_params)
+
+    try:
+        items, more = pager.advance(fetch())
+        while True:
+            following = executor.submit(fetch) if more and executor else None
+            for item in items:
+                yield item
+            if not more:
+                break
+            items, more = pager.advance(following.result() if following else fetch())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
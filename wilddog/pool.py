@@ -0,0 +1,192 @@
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import urlparse
+except ImportError:
+    # py3k
+    from urllib import parse as urlparse
+
+from .compression import ENCODINGS, TransferStats
+
+__all__ = ['ConnectionPool']
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of keep-alive ``requests.Session`` objects, grouped by
+    host. A session is checked out for the duration of a single request and
+    then handed back, so the underlying TCP+TLS connection is reused by the
+    next request to the same host instead of being set up again.
+
+    `pool_size`: maximum number of sessions checked out per host at once.
+    When the limit is reached ``acquire`` blocks (if `block` is set) or
+    hands out a throw-away overflow session.
+    `max_idle`: maximum number of idle sessions kept alive per host.
+    `compress_threshold`: request bodies of at least this many bytes are sent
+    compressed with `compression` (``gzip`` or ``deflate``); None disables
+    compression. Responses are always negotiated with ``Accept-Encoding``.
+    Bytes sent and received through the sessions are counted in
+    ``transfer_stats``.
+    `retry_policy`: a ``RetryPolicy`` applied to every request sent through
+    the sessions, and `circuit_breaker` a ``CircuitBreaker`` shared by them;
+    both default to None, i.e. a failed request is reported at once.
+    `rate_limiter`: a ``RateLimiter`` every request (and retry) waits on.
+    `metrics`: a ``Metrics`` recording every request sent through the pool.
+    These per-request settings can be changed later with ``configure``.
+    """
+    SETTINGS = ('compress_threshold', 'compression', 'retry_policy', 'circuit_breaker',
+                'rate_limiter', 'metrics')
+
+    def __init__(self, pool_size=10, max_idle=None, block=False,
+                 compress_threshold=None, compression='gzip', retry_policy=None,
+                 circuit_breaker=None, rate_limiter=None, metrics=None):
+        if pool_size < 1:
+            raise ValueError("pool_size must be a positive integer.")
+        if compression not in ENCODINGS:
+            raise ValueError("compression must be one of %s." % ', '.join(ENCODINGS))
+        self.pool_size = pool_size
+        self.max_idle = pool_size if max_idle is None else max_idle
+        self.block = block
+        self.compress_threshold = compress_threshold
+        self.compression = compression
+        self.transfer_stats = TransferStats()
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.hits = 0
+        self.misses = 0
+        # Bumped by ``configure`` so that sessions pick up the new settings.
+        self._version = 0
+        self._idle = {}
+        self._in_use = {}
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+    @staticmethod
+    def _host_key(url):
+        parts = urlparse.urlsplit(url)
+        return '%s://%s' % (parts.scheme, parts.netloc)
+
+    def _new_session(self):
+        # requests is imported with the first session rather than with the package.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Accept-Encoding'] = ', '.join(ENCODINGS)
+        session.transfer_stats = self.transfer_stats
+        self._apply_settings(session)
+        return session
+
+    def _apply_settings(self, session):
+        # Read by the make_*_request helpers, like ``timeout``.
+        for name in self.SETTINGS:
+            setattr(session, name, getattr(self, name))
+        session.pool_version = self._version
+
+    def configure(self, **settings):
+        """
+        Changes any of ``compress_threshold``, ``compression``,
+        ``retry_policy``, ``circuit_breaker``, ``rate_limiter`` and
+        ``metrics``. Sessions checked out at the time keep the previous
+        settings until they are handed back.
+        """
+        for name in settings:
+            if name not in self.SETTINGS:
+                raise ValueError("%s is not a connection pool setting." % name)
+        if settings.get('compression', self.compression) not in ENCODINGS:
+            raise ValueError("compression must be one of %s." % ', '.join(ENCODINGS))
+        with self._cond:
+            for name, value in settings.items():
+                setattr(self, name, value)
+            self._version += 1
+
+    def acquire(self, url, timeout=None):
+        """
+        Checks out a session for the host of ``url``. Sessions must be given
+        back with ``release``; prefer the ``connection`` context manager.
+        """
+        host = self._host_key(url)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("connection pool is closed.")
+            if self.block:
+                deadline = None if timeout is None else time.time() + timeout
+                while self._in_use.get(host, 0) >= self.pool_size:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise RuntimeError("timed out waiting for a free connection.")
+                    self._cond.wait(remaining)
+                    if self._closed:
+                        raise RuntimeError("connection pool is closed.")
+            idle = self._idle.get(host)
+            session = idle.pop() if idle else None
+            if session is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._in_use[host] = self._in_use.get(host, 0) + 1
+        if session is None:
+            session = self._new_session()
+        elif session.pool_version != self._version:
+            self._apply_settings(session)
+        return session
+
+    def release(self, url, session):
+        """
+        Hands a session obtained from ``acquire`` back to the pool. Sessions
+        beyond ``max_idle`` for the host are closed.
+        """
+        host = self._host_key(url)
+        with self._cond:
+            self._in_use[host] = max(self._in_use.get(host, 0) - 1, 0)
+            idle = self._idle.setdefault(host, [])
+            keep = not self._closed and len(idle) < self.max_idle
+            if keep:
+                idle.append(session)
+            self._cond.notify()
+        if not keep:
+            session.close()
+
+    @contextmanager
+    def connection(self, url, timeout=None):
+        session = self.acquire(url, timeout)
+        try:
+            yield session
+        finally:
+            self.release(url, session)
+
+    def stats(self):
+        """
+        Returns a dict snapshot of the pool counters.
+        """
+        with self._cond:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'in_use': sum(self._in_use.values()),
+                    'idle': sum(len(s) for s in self._idle.values())}
+
+    def close(self):
+        """
+        Closes every idle session. Sessions still checked out are closed when
+        they are released.
+        """
+        with self._cond:
+            self._closed = True
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
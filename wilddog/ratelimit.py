@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+try:
+    import urlparse
+except ImportError:
+    # py3k
+    from urllib import parse as urlparse
+
+__all__ = ['TokenBucket', 'RateLimiter', 'MemoryState', 'FileState']
+
+
+def _take(entry, now, rate, capacity, tokens):
+    """
+    Refills the bucket ``entry`` (``[level, updated at]`` or None for a full
+    bucket) up to ``now`` and takes ``tokens`` out of it. The level may go
+    negative: the tokens are then reserved ahead and the caller has to wait
+    the returned number of seconds before using them.
+    """
+    if entry is None:
+        level = capacity
+    else:
+        level = min(capacity, entry[0] + (now - entry[1]) * rate)
+    level -= tokens
+    delay = -level / float(rate) if level < 0 else 0
+    return [level, now], delay
+
+
+class MemoryState(object):
+    """
+    Keeps the buckets in the memory of the current process.
+    """
+    # ``take`` returns at once, so it can be called from an event loop.
+    blocking = False
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, tokens):
+        with self._lock:
+            entry, delay = _take(self._buckets.get(key), time.time(), rate, capacity, tokens)
+            self._buckets[key] = entry
+            return delay
+
+
+class FileState(object):
+    """
+    Keeps the buckets in a small JSON file guarded by ``flock``, so every
+    process on the host that uses the same ``path`` draws from the same
+    budget. Only available where ``fcntl`` is. A forked child opens the file
+    again, since flock does not exclude processes sharing a descriptor.
+    """
+    blocking = True
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise RuntimeError("FileState requires fcntl.")
+        self.path = path
+        self._open()
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._pid = os.getpid()
+        # flock does not exclude threads sharing the descriptor.
+        self._lock = threading.Lock()
+
+    def _read(self):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(self._fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        try:
+            return json.loads(b''.join(chunks).decode('utf-8'))
+        except ValueError:
+            return {}
+
+    def _write(self, buckets):
+        data = json.dumps(buckets).encode('utf-8')
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.ftruncate(self._fd, 0)
+        os.write(self._fd, data)
+
+    def take(self, key, rate, capacity, tokens):
+        if self._pid != os.getpid():
+            # The descriptor and the lock are the parent's.
+            parent_fd = self._fd
+            self._open()
+            os.close(parent_fd)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                buckets = self._read()
+                entry, delay = _take(buckets.get(key), time.time(), rate, capacity, tokens)
+                buckets[key] = entry
+                self._write(buckets)
+                return delay
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class TokenBucket(object):
+    """
+    Token bucket allowing ``rate`` requests per second on average and bursts
+    of up to ``capacity`` (``rate`` by default). ``reserve`` takes a token
+    without blocking and returns how long to wait before using it, which
+    suits ``asyncio.sleep``; ``acquire`` sleeps that long itself.
+    """
+
+    def __init__(self, rate, capacity=None, state=None, key=''):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.state = state or MemoryState()
+        self.key = key
+
+    def reserve(self, tokens=1):
+        return self.state.take(self.key, self.rate, self.capacity, tokens)
+
+    def acquire(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RateLimiter(object):
+    """
+    Client-side rate limit: a bucket of ``rate`` requests per second for the
+    whole client plus one bucket per path prefix in ``prefixes``, a dict of
+    ``{'/logs': rate}`` or ``{'/logs': (rate, capacity)}``. A request takes a
+    token from the client bucket and from the bucket of every prefix of its
+    path. Pass a ``FileState`` as `state` to share the budget between
+    processes. ``blocking`` tells whether taking tokens may block on I/O.
+    limiter = RateLimiter(100, prefixes={'/logs': 10}, state=FileState('/tmp/wilddog.rate'))
+    """
+
+    def __init__(self, rate=None, capacity=None, prefixes=None, state=None):
+        state = state or MemoryState()
+        self.blocking = getattr(state, 'blocking', True)
+        self.buckets = []
+        if rate is not None:
+            self.buckets.append(('', TokenBucket(rate, capacity, state, '')))
+        for prefix, limit in (prefixes or {}).items():
+            rate_, capacity_ = limit if isinstance(limit, tuple) else (limit, None)
+            prefix = '/' + prefix.strip('/')
+            self.buckets.append((prefix, TokenBucket(rate_, capacity_, state, prefix)))
+
+    @staticmethod
+    def _path(url):
+        path = urlparse.urlsplit(url).path
+        if path.endswith('.json'):
+            path = path[:-len('.json')]
+        return '/' + path.strip('/')
+
+    def reserve(self, url, tokens=1):
+        """
+        Takes tokens for a request to ``url`` (a full URL or a path) and
+        returns the number of seconds to wait before sending it.
+        """
+        path = self._path(url)
+        delay = 0
+        for prefix, bucket in self.buckets:
+            if prefix in ('', '/') or path == prefix or path.startswith(prefix + '/'):
+                delay = max(delay, bucket.reserve(tokens))
+        return delay
+
+    def acquire(self, url, tokens=1):
+        delay = self.reserve(url, tokens)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,209 @@
+import random
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+try:
+    import urlparse
+except ImportError:
+    # py3k
+    from urllib import parse as urlparse
+
+import requests
+
+from .deadline import DeadlineExceeded
+
+__all__ = ['RetryPolicy', 'CircuitBreaker', 'CircuitOpenError', 'send']
+
+# Errors raised before any response was received; safe to retry.
+_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised without sending anything while the circuit of a host is open.
+    ``retry_in`` is the number of seconds until a probe request is allowed.
+    """
+
+    def __init__(self, host, retry_in):
+        super(CircuitOpenError, self).__init__(
+            'Circuit open for %s, retry in %.1fs' % (host, retry_in))
+        self.host = host
+        self.retry_in = retry_in
+
+
+class RetryPolicy(object):
+    """
+    Decides whether and when a failed request is sent again. Connection
+    errors, timeouts and responses with a status in ``statuses`` are retried
+    up to ``attempts`` times in total, waiting an exponentially growing,
+    jittered delay (``backoff * 2 ** n``, capped at ``max_backoff``) or the
+    delay asked for by a ``Retry-After`` header. A ``Retry-After`` longer
+    than ``max_backoff`` is not waited for and the response is returned.
+    Only idempotent methods are retried; POST, which would create a second
+    child, is retried only with `retry_post`.
+    """
+    STATUSES = frozenset([429, 500, 502, 503, 504])
+    METHODS = frozenset(['GET', 'PUT', 'DELETE'])
+
+    def __init__(self, attempts=3, backoff=0.2, max_backoff=10, retry_post=False,
+                 statuses=None, methods=None):
+        if attempts < 1:
+            raise ValueError("attempts must be a positive integer.")
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = self.STATUSES if statuses is None else frozenset(statuses)
+        methods = self.METHODS if methods is None else frozenset(m.upper() for m in methods)
+        self.methods = methods | frozenset(['POST']) if retry_post else methods
+
+    def is_retryable(self, method):
+        return method.upper() in self.methods
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            parsed = parsedate_tz(value)
+            if parsed is None:
+                return None
+            return max(mktime_tz(parsed) - time.time(), 0)
+
+    def next_delay(self, method, attempt, response=None):
+        """
+        Returns the number of seconds to wait before sending ``method`` again
+        after the failed ``attempt`` (counted from 0), or None to give up.
+        """
+        if attempt + 1 >= self.attempts or not self.is_retryable(method):
+            return None
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay * random.uniform(0.5, 1)
+
+
+class CircuitBreaker(object):
+    """
+    Per-host circuit breaker. After ``failure_threshold`` consecutive
+    failures (connection errors, timeouts, 429 and 5xx responses) the
+    circuit of the host opens and requests to it fail immediately with
+    ``CircuitOpenError`` instead of tying up a thread until they time out.
+    ``reset_timeout`` seconds later a single probe request is let through:
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # host -> [consecutive failures, opened at, probe started at]
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, host):
+        """
+        Raises ``CircuitOpenError`` if a request to ``host`` may not be sent.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return
+            now = time.time()
+            # A probe that never reported back does not keep the circuit shut.
+            since = state[1] if state[2] is None else state[2]
+            if now - since < self.reset_timeout:
+                raise CircuitOpenError(host, self.reset_timeout - (now - since))
+            state[2] = now
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host):
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, None, None])
+            state[0] += 1
+            if state[2] is not None or state[0] >= self.failure_threshold:
+                state[1] = time.time()
+                state[2] = None
+
+    def state(self, host):
+        """
+        Returns ``closed``, ``open`` or ``half-open`` for ``host``.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return 'closed'
+            if state[2] is not None or time.time() - state[1] >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+
+def send(connection, method, url, **kwargs):
+    """
+    Sends ``method`` to ``url`` with ``connection``, applying the
+    ``rate_limiter``, ``retry_policy``, ``circuit_breaker``, ``deadline`` and
+    ``metrics`` attributes of the connection if it has them. Returns the last response; whether it is an
+    error is left to the caller.
+    """
+    request = getattr(connection, method.lower())
+    policy = getattr(connection, 'retry_policy', None)
+    breaker = getattr(connection, 'circuit_breaker', None)
+    deadline = getattr(connection, 'deadline', None)
+    limiter = getattr(connection, 'rate_limiter', None)
+    metrics = getattr(connection, 'metrics', None)
+    if (policy is None and breaker is None and deadline is None and limiter is None
+            and metrics is None):
+        return request(url, **kwargs)
+    host = urlparse.urlsplit(url).netloc
+    statuses = policy.statuses if policy is not None else RetryPolicy.STATUSES
+    timeout = kwargs.get('timeout')
+    attempt = 0
+    while True:
+        if limiter is not None:
+            wait = limiter.reserve(url)
+            if deadline is not None and wait >= deadline.remaining():
+                raise DeadlineExceeded('Deadline exceeded waiting for the rate limiter')
+            if wait > 0:
+                time.sleep(wait)
+        if deadline is not None:
+            kwargs['timeout'] = deadline.limit(timeout)
+        if breaker is not None:
+            breaker.before_request(host)
+        if metrics is not None:
+            metrics.before_send(method, url, attempt, kwargs)
+            started = time.time()
+        try:
+            response = request(url, **kwargs)
+        except Exception as e:
+            if metrics is not None:
+                metrics.on_error(method, url, e, time.time() - started)
+            if not isinstance(e, _TRANSIENT_ERRORS):
+                raise
+            if breaker is not None:
+                breaker.record_failure(host)
+            delay = policy.next_delay(method, attempt) if policy is not None else None
+            if delay is None or (deadline is not None and delay >= deadline.remaining()):
+                raise
+        else:
+            if metrics is not None:
+                metrics.after_response(method, url, response, time.time() - started)
+            failed = response.status_code in statuses
+            if breaker is not None:
+                if failed:
+                    breaker.record_failure(host)
+                else:
+                    breaker.record_success(host)
+            if not failed:
+                return response
+            delay = policy.next_delay(method, attempt, response) if policy is not None else None
+            if delay is None or (deadline is not None and delay >= deadline.remaining()):
+                return response
+            response.close()
+        attempt += 1
+        time.sleep(delay)
@@ -0,0 +1,243 @@
+import codecs
+import json
+import logging
+import random
+import threading
+from collections import namedtuple
+
+__all__ = ['StreamEvent', 'SSEParser', 'LocalTree', 'Subscription']
+
+StreamEvent = namedtuple('StreamEvent', ['event', 'path', 'data'])
+
+logger = logging.getLogger(__name__)
+
+
+def _is_transient(error):
+    """
+    Tells whether the stream failed because the backend could not be reached
+    or dropped the connection, as opposed to refusing the subscription.
+    """
+    import requests
+    from .wal import is_outage
+    return is_outage(error) or isinstance(error, requests.exceptions.ChunkedEncodingError)
+
+
+class SSEParser(object):
+    """
+    Incremental ``text/event-stream`` parser. Text is fed as it arrives from
+    the socket and complete events are returned as ``(event, data)`` pairs;
+    a partial line or event is kept until the rest of it is fed.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._event = None
+        self._data = []
+
+    def feed(self, text):
+        self._buffer += text
+        events = []
+        while True:
+            index = -1
+            for sep in ('\r\n', '\n', '\r'):
+                i = self._buffer.find(sep)
+                if i != -1 and (index == -1 or i < index):
+                    index, length = i, len(sep)
+            # A trailing '\r' may be the first half of '\r\n'.
+            if index == -1 or (index == len(self._buffer) - 1 and self._buffer[index] == '\r'):
+                break
+            line, self._buffer = self._buffer[:index], self._buffer[index + length:]
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _process_line(self, line):
+        if not line:
+            if self._event is None and not self._data:
+                return None
+            event = (self._event or 'message', '\n'.join(self._data))
+            self._event, self._data = None, []
+            return event
+        if line.startswith(':'):
+            return None
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'event':
+            self._event = value
+        elif field == 'data':
+            self._data.append(value)
+        return None
+
+
+class LocalTree(object):
+    """
+    Local copy of the data below the subscribed path, kept current by
+    applying the ``put`` and ``patch`` deltas of the event stream.
+    """
+
+    def __init__(self):
+        self.data = None
+
+    @staticmethod
+    def _split(path):
+        return [part for part in path.split('/') if part]
+
+    def _set(self, parts, value):
+        if not parts:
+            self.data = value
+            return
+        if not isinstance(self.data, dict):
+            self.data = {}
+        node = self.data
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = {}
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+    def put(self, path, data):
+        self._set(self._split(path), data)
+
+    def patch(self, path, data):
+        parts = self._split(path)
+        for key, value in data.items():
+            self._set(parts + self._split(key), value)
+
+    def get(self, path='/'):
+        node = self.data
+        for part in self._split(path):
+            if not isinstance(node, dict):
+                return None
+            node = node.get(part)
+        return node
+
+
+class Subscription(object):
+    """
+    Streaming subscription to the changes of a single endpoint. Iterating over
+    it yields a ``StreamEvent`` per ``put``/``patch`` event; ``start`` instead
+    runs the stream on a background thread feeding ``callback``. Either way
+    the deltas are applied to ``tree``. Dropped connections, timeouts, 5xx
+    answers and ``auth_revoked`` events are handled by reconnecting with
+    exponential backoff, calling ``authenticate(params, headers)`` again on
+    every reconnect so a fresh token is used. Any other error, such as a 401
+    or 404 answer or an event that can not be decoded, ends the stream: it is
+    raised to the iterating code, or with ``start`` kept in ``error``, logged
+    and handed to ``on_error``. Exceptions raised by ``callback`` are logged
+    and the stream goes on.
+    """
+
+    def __init__(self, endpoint, authenticate, connection_pool, callback=None,
+                 params=None, timeout=60, backoff=0.5, max_backoff=30, on_error=None):
+        self.endpoint = endpoint
+        self.authenticate = authenticate
+        self.connection_pool = connection_pool
+        self.callback = callback
+        self.on_error = on_error
+        self.params = params or {}
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.tree = LocalTree()
+        self.reconnects = 0
+        self.error = None
+        self._closed = threading.Event()
+        self._response = None
+        self._thread = None
+
+    def _connect(self, session):
+        params = dict(self.params)
+        headers = {'Accept': 'text/event-stream'}
+        self.authenticate(params, headers)
+        response = session.get(self.endpoint, params=params, headers=headers,
+                               stream=True, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def _read_events(self, response):
+        parser = SSEParser()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for chunk in response.iter_content(chunk_size=None):
+            for event, data in parser.feed(decoder.decode(chunk)):
+                yield event, data
+
+    def _apply(self, event, data):
+        payload = json.loads(data)
+        if event == 'put':
+            self.tree.put(payload['path'], payload['data'])
+        else:
+            self.tree.patch(payload['path'], payload['data'])
+        return StreamEvent(event, payload['path'], payload['data'])
+
+    def __iter__(self):
+        failures = 0
+        while not self._closed.is_set():
+            try:
+                with self.connection_pool.connection(self.endpoint) as session:
+                    self._response = response = self._connect(session)
+                    try:
+                        for event, data in self._read_events(response):
+                            failures = 0
+                            if event in ('put', 'patch'):
+                                yield self._apply(event, data)
+                            elif event == 'cancel':
+                                self._closed.set()
+                            elif event == 'auth_revoked':
+                                break
+                            if self._closed.is_set():
+                                break
+                    finally:
+                        self._response = None
+                        response.close()
+            except Exception as e:
+                if self._closed.is_set():
+                    break
+                if not _is_transient(e):
+                    raise
+                logger.debug('Stream of %s dropped, reconnecting: %r', self.endpoint, e)
+            if self._closed.is_set():
+                break
+            failures += 1
+            self.reconnects += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+            self._closed.wait(delay * random.uniform(0.5, 1))
+
+    def _run(self):
+        try:
+            for event in self:
+                try:
+                    self.callback(event)
+                except Exception:
+                    logger.exception('Stream callback failed for %s', self.endpoint)
+        except Exception as e:
+            self.error = e
+            logger.exception('Stream of %s stopped', self.endpoint)
+            if self.on_error is not None:
+                self.on_error(e)
+
+    def start(self):
+        """
+        Consumes the stream on a daemon thread, calling ``callback`` with
+        every ``StreamEvent``.
+        """
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self, timeout=None):
+        """
+        Stops the stream and waits for the background thread, if any.
+        """
+        self._closed.set()
+        response = self._response
+        if response is not None:
+            response.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .wilddog_token_generator import TokenSigner
+
+__all__ = ['TokenCache']
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class TokenCache(object):
+    """
+    Memoizes tokens minted by ``create_token`` per (secret, data, admin, debug),
+    with one ``TokenSigner`` per secret.
+    Every token is issued with an ``exp`` claim of ``ttl`` seconds and is
+    minted again once less than ``refresh_margin`` seconds of it are left,
+    so a token about to expire is never handed out. At most ``max_entries``
+    tokens are kept, the least recently used being dropped first.
+    """
+
+    def __init__(self, ttl=3600, refresh_margin=60, max_entries=1024):
+        if ttl <= refresh_margin:
+            raise ValueError("ttl must be greater than refresh_margin.")
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._tokens = OrderedDict()
+        self._signers = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret, data, admin=False, debug=False):
+        """
+        Returns a cached token, minting a new one if there is none or the
+        cached one is within ``refresh_margin`` of its expiry.
+        """
+        key = (secret, _freeze(data), admin, debug)
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.pop(key, None)
+            if entry is not None and entry[1] - self.refresh_margin > now:
+                self._tokens[key] = entry
+                return entry[0]
+            expires = int(now) + self.ttl
+            signer = self._signers.get(secret)
+            if signer is None:
+                if len(self._signers) >= self.max_entries:
+                    self._signers.clear()
+                signer = self._signers[secret] = TokenSigner(secret)
+            token = signer.create_token(data, {'admin': admin, 'debug': debug,
+                                               'expires': expires})
+            self._tokens[key] = (token, expires)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+            return token
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._signers.clear()
@@ -0,0 +1,306 @@
+import mmap
+import os
+import threading
+from collections import deque
+
+import requests
+
+from .bulk import BulkResult, WriteBatch, _split_path
+from .jsonutil import JSONSerializer
+from .retry import CircuitOpenError
+from .writequeue import _coalesce
+
+__all__ = ['WriteAheadLog', 'WriteAheadLogFull', 'replay', 'is_outage']
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class WriteAheadLogFull(Exception):
+    """
+    Raised when a write does not fit in ``max_bytes`` even after compaction.
+    """
+
+
+def is_outage(error):
+    """
+    Tells whether ``error`` means the backend could not be reached or was
+    unhealthy, as opposed to the write itself being refused.
+    """
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is None or response.status_code == 429 or response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, CircuitOpenError))
+
+
+def _supersedes(path, overwritten):
+    return any(path[:i] in overwritten for i in range(len(path) + 1))
+
+
+class WriteAheadLog(object):
+    """
+    Append-only log of pending writes on local disk, one JSON record per
+    line, so writes made while the backend is unreachable survive a restart
+    and are replayed in order once it is back. A write is appended before it
+    is sent and acknowledged once the server took it. Records are appended
+    to an ordinary file; ``mmap`` is only used to read pending records back,
+    and only their offsets are kept in memory.
+
+    The file is truncated as soon as nothing is pending. When an append
+    would make it larger than ``max_bytes`` it is compacted: acknowledged
+    records and writes superseded by a later PUT or DELETE of the same node
+    or of an ancestor are dropped. If that is not enough the append fails
+    with ``WriteAheadLogFull``. With ``sync`` every append is fsync'ed.
+    Writes the server refused during a replay are kept in ``rejected``.
+    Writes appended with ``in_flight`` are being sent by their caller and are
+    left out of replays until they are discarded or released. The log must
+    be used by a single process.
+    """
+
+    def __init__(self, path, max_bytes=64 << 20, sync=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.sync = sync
+        self._serializer = JSONSerializer()
+        self._lock = threading.RLock()
+        self._file = open(path, 'ab')
+        # (seq, offset, length) of every record not acknowledged yet
+        self._index = deque()
+        # seqs of the writes their caller is still sending
+        self.in_flight = set()
+        self._seq = 0
+        self._size = 0
+        self.rejected = deque(maxlen=1000)
+        self._load()
+
+    def _records(self):
+        """
+        Yields ``(offset, length, record)`` for every complete record of the
+        file; a line cut short by a crash is ignored.
+        """
+        if os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                offset = 0
+                while True:
+                    line = data.readline()
+                    if not line.endswith(b'\n'):
+                        return
+                    try:
+                        record = self._serializer.loads(line)
+                    except ValueError:
+                        record = None
+                    if record is not None:
+                        yield offset, len(line), record
+                    offset += len(line)
+            finally:
+                data.close()
+
+    def _load(self):
+        acked = 0
+        done = set()
+        index = []
+        size = 0
+        for offset, length, record in self._records():
+            size = offset + length
+            if 'ack' in record:
+                acked = max(acked, record['ack'])
+            elif 'done' in record:
+                done.add(record['done'])
+            else:
+                index.append((record['seq'], offset, length))
+                self._seq = max(self._seq, record['seq'])
+        self._index = deque(entry for entry in index
+                            if entry[0] > acked and entry[0] not in done)
+        self._seq = max(self._seq, acked)
+        self._size = size
+        if not self._index:
+            self._truncate()
+        elif os.path.getsize(self.path) > size:
+            # Drop the tail of a record cut short by a crash.
+            self._file.truncate(size)
+
+    def _write(self, record):
+        line = self._serializer.dumps(record) + b'\n'
+        offset = self._size
+        self._file.write(line)
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self._size += len(line)
+        return offset, len(line)
+
+    def _truncate(self):
+        self._file.seek(0)
+        self._file.truncate()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    def append(self, method, path, data=None, in_flight=False):
+        """
+        Logs a write and returns its sequence number. With ``in_flight`` the
+        write is left out of replays until it is discarded or released.
+        """
+        with self._lock:
+            record = {'seq': self._seq + 1, 'method': method.upper(),
+                      'path': path, 'data': data}
+            length = len(self._serializer.dumps(record)) + 1
+            if self._size + length > self.max_bytes:
+                self.compact()
+                if self._size + length > self.max_bytes:
+                    raise WriteAheadLogFull("%d bytes of writes pending." % self._size)
+            self._seq += 1
+            offset, length = self._write(record)
+            self._index.append((self._seq, offset, length))
+            if in_flight:
+                self.in_flight.add(self._seq)
+            return self._seq
+
+    def pending(self, limit=None, in_flight=True):
+        """
+        Returns up to ``limit`` pending writes, oldest first, as
+        ``(seq, method, path, data)`` tuples. Without ``in_flight`` the
+        writes still being sent by their caller are left out.
+        """
+        with self._lock:
+            index = [entry for entry in self._index
+                     if in_flight or entry[0] not in self.in_flight][:limit]
+            if not index:
+                return []
+            with open(self.path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    records = [self._serializer.loads(data[offset:offset + length])
+                               for _, offset, length in index]
+                finally:
+                    data.close()
+            return [(r['seq'], r['method'], r['path'], r['data']) for r in records]
+
+    def ack(self, seq):
+        """
+        Acknowledges every write up to and including ``seq``.
+        """
+        with self._lock:
+            while self._index and self._index[0][0] <= seq:
+                self._index.popleft()
+            if self._index:
+                self._write({'ack': seq})
+            else:
+                self._truncate()
+
+    def discard(self, seq):
+        """
+        Acknowledges the single write ``seq``, leaving older ones pending.
+        """
+        with self._lock:
+            self.in_flight.discard(seq)
+            for i, entry in enumerate(self._index):
+                if entry[0] == seq:
+                    del self._index[i]
+                    break
+            else:
+                return
+            if self._index:
+                self._write({'done': seq})
+            else:
+                self._truncate()
+
+    def release(self, seq):
+        """
+        Leaves the write ``seq`` pending for the next replay, after its
+        caller failed to send it.
+        """
+        with self._lock:
+            self.in_flight.discard(seq)
+
+    def compact(self):
+        """
+        Rewrites the log with only the pending writes that are not
+        superseded by a later one.
+        """
+        with self._lock:
+            entries = self.pending()
+            overwritten = set()
+            kept = []
+            for entry in reversed(entries):
+                path = _split_path(entry[2])
+                if _supersedes(path, overwritten):
+                    continue
+                kept.append(entry)
+                if entry[1] in ('PUT', 'DELETE'):
+                    overwritten.add(path)
+            temp = self.path + '.compact'
+            index = deque()
+            offset = 0
+            with open(temp, 'wb') as f:
+                for seq, method, path, data in reversed(kept):
+                    line = self._serializer.dumps({'seq': seq, 'method': method,
+                                                   'path': path, 'data': data}) + b'\n'
+                    f.write(line)
+                    index.append((seq, offset, len(line)))
+                    offset += len(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            _replace(temp, self.path)
+            self._file = open(self.path, 'ab')
+            self._index = index
+            self._size = offset
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def replay(app, wal, batch_size=500, until=None):
+    """
+    Sends the pending writes of ``wal`` with ``app`` in order, coalescing
+    runs of PUT/PATCH/DELETE into multi-location PATCH requests, and
+    acknowledges them as they are answered. Only writes older than ``until``
+    are sent, if given, and the writes still being sent by their caller are
+    skipped. Writes the server refuses are dropped into
+    ``wal.rejected``. The first outage stops the replay, leaving that write
+    and every later one in the log, and is raised. Returns the number of
+    writes sent.
+    """
+    sent = 0
+    while True:
+        entries = [entry for entry in wal.pending(batch_size, in_flight=False)
+                   if until is None or entry[0] < until]
+        if not entries:
+            return sent
+        run = []
+        for entry in entries + [None]:
+            if run and (entry is None or entry[1] == 'POST'):
+                batch = WriteBatch(app)
+                for method, path, data in _coalesce([e[1:] for e in run]):
+                    if method == 'PATCH':
+                        batch.update(path, data)
+                    else:
+                        batch.put(path, data)
+                errors = [r for r in batch.commit(stop_on=is_outage).values()
+                          if r.error is not None]
+                for result in errors:
+                    if is_outage(result.error):
+                        raise result.error
+                wal.rejected.extend(errors)
+                for replayed in run:
+                    wal.discard(replayed[0])
+                sent += len(run)
+                run = []
+            if entry is None:
+                break
+            if entry[1] == 'POST':
+                try:
+                    app._post_raw(entry[2], app.serializer.dumps(entry[3]))
+                except Exception as e:
+                    if is_outage(e):
+                        raise
+                    wal.rejected.append(BulkResult(entry[2], None, e))
+                wal.discard(entry[0])
+                sent += 1
+            else:
+                run.append(entry)
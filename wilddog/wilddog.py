@@ -5,25 +5,103 @@ except ImportError:
     # py3k
     from urllib import parse as urlparse
 
-import json
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
 
-from .wilddog_token_generator import create_token
 from .decorators import http_connection
 
-from .async import process_pool
-from .jsonutil import JSONEncoder
+from .bulk import WriteBatch, iter_reads, _split_path
+from .compression import compress
+from .executors import ThreadPoolBackend
+from .jsonstream import iter_items, iter_leaves
+from .paging import iter_children
+from .mirror import Mirror
+from .pool import ConnectionPool
+from .stream import Subscription
+from .token_cache import TokenCache
+from .writequeue import WriteQueue
 
-__all__ = ['WilddogAuthentication', 'WilddogApplication']
+__all__ = ['WilddogAuthentication', 'WilddogApplication', 'PreconditionFailed']
+
+# make_conditional_get_request 在服务端返回 304 时的返回值
+NOT_MODIFIED = object()
+
+
+def send(connection, method, url, **kwargs):
+    """
+    调用 ``retry.send``。``retry`` 依赖 requests，因此在第一次发送请求时才导入。
+    """
+    from . import retry
+    return retry.send(connection, method, url, **kwargs)
+
+
+def _load_response(response, serializer, connection=None):
+    """
+    使用 ``serializer`` 反序列化响应体，未指定时使用 ``response.json()``。
+    连接上设置了 ``metrics`` 时记录解析耗时。
+    """
+    if not response.content:
+        return None
+    metrics = getattr(connection, 'metrics', None)
+    if metrics is not None:
+        started = time.time()
+    if serializer is None:
+        result = response.json()
+    else:
+        result = serializer.loads(response.content)
+    if metrics is not None:
+        metrics.observe('parse_seconds', time.time() - started)
+    return result
+
+
+def _prepare_body(data, headers, connection):
+    """
+    连接设置了 ``compress_threshold`` 时，压缩不小于该大小的请求体并加上
+    Content-Encoding 头，同时在 ``transfer_stats`` 中记录发送的字节数。
+    """
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    logical = len(data)
+    threshold = getattr(connection, 'compress_threshold', None)
+    if threshold is not None and logical >= threshold:
+        encoding = getattr(connection, 'compression', 'gzip')
+        data = compress(data, encoding)
+        headers = dict(headers, **{'Content-Encoding': encoding})
+    stats = getattr(connection, 'transfer_stats', None)
+    if stats is not None:
+        stats.record_sent(logical, len(data))
+    return data, headers
+
+
+def _record_received(connection, response):
+    stats = getattr(connection, 'transfer_stats', None)
+    if stats is not None:
+        stats.record_received(response)
+
+
+class PreconditionFailed(Exception):
+    """
+    带 ``if_match`` 的写操作因节点已被修改（412）而失败时抛出。``etag`` 和
+    ``value`` 是节点当前的 ETag 和数据，可直接用于重试，无需再读一次。
+    """
+
+    def __init__(self, etag, value):
+        super(PreconditionFailed, self).__init__('ETag mismatch, current ETag is %s' % etag)
+        self.etag = etag
+        self.value = value
 
 
 @http_connection(60)
-def make_get_request(url, params, headers, connection):
+def make_get_request(url, params, headers, connection, serializer=None):
     """
     向指定 wilddog 节点发送一个 GET 请求，超时时间60s。
     `url`: wilddog 节点的全路径。
     `params`: Python dict，作为查询参数附加到URL之后。
     `headers`: Python dict. HTTP 请求头信息。
     `connection`: 预置的连接对象，如未指定默认将由`decorators.http_connection`提供。
+    `serializer`: 用于反序列化响应体，默认使用 ``response.json()``。
     函数的返回值是一个由 JSON 解析器反序列化而来的 Python dict。 不过，当请求的响应状态
     码不是2x或者403时，将会抛出requests.HTTPError
     connection = connection_pool.get_available_connection()
@@ -32,15 +110,17 @@ def make_get_request(url, params, headers, connection):
     response => {'1': 'John Doe', '2': 'Jane Doe'}
     """
     timeout = getattr(connection, 'timeout')
-    response = connection.get(url, params=params, headers=headers, timeout=timeout)
+    response = send(connection, 'GET', url, params=params, headers=headers,
+                    timeout=timeout)
+    _record_received(connection, response)
     if response.ok or response.status_code == 403:
-        return response.json() if response.content else None
+        return _load_response(response, serializer, connection)
     else:
         response.raise_for_status()
 
 
 @http_connection(60)
-def make_put_request(url, data, params, headers, connection):
+def make_put_request(url, data, params, headers, connection, serializer=None):
     """
     向指定 wilddog 节点发送一个 PUT 请求，超时时间60s。
     `url`: wilddog 节点的全路径。
@@ -48,6 +128,7 @@ def make_put_request(url, data, params, headers, connection):
     `params`: Python dict，作为查询参数附加到URL之后。
     `headers`: Python dict. HTTP 请求头信息。
     `connection`: 预置的连接对象，如未指定默认将由`decorators.http_connection`提供。
+    `serializer`: 用于反序列化响应体，默认使用 ``response.json()``。
     函数的返回值是一个由 JSON 解析器反序列化而来的 Python dict。 不过，当请求的响应状态
     码不是2x或者403时，将会抛出requests.HTTPError
     connection = connection_pool.get_available_connection()
@@ -56,17 +137,19 @@ def make_put_request(url, data, params, headers, connection):
                                 {'X_WILDDOG_SOMETHING': 'Hi'}, connection)
     response => {'1': 'Ozgur Vatansever'} or {'error': 'Permission denied.'}
     """
+    data, headers = _prepare_body(data, headers, connection)
     timeout = getattr(connection, 'timeout')
-    response = connection.put(url, data=data, params=params, headers=headers,
-                              timeout=timeout)
+    response = send(connection, 'PUT', url, data=data, params=params, headers=headers,
+                    timeout=timeout)
+    _record_received(connection, response)
     if response.ok or response.status_code == 403:
-        return response.json() if response.content else None
+        return _load_response(response, serializer, connection)
     else:
         response.raise_for_status()
 
 
 @http_connection(60)
-def make_post_request(url, data, params, headers, connection):
+def make_post_request(url, data, params, headers, connection, serializer=None):
     """
     向指定 wilddog 节点发送一个 POST 请求，超时时间60s。
     `url`: wilddog 节点的全路径。
@@ -74,6 +157,7 @@ def make_post_request(url, data, params, headers, connection):
     `params`: Python dict，作为查询参数附加到URL之后。
     `headers`: Python dict. HTTP 请求头信息。
     `connection`:预置的连接对象，如未指定默认将由`decorators.http_connection`提供。
+    `serializer`: 用于反序列化响应体，默认使用 ``response.json()``。
     函数的返回值是一个由 JSON 解析器反序列化而来的 Python dict。 不过，当请求的响应状态
     码不是2x或者403时，将会抛出requests.HTTPError
     connection = connection_pool.get_available_connection()
@@ -81,17 +165,19 @@ def make_post_request(url, data, params, headers, connection):
        '{"Ozgur Vatansever"}', {'X_WILDDOG_SOMETHING': 'Hi'}, connection)
     response => {u'name': u'-Inw6zol_2f5ThHwVcSe'} or {'error': 'Permission denied.'}
     """
+    data, headers = _prepare_body(data, headers, connection)
     timeout = getattr(connection, 'timeout')
-    response = connection.post(url, data=data, params=params, headers=headers,
-                               timeout=timeout)
+    response = send(connection, 'POST', url, data=data, params=params, headers=headers,
+                    timeout=timeout)
+    _record_received(connection, response)
     if response.ok or response.status_code == 403:
-        return response.json() if response.content else None
+        return _load_response(response, serializer, connection)
     else:
         response.raise_for_status()
 
 
 @http_connection(60)
-def make_patch_request(url, data, params, headers, connection):
+def make_patch_request(url, data, params, headers, connection, serializer=None):
     """
     向指定 wilddog 节点发送一个 PATCH 请求，超时时间60s。
     `url`: wilddog 节点的全路径。
@@ -99,6 +185,7 @@ def make_patch_request(url, data, params, headers, connection):
     `params`: Python dict，作为查询参数附加到URL之后。
     `headers`: Python dict. HTTP 请求头信息。
     `connection`:预置的连接对象，如未指定默认将由`decorators.http_connection`提供。
+    `serializer`: 用于反序列化响应体，默认使用 ``response.json()``。
     函数的返回值是一个由 JSON 解析器反序列化而来的 Python dict。 不过，当请求的响应状态
     码不是2x或者403时，将会抛出requests.HTTPError
     connection = connection_pool.get_available_connection()
@@ -106,23 +193,26 @@ def make_patch_request(url, data, params, headers, connection):
        '{"Ozgur Vatansever"}', {'X_WILDDOG_SOMETHING': 'Hi'}, connection)
     response => {'Ozgur Vatansever'} or {'error': 'Permission denied.'}
     """
+    data, headers = _prepare_body(data, headers, connection)
     timeout = getattr(connection, 'timeout')
-    response = connection.patch(url, data=data, params=params, headers=headers,
-                                timeout=timeout)
+    response = send(connection, 'PATCH', url, data=data, params=params, headers=headers,
+                    timeout=timeout)
+    _record_received(connection, response)
     if response.ok or response.status_code == 403:
-        return response.json() if response.content else None
+        return _load_response(response, serializer, connection)
     else:
         response.raise_for_status()
 
 
 @http_connection(60)
-def make_delete_request(url, params, headers, connection):
+def make_delete_request(url, params, headers, connection, serializer=None):
     """
     向指定 wilddog 节点发送一个 DELETE 请求，超时时间60s。
     `url`: wilddog 节点的全路径。
     `params`: Python dict，作为查询参数附加到URL之后。
     `headers`: Python dict. HTTP 请求头信息。
     `connection`:预置的连接对象，如未指定默认将由`decorators.http_connection`提供。
+    `serializer`: 用于反序列化响应体，默认使用 ``response.json()``。
     函数的返回值是一个由 JSON 解析器反序列化而来的 Python dict。不过，当请求的响应状态
     码不是2x或者403时，将会抛出requests.HTTPError
     connection = connection_pool.get_available_connection()
@@ -131,9 +221,57 @@ def make_delete_request(url, params, headers, connection):
     response => NULL or {'error': 'Permission denied.'}
     """
     timeout = getattr(connection, 'timeout')
-    response = connection.delete(url, params=params, headers=headers, timeout=timeout)
+    response = send(connection, 'DELETE', url, params=params, headers=headers,
+                    timeout=timeout)
+    _record_received(connection, response)
+    if response.ok or response.status_code == 403:
+        return _load_response(response, serializer, connection)
+    else:
+        response.raise_for_status()
+
+
+@http_connection(60)
+def make_conditional_get_request(url, params, headers, etag, connection, serializer=None):
+    """
+    与 make_get_request 相同，但返回 (data, etag) 元组。``etag`` 不为 None 时请求将
+    带上 If-None-Match 头，如果节点未被修改，服务端返回 304，此时 data 为 NOT_MODIFIED。
+    response = make_conditional_get_request('http://wilddog.localhost/users', {}, {},
+                                            '"8a2b"', connection)
+    response => (NOT_MODIFIED, '"8a2b"')
+    """
+    if etag is not None:
+        headers = dict(headers, **{'If-None-Match': etag})
+    timeout = getattr(connection, 'timeout')
+    response = send(connection, 'GET', url, params=params, headers=headers,
+                    timeout=timeout)
+    _record_received(connection, response)
+    if response.status_code == 304:
+        return NOT_MODIFIED, etag
+    if response.ok or response.status_code == 403:
+        return (_load_response(response, serializer, connection),
+                response.headers.get('ETag'))
+    else:
+        response.raise_for_status()
+
+
+@http_connection(60)
+def make_conditional_put_request(url, data, params, headers, etag, connection, serializer=None):
+    """
+    带 If-Match 头的 PUT 请求，仅当节点当前的 ETag 与 ``etag`` 一致时才写入，返回值与
+    make_put_request 相同。节点已被修改时服务端返回 412，此时抛出 PreconditionFailed，
+    其中带有节点当前的 ETag 和数据。
+    """
+    headers = dict(headers, **{'If-Match': etag})
+    data, headers = _prepare_body(data, headers, connection)
+    timeout = getattr(connection, 'timeout')
+    response = send(connection, 'PUT', url, data=data, params=params, headers=headers,
+                    timeout=timeout)
+    _record_received(connection, response)
+    if response.status_code == 412:
+        raise PreconditionFailed(response.headers.get('ETag'),
+                                 _load_response(response, serializer, connection))
     if response.ok or response.status_code == 403:
-        return response.json() if response.content else None
+        return _load_response(response, serializer, connection)
     else:
         response.raise_for_status()
 
@@ -155,21 +293,24 @@ class WilddogAuthentication(object):
     封装了 Wilddog SimpleLogin 机制的类。事实上这个类并没有触发任何连接，只是简
     单的模拟了鉴权操作。另外，属性中的 email 和 password 是完全没什么用处的，它
     们永远不会出现在服务端的``auth``变量中
+    生成的 token 由 ``token_cache`` 缓存复用，在过期前会自动重新生成。
     """
 
-    def __init__(self, secret, email, debug=False, admin=False, extra=None):
+    def __init__(self, secret, email, debug=False, admin=False, extra=None,
+                 token_cache=None):
         self.secret = secret
         self.debug = debug
         self.admin = admin
         self.email = email
         self.provider = 'custom'
         self.extra = extra
+        self.token_cache = token_cache or TokenCache()
 
     def get_user(self):
         """
         获取已验证用户信息的方法。返回的用户信息中包含token、email 和 provider
         """
-        token = create_token(self.secret, self.extra, {'admin': self.admin, 'debug': self.debug})
+        token = self.token_cache.get(self.secret, self.extra, self.admin, self.debug)
         user_id = self.extra.get('uid')
         return WilddogUser(self.email, token, self.provider, user_id)
 
@@ -180,8 +321,11 @@ class WilddogApplication(object):
     RESTful 接口规范。数据在两端使用 JSON 格式传输。这个类需要一个 dsn 作为后端通信的
     基础 url。如有必要，authentication 中的 consideration 信息将会在构造 HTTP 请
     求时放入请求的 consideration 中。
-    这里也提供了每种 HTTP 请求方法的异步版本。异步调用利用了 async 模块下定义的on-demand
-    process pool
+    这里也提供了每种 HTTP 请求方法的异步版本。异步调用默认在一个线程池中执行，与同步请求
+    共享同一个连接池，并返回一个 ``concurrent.futures.Future``。通过 ``executor`` 参数
+    可以替换为其他后端，例如 ``ProcessPoolBackend``
+    请求和响应体的 JSON 编解码由 ``serializer`` 完成，默认在安装了 orjson 时使用
+    ``OrjsonSerializer``，否则使用标准库。
     auth = WilddogAuthentication(WILDDOG_SECRET, 'wilddog@wilddog.com', 'fbpw')
     wilddog = WilddogApplication('https://wilddog.localhost', auth)
     That's all there is. Then you start connecting with the backend:
@@ -191,16 +335,110 @@ class WilddogApplication(object):
     Async version is:
     wilddog.get('/users', '1', {'print': 'pretty'}, callback=log_json_dict)
     The callback method is fed with the returning response.
+    同步请求所用的连接取自 ``connection_pool``，keep-alive 连接会在多次请求间复用。
+    下面的 compress_threshold、retry_policy、circuit_breaker、rate_limiter 和 metrics
+    是连接池的设置，传入 ``connection_pool`` 时通过它的 ``configure`` 应用到该连接池上。
+    指定 ``compress_threshold`` 时，不小于该字节数的请求体会以 gzip 压缩后发送，
+    ``connection_pool.transfer_stats`` 记录了压缩前后收发的字节数。
+    ``retry_policy`` 指定失败请求（连接错误、超时、429 和 5xx）的重试策略，默认只重试
+    GET/PUT/DELETE；``circuit_breaker`` 在某个主机连续失败后直接抛出 CircuitOpenError，
+    避免大量线程阻塞在超时上：
+    wilddog = WilddogApplication(dsn, auth, retry_policy=RetryPolicy(attempts=4),
+                                 circuit_breaker=CircuitBreaker())
+    ``timeout`` 是请求的默认超时时间（秒），也可以是 (连接超时, 读取超时) 元组。同步方法都可以
+    通过 ``timeout`` 参数为单次调用指定超时，以及通过 ``deadline`` 参数指定一个 ``Deadline``，
+    它限制了包括重试和批量操作中所有子请求在内的总耗时：
+    wilddog.get('/users', '1', timeout=(3.05, 10))
+    wilddog.get_many(paths, deadline=Deadline(2.5))
+    ``rate_limiter`` 是一个 ``RateLimiter``，按客户端及路径前缀限制每秒的请求数，包括异步
+    请求和重试。使用 ``FileState`` 时，同一主机上的多个进程共享同一份配额：
+    limiter = RateLimiter(50, prefixes={'/logs': 10}, state=FileState('/tmp/wilddog.rate'))
+    wilddog = WilddogApplication(dsn, auth, rate_limiter=limiter)
+    指定 ``wal``（``WriteAheadLog``）时，同步的 put/patch/post/delete 会先写入本地日志再
+    发送。服务端不可达时写操作保存在日志中，方法返回 None，进程重启后仍然保留；连接恢复后
+    的下一次写操作或 ``replay_writes()`` 会按顺序批量重放它们：
+    wilddog = WilddogApplication(dsn, auth, wal=WriteAheadLog('/var/lib/app/wilddog.wal'))
+    wilddog.replay_writes()
+    指定 ``metrics`` 时，每次请求（包括重试）的耗时、状态码、收发字节数，以及鉴权 token 的
+    获取耗时、响应解析耗时、连接池和异步队列的使用情况都会记录在其中，并可以挂载
+    before_send/after_response/on_error 回调：
+    metrics = Metrics()
+    wilddog = WilddogApplication(dsn, auth, metrics=metrics)
+    metrics.snapshot() 或 metrics.to_prometheus()
+    用完后调用 ``close()`` 释放连接，或者直接使用 with 语句：
+    with WilddogApplication('https://wilddog.localhost', auth) as wilddog:
+        wilddog.get('/users', None)
     """
     NAME_EXTENSION = '.json'
     URL_SEPERATOR = '/'
     HEADERS = {'typ': 'JWT', 'alg': 'HS256'}
 
-    def __init__(self, dsn, authentication=None):
+    def __init__(self, dsn, authentication=None, connection_pool=None,
+                 executor=None, cache=None, serializer=None, compress_threshold=None,
+                 retry_policy=None, circuit_breaker=None, timeout=60, rate_limiter=None,
+                 wal=None, metrics=None):
         assert dsn.startswith('https://'), 'DSN must be a secure URL'
         self.token = None
         self.dsn = dsn
         self.authentication = authentication
+        settings = dict((name, value) for name, value in (
+            ('compress_threshold', compress_threshold), ('retry_policy', retry_policy),
+            ('circuit_breaker', circuit_breaker), ('rate_limiter', rate_limiter),
+            ('metrics', metrics)) if value is not None)
+        if connection_pool is None:
+            connection_pool = ConnectionPool(**settings)
+        elif settings:
+            # 传入的连接池也要使用这些设置，而不是忽略它们
+            if not hasattr(connection_pool, 'configure'):
+                raise ValueError("%s can not be applied to this connection pool, "
+                                 "configure the pool instead." % ', '.join(sorted(settings)))
+            connection_pool.configure(**settings)
+        self.connection_pool = connection_pool
+        self.executor = executor or ThreadPoolBackend()
+        self.cache = cache
+        if serializer is None:
+            # 可选的 orjson 在创建第一个客户端时才导入
+            from .jsonutil import get_serializer
+            serializer = get_serializer()
+        self.serializer = serializer
+        self.timeout = timeout
+        self.write_queue = None
+        self._write_queue_lock = threading.Lock()
+        self.wal = wal
+        self._wal_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        # 日志中是否有因服务端不可达而未送达的写操作
+        self._wal_backlog = wal is not None and len(wal) > 0
+        self.metrics = metrics
+        if metrics is not None:
+            self._register_gauges(metrics)
+
+    def _register_gauges(self, metrics):
+        pool_stats = getattr(self.connection_pool, 'stats', None)
+        if pool_stats is not None:
+            metrics.register_gauge('pool_in_use', lambda: pool_stats()['in_use'])
+            metrics.register_gauge('pool_idle', lambda: pool_stats()['idle'])
+        if hasattr(self.executor, 'pending'):
+            metrics.register_gauge('async_pending', lambda: self.executor.pending)
+        metrics.register_gauge('write_queue_pending',
+                               lambda: len(self.write_queue) if self.write_queue is not None else 0)
+
+    def close(self):
+        """
+        发送写队列中剩余的数据，等待异步请求完成，并关闭连接池中所有空闲的 keep-alive 连接。
+        """
+        if self.write_queue is not None:
+            self.write_queue.close()
+        if self.wal is not None:
+            self.wal.close()
+        self.executor.shutdown()
+        self.connection_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def set_token(self, token):
         """
@@ -233,24 +471,133 @@ class WilddogApplication(object):
         如果在构造对象时既未指定 authentication，也未调用 set_token 方法设置 token，那么这个方法什么都不会做。
         """
         if self.authentication:
+            metrics = getattr(self, 'metrics', None)
+            if metrics is not None:
+                started = time.time()
             user = self.authentication.get_user()
+            if metrics is not None:
+                metrics.observe('token_seconds', time.time() - started)
             params.update({'auth': user.wilddog_auth_token})
             headers.update(self.HEADERS)
         elif self.token:
             params.update({'auth': self.token})
             headers.update(self.HEADERS)
 
+    def _invalidate(self, endpoint, future=None):
+        """
+        写操作发出及完成时，使 ``cache`` 中该节点及其祖先、子孙节点的缓存失效。
+        """
+        if self.cache is None:
+            return future
+        self.cache.invalidate(endpoint)
+        if future is not None:
+            future.add_done_callback(lambda f: self.cache.invalidate(endpoint))
+        return future
+
+    def _write_ahead(self, method, path, value, send):
+        """
+        未指定 ``wal`` 时直接调用 ``send``。否则先把写操作记入日志：日志中还有未送达的
+        写操作时，先按顺序重放它们，再发送本次写操作。服务端不可达时本次写操作保留在日志中并
+        返回 None；服务端拒绝时抛出异常。发送时不持有锁。
+        """
+        if self.wal is None or not _split_path(path):
+            return send()
+        from .wal import is_outage
+        # 发送中的写操作不会被其他线程的重放再次发送
+        seq = self.wal.append(method, path, value, in_flight=True)
+        with self._wal_lock:
+            backlog = self._wal_backlog
+        if backlog:
+            try:
+                self.replay_writes(until=seq)
+            except Exception as e:
+                self.wal.release(seq)
+                if not is_outage(e):
+                    raise
+                return None
+        try:
+            result = send()
+        except Exception as e:
+            if is_outage(e):
+                self.wal.release(seq)
+                with self._wal_lock:
+                    self._wal_backlog = True
+                return None
+            self.wal.discard(seq)
+            raise
+        self.wal.discard(seq)
+        return result
+
+    def replay_writes(self, batch_size=500, until=None):
+        """
+        按顺序重放 ``wal`` 中尚未送达的写操作，返回发送的数量。其他线程正在发送的写操作会被
+        跳过；指定 ``until`` 时只重放序号更小的写操作。服务端拒绝的写操作记录在 ``wal.rejected`` 中；遇到服务端不可达时立即
+        停止并抛出异常，该写操作及之后的写操作保留在日志中。
+        """
+        if self.wal is None:
+            return 0
+        from .wal import is_outage, replay
+        with self._replay_lock:
+            with self._wal_lock:
+                self._wal_backlog = False
+            try:
+                return replay(self, self.wal, batch_size, until)
+            except Exception as e:
+                if is_outage(e):
+                    with self._wal_lock:
+                        self._wal_backlog = True
+                raise
+
+    @http_connection(60)
+    def get(self, url, name, params=None, headers=None, connection=None,
+            shallow=False):
+        """
+        同步 GET。如果指定了 ``cache``，会优先从本地缓存中读取。
+        ``shallow`` 为 True 时只返回子节点的 key，子节点的值均为 true。
+        """
+        if name is None: name = ''
+        params = params or {}
+        headers = headers or {}
+        if shallow:
+            params['shallow'] = 'true'
+        endpoint = self._build_endpoint_url(url, name)
+        self._authenticate(params, headers)
+        if self.cache is None:
+            return make_get_request(endpoint, params, headers, connection=connection,
+                                    serializer=self.serializer)
+        key = self.cache.make_key(endpoint, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self.serializer.loads(cached)
+        # 缓存已过期但保存了 ETag 时，发送条件请求，304 则继续使用本地数据
+        stale_body, etag = self.cache.get_stale(key)
+        result, etag = make_conditional_get_request(endpoint, params, headers, etag,
+                                                    connection=connection,
+                                                    serializer=self.serializer)
+        if result is NOT_MODIFIED:
+            self.cache.revalidate(key)
+            return self.serializer.loads(stale_body)
+        # 403 时返回的是错误信息，不应被缓存
+        if not (isinstance(result, dict) and list(result) == ['error']):
+            self.cache.set(key, self.serializer.dumps(result), etag)
+        return result
+
     @http_connection(60)
-    def get(self, url, name, params=None, headers=None, connection=None):
+    def get_with_etag(self, url, name, params=None, headers=None, connection=None):
         """
-        同步 GET。
+        同步 GET，返回 (data, etag)。etag 可用于 put 的 ``if_match`` 参数实现
+        compare-and-set 写入。
+        value, etag = wilddog.get_with_etag('/counters', 'visits')
+        wilddog.put('/counters', 'visits', value + 1, if_match=etag)
         """
         if name is None: name = ''
         params = params or {}
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, name)
         self._authenticate(params, headers)
-        return make_get_request(endpoint, params, headers, connection=connection)
+        return make_conditional_get_request(endpoint, params, headers, None,
+                                            connection=connection,
+                                            serializer=self.serializer)
 
     def get_async(self, url, name, callback=None, params=None, headers=None):
         """
@@ -261,23 +608,127 @@ class WilddogApplication(object):
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, name)
         self._authenticate(params, headers)
-        process_pool.apply_async(make_get_request,
-                                 args=(endpoint, params, headers), callback=callback)
+        return self.executor.submit(partial(make_get_request, serializer=self.serializer,
+                                            timeout=self.timeout),
+                                    (endpoint, params, headers),
+                                    callback=callback,
+                                    connection_pool=self.connection_pool)
+
+    def get_many(self, paths, concurrency=10, params=None, deadline=None):
+        """
+        并发读取多个路径，最多同时进行 ``concurrency`` 个请求，连接取自连接池。
+        返回按 ``paths`` 顺序排列的 {路径: BulkResult}，单个路径出错（如 403/500）
+        只会记录在对应的 ``BulkResult.error`` 中，不会中断其他读取。
+        results = wilddog.get_many(['/users/1', '/users/2'], concurrency=20)
+        results['/users/1'].value => {'name': 'John Doe'}
+        """
+        results = OrderedDict((path, None) for path in paths)
+        for result in iter_reads(self, paths, concurrency, params, deadline):
+            results[result.path] = result
+        return results
+
+    def iter_many(self, paths, concurrency=10, params=None, deadline=None):
+        """
+        与 get_many 相同，但返回一个按完成顺序产出 ``BulkResult`` 的生成器。
+        """
+        return iter_reads(self, paths, concurrency, params, deadline)
+
+    def get_stream(self, url, name=None, params=None, headers=None, leaves=False,
+                   chunk_size=64 * 1024, timeout=None):
+        """
+        流式 GET，适用于非常大的节点。响应体一边下载一边增量解析，内存占用与数据大小无关。
+        默认逐个产出顶层子节点 (key, value)；``leaves`` 为 True 时产出每个叶子节点的
+        (key_path, value)，key_path 是由 key 和数组下标组成的 tuple。
+        for key, user in wilddog.get_stream('/users'):
+            export(key, user)
+        """
+        if name is None: name = ''
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, name)
+        self._authenticate(params, headers)
+        parse = iter_leaves if leaves else iter_items
+        with self.connection_pool.connection(endpoint) as connection:
+            response = send(connection, 'GET', endpoint, params=params, headers=headers,
+                            stream=True, timeout=timeout or self.timeout)
+            try:
+                if not (response.ok or response.status_code == 403):
+                    response.raise_for_status()
+                for item in parse(response.iter_content(chunk_size)):
+                    yield item
+            finally:
+                response.close()
+
+    def iter_children(self, url, page_size=100, order_by='$key', params=None,
+                      prefetch=True):
+        """
+        分页遍历一个大节点的子节点，按 ``order_by`` 排序依次产出 (key, value)。每次只
+        读取 ``page_size`` 个子节点，内存占用与节点大小无关；``prefetch`` 为 True 时，
+        在处理当前页的同时预先读取下一页。
+        for key, event in wilddog.iter_children('/events', page_size=500):
+            handle(event)
+        """
+        return iter_children(self, url, page_size, order_by, params, prefetch)
+
+    def stream(self, url, name=None, params=None):
+        """
+        订阅节点的实时变化（``Accept: text/event-stream``）。返回的 ``Subscription``
+        可以直接迭代，每个 put/patch 事件产出一个 ``StreamEvent``，增量会同步应用到
+        ``subscription.tree`` 上。连接断开时会自动以指数退避重连并重新鉴权。
+        for event in wilddog.stream('/users'):
+            print event.event, event.path, event.data
+        """
+        endpoint = self._build_endpoint_url(url, name)
+        return Subscription(endpoint, self._authenticate, self.connection_pool,
+                            params=params)
+
+    def listen(self, url, callback, name=None, params=None, on_error=None):
+        """
+        与 stream 相同，但在后台线程中消费事件流，每个事件都会调用 ``callback``。
+        调用返回的 ``Subscription`` 的 ``close()`` 方法停止订阅。事件流因无法重试的错误
+        停止时会调用 ``on_error``。
+        """
+        endpoint = self._build_endpoint_url(url, name)
+        return Subscription(endpoint, self._authenticate, self.connection_pool,
+                            callback=callback, params=params, on_error=on_error).start()
+
+    def mirror(self, url, indexes=(), poll_interval=None, timeout=None):
+        """
+        在本地维护节点的一份副本，通过实时事件流（指定 ``poll_interval`` 时为定时轮询）保持
+        同步，并为 ``indexes`` 中的子节点字段建立有序索引，之后的 orderBy/equalTo/startAt/
+        endAt/limitToFirst/limitToLast 查询在本地以二分查找完成，无需访问服务端。
+        users = wilddog.mirror('/users', indexes=['age', 'address/city'], timeout=10)
+        users.query('age', start_at=18, end_at=30, limit_to_first=10)
+        users.query('address/city', equal_to='Beijing')
+        """
+        return Mirror(self, url, indexes, poll_interval).start(timeout)
 
     @http_connection(60)
-    def put(self, url, name, data, params=None, headers=None, connection=None):
+    def put(self, url, name, data, params=None, headers=None, connection=None,
+            if_match=None):
         """
         同步 PUT 请求。这里不会有返回值从服务端过来，因为请求将会使用``silent``
         参数构造。``data``必须是一个 JSON 对象。
+        指定 ``if_match`` 时，仅当节点的 ETag 与之相同时才会写入，否则抛出
+        PreconditionFailed。
         """
         assert name, 'Snapshot name must be specified'
         params = params or {}
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, name)
         self._authenticate(params, headers)
-        data = json.dumps(data, cls=JSONEncoder)
-        return make_put_request(endpoint, data, params, headers,
-                                connection=connection)
+        value, data = data, self.serializer.dumps(data)
+        try:
+            if if_match is not None:
+                return make_conditional_put_request(endpoint, data, params, headers,
+                                                    if_match, connection=connection,
+                                                    serializer=self.serializer)
+            return self._write_ahead('PUT', '%s/%s' % (url.rstrip('/'), name), value,
+                                     lambda: make_put_request(endpoint, data, params, headers,
+                                                              connection=connection,
+                                                              serializer=self.serializer))
+        finally:
+            self._invalidate(endpoint)
 
     def put_async(self, url, name, data, callback=None, params=None, headers=None):
         """
@@ -288,10 +739,13 @@ class WilddogApplication(object):
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, name)
         self._authenticate(params, headers)
-        data = json.dumps(data, cls=JSONEncoder)
-        process_pool.apply_async(make_put_request,
-                                 args=(endpoint, data, params, headers),
-                                 callback=callback)
+        data = self.serializer.dumps(data)
+        future = self.executor.submit(partial(make_put_request, serializer=self.serializer,
+                                             timeout=self.timeout),
+                                     (endpoint, data, params, headers),
+                                     callback=callback,
+                                     connection_pool=self.connection_pool)
+        return self._invalidate(endpoint, future)
 
     @http_connection(60)
     def post(self, url, data, params=None, headers=None, connection=None):
@@ -302,22 +756,46 @@ class WilddogApplication(object):
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, None)
         self._authenticate(params, headers)
-        data = json.dumps(data, cls=JSONEncoder)
-        return make_post_request(endpoint, data, params, headers,
-                                 connection=connection)
+        value, data = data, self.serializer.dumps(data)
+        try:
+            return self._write_ahead('POST', url, value,
+                                     lambda: make_post_request(endpoint, data, params, headers,
+                                                               connection=connection,
+                                                               serializer=self.serializer))
+        finally:
+            self._invalidate(endpoint)
+
+    @http_connection(60)
+    def _post_raw(self, url, data, params=None, headers=None, connection=None):
+        """
+        与 post 相同，但 ``data`` 是已经序列化好的 JSON 字符串，也不经过 ``wal``。
+        """
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, None)
+        self._authenticate(params, headers)
+        try:
+            return make_post_request(endpoint, data, params, headers,
+                                     connection=connection,
+                                     serializer=self.serializer)
+        finally:
+            self._invalidate(endpoint)
 
     def post_async(self, url, data, callback=None, params=None, headers=None):
         """
-        Asynchronous POST request with the process pool.
+        Asynchronous POST request with the executor.
         """
         params = params or {}
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, None)
         self._authenticate(params, headers)
-        data = json.dumps(data, cls=JSONEncoder)
-        process_pool.apply_async(make_post_request,
-                                 args=(endpoint, data, params, headers),
-                                 callback=callback)
+        data = self.serializer.dumps(data)
+        future = self.executor.submit(partial(make_post_request, serializer=self.serializer,
+                                             timeout=self.timeout),
+                                     (endpoint, data, params, headers),
+                                     callback=callback,
+                                     connection_pool=self.connection_pool)
+        return self._invalidate(endpoint, future)
 
     @http_connection(60)
     def patch(self, url, data, params=None, headers=None, connection=None):
@@ -328,22 +806,92 @@ class WilddogApplication(object):
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, None)
         self._authenticate(params, headers)
-        data = json.dumps(data, cls=JSONEncoder)
-        return make_patch_request(endpoint, data, params, headers,
-                                  connection=connection)
+        value, data = data, self.serializer.dumps(data)
+        try:
+            return self._write_ahead('PATCH', url, value,
+                                     lambda: make_patch_request(endpoint, data, params, headers,
+                                                                connection=connection,
+                                                                serializer=self.serializer))
+        finally:
+            self._invalidate(endpoint)
+
+    @http_connection(60)
+    def _patch_raw(self, url, data, params=None, headers=None, connection=None):
+        """
+        与 patch 相同，但 ``data`` 是已经序列化好的 JSON 字符串。
+        """
+        params = params or {}
+        headers = headers or {}
+        endpoint = self._build_endpoint_url(url, None)
+        self._authenticate(params, headers)
+        try:
+            return make_patch_request(endpoint, data, params, headers,
+                                      connection=connection,
+                                      serializer=self.serializer)
+        finally:
+            self._invalidate(endpoint)
+
+    def batch(self, max_body_size=1 << 20, deadline=None):
+        """
+        返回一个 ``WriteBatch``，收集多个路径的写操作，合并成少量的多路径 PATCH 请求。
+        with wilddog.batch() as batch:
+            batch.put('/users/1/name', 'John Doe')
+            batch.delete('/users/2')
+        batch.results => {'/users/1/name': BulkResult(...), '/users/2': BulkResult(...)}
+        """
+        return WriteBatch(self, max_body_size, deadline)
+
+    def update_many(self, updates, max_body_size=1 << 20, deadline=None):
+        """
+        一次写入多个路径。``updates`` 是 {路径: 值} 形式的 dict，返回按路径排列的
+        ``BulkResult``，某个请求失败不会影响其他请求。
+        results = wilddog.update_many({'/users/1/name': 'John', '/users/2/name': 'Jane'})
+        """
+        batch = WriteBatch(self, max_body_size, deadline)
+        for path, value in updates.items():
+            batch.put(path, value)
+        return batch.commit()
 
     def patch_async(self, url, data, callback=None, params=None, headers=None):
         """
-        Asynchronous PATCH request with the process pool.
+        Asynchronous PATCH request with the executor.
         """
         params = params or {}
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, None)
         self._authenticate(params, headers)
-        data = json.dumps(data, cls=JSONEncoder)
-        process_pool.apply_async(make_patch_request,
-                                 args=(endpoint, data, params, headers),
-                                 callback=callback)
+        data = self.serializer.dumps(data)
+        future = self.executor.submit(partial(make_patch_request, serializer=self.serializer,
+                                             timeout=self.timeout),
+                                     (endpoint, data, params, headers),
+                                     callback=callback,
+                                     connection_pool=self.connection_pool)
+        return self._invalidate(endpoint, future)
+
+    def enqueue_write(self, method, url, data=None, timeout=None):
+        """
+        将一个写操作（PUT、PATCH、DELETE 或 POST）放入后台写队列后立即返回，不等待服务端
+        响应。后台线程会合并对同一路径的连续写操作，并以多路径 PATCH 批量发送。队列已满时
+        阻塞，最多等待 ``timeout`` 秒，之后抛出 WriteQueueFull。需要调整队列参数时，可以
+        在第一次调用前设置 ``write_queue``：
+        wilddog.write_queue = WriteQueue(wilddog, max_pending=50000, workers=4)
+        wilddog.enqueue_write('PATCH', '/telemetry/device-1', {'temperature': 21.5})
+        wilddog.flush()
+        """
+        if self.write_queue is None:
+            with self._write_queue_lock:
+                if self.write_queue is None:
+                    self.write_queue = WriteQueue(self)
+        self.write_queue.enqueue(method, url, data, timeout)
+
+    def flush(self, timeout=None):
+        """
+        等待写队列中的所有写操作发送完成并得到响应，超时返回 False。发送失败的写操作记录在
+        ``write_queue.errors`` 中。
+        """
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
 
     @http_connection(60)
     def delete(self, url, name, params=None, headers=None, connection=None):
@@ -355,16 +903,26 @@ class WilddogApplication(object):
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, name)
         self._authenticate(params, headers)
-        return make_delete_request(endpoint, params, headers, connection=connection)
+        try:
+            return self._write_ahead('DELETE', '%s/%s' % (url.rstrip('/'), name), None,
+                                     lambda: make_delete_request(endpoint, params, headers,
+                                                                 connection=connection,
+                                                                 serializer=self.serializer))
+        finally:
+            self._invalidate(endpoint)
 
     def delete_async(self, url, name, callback=None, params=None, headers=None):
         """
-        Asynchronous DELETE request with the process pool.
+        Asynchronous DELETE request with the executor.
         """
         if not name: name = ''
         params = params or {}
         headers = headers or {}
         endpoint = self._build_endpoint_url(url, name)
         self._authenticate(params, headers)
-        process_pool.apply_async(make_delete_request,
-                                 args=(endpoint, params, headers), callback=callback)
+        future = self.executor.submit(partial(make_delete_request, serializer=self.serializer,
+                                             timeout=self.timeout),
+                                     (endpoint, params, headers),
+                                     callback=callback,
+                                     connection_pool=self.connection_pool)
+        return self._invalidate(endpoint, future)
@@ -10,10 +10,13 @@ try:
     basestring
 except NameError:  # Python 3
     basestring = str
-from base64 import urlsafe_b64encode
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+import binascii
 import hashlib
 import hmac
 import sys
+import threading
+from collections import OrderedDict
 
 try:
     import json
@@ -23,7 +26,8 @@ import calendar
 import time
 import datetime
 
-__all__ = ['create_token']
+__all__ = ['create_token', 'TokenSigner', 'verify_token', 'decode_token',
+           'TokenVerifier', 'InvalidTokenError']
 
 TOKEN_VERSION = 0
 TOKEN_SEP = '.'
@@ -65,6 +69,146 @@ def create_token(secret, data, options=None):
     """
     if not isinstance(secret, basestring):
         raise ValueError("wilddog_token_generator.create_token: secret must be a string.")
+    claims = _create_claims(data, options, int(time.time()))
+    return _check_length(_encode_token(secret, claims))
+
+
+class TokenSigner(object):
+    """
+    用同一个超级密钥批量生成token。JWT头部的base64编码和以密钥初始化的HMAC
+    状态只计算一次，之后每个token只复制HMAC状态并签名claims，生成的token与
+    create_token 逐字节相同。
+    signer = TokenSigner(secret)
+    token = signer.create_token({'uid': '1'})
+    tokens = signer.create_tokens([{'uid': '1'}, {'uid': '2'}], {'expires': expires})
+
+    Args:
+        secret - Wilddog App的超级密钥。
+
+    Raises:
+        ValueError
+    """
+
+    def __init__(self, secret):
+        if not isinstance(secret, basestring):
+            raise ValueError("wilddog_token_generator.create_token: secret must be a string.")
+        self._header = _encode_json({'typ': 'JWT', 'alg': 'HS256'}) + TOKEN_SEP
+        self._hmac = hmac.new(_portable_bytes(secret), digestmod=hashlib.sha256)
+
+    def _sign(self, claims):
+        secure_bits = self._header + _encode_json(claims)
+        mac = self._hmac.copy()
+        mac.update(_portable_bytes(secure_bits))
+        return _check_length('%s%s%s' % (secure_bits, TOKEN_SEP, _encode(mac.digest())))
+
+    def create_token(self, data, options=None):
+        """
+        生成一个token，参数含义同 create_token。
+        """
+        return self._sign(_create_claims(data, options, int(time.time())))
+
+    def create_tokens(self, datas, options=None):
+        """
+        为 datas 中的每个json数据生成一个token，共用同一组 options 和同一个
+        颁发时间 "iat"，按顺序返回token列表。
+        """
+        issued_at = int(time.time())
+        return [self._sign(_create_claims(data, options, issued_at)) for data in datas]
+
+
+class InvalidTokenError(ValueError):
+    """
+    token格式错误、签名不符、已过期或尚未生效。
+    """
+
+
+def decode_token(token):
+    """
+    解析token并返回其中的claims，不校验签名和有效期，仅用于查看token内容。
+
+    Raises:
+        InvalidTokenError
+    """
+    return _parse_token(token)[2]
+
+
+def verify_token(secret, token, leeway=0):
+    """
+    校验token的签名（常量时间比较）以及 "exp"、"nbf"，通过后返回claims。
+    leeway 为允许的时钟误差秒数。
+
+    Args:
+        secret - Wilddog App的超级密钥。
+        token - 待校验的token。
+
+    Returns:
+        token中的claims，用户数据在 "d" 中。
+
+    Raises:
+        InvalidTokenError
+    """
+    return TokenVerifier(secret, cache_size=0, leeway=leeway).verify_token(token)
+
+
+class TokenVerifier(object):
+    """
+    用同一个超级密钥反复校验token。以签名为key缓存最多 cache_size 个已校验过的
+    token（LRU），同一个token再次校验时跳过HMAC计算和JSON解析，只检查是否过期。
+    cache_size 为0时不缓存。
+    verifier = TokenVerifier(secret)
+    claims = verifier.verify_token(token)
+    """
+
+    def __init__(self, secret, cache_size=1024, leeway=0):
+        if not isinstance(secret, basestring):
+            raise ValueError("wilddog_token_generator.verify_token: secret must be a string.")
+        self.cache_size = cache_size
+        self.leeway = leeway
+        self._hmac = hmac.new(_portable_bytes(secret), digestmod=hashlib.sha256)
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify_token(self, token):
+        """
+        校验token，返回其中的claims。
+
+        Raises:
+            InvalidTokenError
+        """
+        now = time.time()
+        signature = token.rpartition(TOKEN_SEP)[2] if isinstance(token, basestring) else None
+        if self.cache_size and signature:
+            with self._lock:
+                entry = self._verified.pop(signature, None)
+                if entry is not None and entry[0] == token:
+                    self._check_expiry(entry[1], now)
+                    self._verified[signature] = entry
+                    return dict(entry[1])
+        signing_input, digest, claims = _parse_token(token)
+        mac = self._hmac.copy()
+        mac.update(_portable_bytes(signing_input))
+        if not _compare_digest(mac.digest(), digest):
+            raise InvalidTokenError("wilddog_token_generator.verify_token: signature mismatch.")
+        self._check_expiry(claims, now)
+        if 'nbf' in claims and claims['nbf'] > now + self.leeway:
+            raise InvalidTokenError("wilddog_token_generator.verify_token: token is not valid yet.")
+        if self.cache_size:
+            with self._lock:
+                self._verified[signature] = (token, claims)
+                while len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        return dict(claims)
+
+    def _check_expiry(self, claims, now):
+        if 'exp' in claims and claims['exp'] <= now - self.leeway:
+            raise InvalidTokenError("wilddog_token_generator.verify_token: token has expired.")
+
+    def clear(self):
+        with self._lock:
+            self._verified.clear()
+
+
+def _create_claims(data, options, issued_at):
     if not options and not data:
         raise ValueError(
             "wilddog_token_generator.create_token: data is empty and no options are set.  This token will have no effect on Wilddog.");
@@ -74,10 +218,12 @@ def create_token(secret, data, options=None):
     _validate_data(data, is_admin_token)
     claims = _create_options_claims(options)
     claims['v'] = TOKEN_VERSION
-    claims['iat'] = int(time.time())
+    claims['iat'] = issued_at
     claims['d'] = data
+    return claims
 
-    token = _encode_token(secret, claims)
+
+def _check_length(token):
     if len(token) > 1024:
         raise RuntimeError("wilddog_token_generator.create_token: generated token is too long.")
     return token
@@ -121,14 +267,52 @@ def _encode_json(obj):
     return _encode(bytearray(json.dumps(obj, separators=(',', ':')), 'utf-8'))
 
 
+def _portable_bytes(s):
+    try:
+        return bytes(s, 'utf-8')
+    except TypeError:
+        return bytes(s)
+
+
 def _sign(secret, to_sign):
-    def portable_bytes(s):
-        try:
-            return bytes(s, 'utf-8')
-        except TypeError:
-            return bytes(s)
+    return _encode(hmac.new(_portable_bytes(secret), _portable_bytes(to_sign), hashlib.sha256).digest())
+
+
+def _decode(text):
+    return urlsafe_b64decode(str(text) + '=' * (-len(text) % 4))
+
+
+def _parse_token(token):
+    """
+    拆分token，返回 (被签名的部分, 签名, claims)。
+    """
+    if not isinstance(token, basestring) or token.count(TOKEN_SEP) != 2:
+        raise InvalidTokenError("wilddog_token_generator.verify_token: token must have three segments.")
+    signing_input, _, signature = token.rpartition(TOKEN_SEP)
+    header, _, claims = signing_input.partition(TOKEN_SEP)
+    try:
+        header = json.loads(_decode(header).decode('utf-8'))
+        claims = json.loads(_decode(claims).decode('utf-8'))
+        digest = _decode(signature)
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise InvalidTokenError("wilddog_token_generator.verify_token: malformed token.")
+    if not isinstance(header, dict) or header.get('alg') != 'HS256':
+        raise InvalidTokenError("wilddog_token_generator.verify_token: unsupported algorithm.")
+    if not isinstance(claims, dict):
+        raise InvalidTokenError("wilddog_token_generator.verify_token: malformed token.")
+    return signing_input, digest, claims
+
 
-    return _encode(hmac.new(portable_bytes(secret), portable_bytes(to_sign), hashlib.sha256).digest())
+def _compare_digest(a, b):
+    if hasattr(hmac, 'compare_digest'):
+        return hmac.compare_digest(a, b)
+    # Python < 2.7.7
+    if len(a) != len(b):
+        return False
+    result = 0
+    for x, y in zip(bytearray(a), bytearray(b)):
+        result |= x ^ y
+    return result == 0
 
 
 def _encode_token(secret, claims):
@@ -0,0 +1,302 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from .bulk import BulkResult, WriteBatch, _split_path
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['WriteQueue', 'WriteQueueFull']
+
+METHODS = ('PUT', 'PATCH', 'DELETE', 'POST')
+
+
+class WriteQueueFull(Exception):
+    """
+    Raised by ``WriteQueue.enqueue`` when the queue stays full.
+    """
+
+
+def _coalesce(ops):
+    """
+    Folds consecutive writes to the same path into one: a PUT or DELETE
+    replaces what came before it, a PATCH is merged into a preceding PATCH
+    or into the object of a preceding PUT.
+    """
+    merged = []
+    for op in ops:
+        method, path, data = op
+        if merged and merged[-1][1] == path and 'POST' not in (method, merged[-1][0]):
+            last_method, _, last_data = merged[-1]
+            if method in ('PUT', 'DELETE'):
+                merged[-1] = op
+                continue
+            if last_method == 'PATCH':
+                # Overwritten keys move to the end, after any multi-path
+                # key written in between.
+                value = dict((k, v) for k, v in last_data.items() if k not in data)
+                value.update(data)
+                merged[-1] = ('PATCH', path, value)
+                continue
+            if (last_method == 'PUT' and isinstance(last_data, dict) and
+                    not any('/' in key for key in data)):
+                value = dict(last_data, **data)
+                merged[-1] = ('PUT', path, dict((k, v) for k, v in value.items() if v is not None))
+                continue
+        merged.append(op)
+    return merged
+
+
+def _coalesce_counted(ops):
+    """
+    Like ``_coalesce``, but also returns how many of ``ops`` each of the
+    merged writes stands for.
+    """
+    merged, counts = [], []
+    for op in ops:
+        folded = _coalesce(merged[-1:] + [op])
+        if merged and len(folded) == 1:
+            merged[-1] = folded[0]
+            counts[-1] += 1
+        else:
+            merged.append(op)
+            counts.append(1)
+    return merged, counts
+
+
+def _written_paths(method, path, data):
+    if method == 'PATCH':
+        return ['/' + '/'.join(_split_path('%s/%s' % (path, key))) for key in data]
+    return [path]
+
+
+class WriteQueue(object):
+    """
+    Fire-and-forget writes. ``enqueue`` appends a write to a bounded
+    in-memory queue and returns at once; ``workers`` background threads
+    drain it, coalesce consecutive writes to the same path and send
+    everything but POSTs as multi-location PATCH requests. A worker sends
+    when ``batch_size`` writes are waiting or ``flush_interval`` seconds
+    after the first of them arrived. Writes are spread over the workers by
+    their top-level node, so writes under the same node keep their order.
+    Writes to the root, which may span several top-level nodes, go through
+    a single ordering point instead: they are sent once every write queued
+    before them has been answered, and writes queued after them wait for
+    them. ``sent`` counts the writes the server accepted.
+
+    At most ``max_pending`` writes may be queued or in flight; beyond that
+    ``enqueue`` blocks (up to ``timeout``) or, without `block`, raises
+    ``WriteQueueFull``. Failed writes are handed to ``on_error`` as a
+    ``BulkResult`` and kept in ``errors``.
+    """
+
+    def __init__(self, app, max_pending=10000, workers=2, batch_size=500,
+                 flush_interval=0.05, block=True, on_error=None):
+        if workers < 1:
+            raise ValueError("workers must be a positive integer.")
+        self.app = app
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block = block
+        self.on_error = on_error
+        self.errors = deque(maxlen=1000)
+        self.sent = 0
+        self._shards = [deque() for _ in range(workers)]
+        # writes to the root, ordered against every shard by sequence number
+        self._global = deque()
+        self._seq = 0
+        self._busy = 0
+        self._pending = 0
+        self._flushing = 0
+        self._closed = False
+        self._threads = None
+        self._cond = threading.Condition(threading.Lock())
+
+    def _start(self):
+        self._threads = []
+        for shard in self._shards:
+            thread = threading.Thread(target=self._run, args=(shard,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def enqueue(self, method, url, data=None, timeout=None):
+        """
+        Queues a ``method`` (PUT, PATCH, DELETE or POST) of ``data`` to
+        ``url``.
+        """
+        method = method.upper()
+        if method not in METHODS:
+            raise ValueError("method must be one of %s." % ', '.join(METHODS))
+        parts = _split_path(url)
+        if not parts and method in ('PUT', 'DELETE'):
+            raise ValueError("the root node can not be written through the write queue.")
+        if method == 'PATCH' and not isinstance(data, dict):
+            raise ValueError("PATCH data must be a dict.")
+        if parts:
+            shard = self._shards[hash(parts[0]) % len(self._shards)]
+        else:
+            shard = self._global
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write queue is closed.")
+            deadline = None if timeout is None else time.time() + timeout
+            while self._pending >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.time()
+                if not self.block or (remaining is not None and remaining <= 0):
+                    raise WriteQueueFull("%d writes pending." % self._pending)
+                self._cond.wait(remaining)
+            if self._threads is None:
+                self._start()
+            self._seq += 1
+            shard.append((self._seq, method, '/' + '/'.join(parts), data))
+            self._pending += 1
+            self._cond.notify_all()
+
+    def _barrier(self):
+        return self._global[0][0] if self._global else None
+
+    def _take_global(self):
+        """
+        Returns the writes to the root that are due: every write queued
+        before them has been answered. Called with ``_cond`` held.
+        """
+        barrier = self._barrier()
+        if barrier is None or self._busy:
+            return None
+        heads = [shard[0][0] for shard in self._shards if shard]
+        if heads and min(heads) < barrier:
+            return None
+        limit = min(heads) if heads else self._seq + 1
+        ops = []
+        while self._global and self._global[0][0] < limit and len(ops) < self.batch_size:
+            ops.append(self._global.popleft())
+        return ops
+
+    def _take(self, shard):
+        with self._cond:
+            while True:
+                ops = self._take_global()
+                if ops:
+                    self._busy += 1
+                    return ops
+                barrier = self._barrier()
+                if shard and (barrier is None or shard[0][0] < barrier):
+                    break
+                if self._closed and not shard and not self._global:
+                    return None
+                self._cond.wait()
+            # Give more writes a chance to arrive and be sent together.
+            deadline = time.time() + self.flush_interval
+            while len(shard) < self.batch_size and not self._closed and not self._flushing:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            # Writes queued after a write to the root wait for it.
+            barrier = self._barrier()
+            ops = []
+            while shard and len(ops) < self.batch_size and (barrier is None or shard[0][0] < barrier):
+                ops.append(shard.popleft())
+            self._busy += 1
+            return ops
+
+    def _run(self, shard):
+        while True:
+            ops = self._take(shard)
+            if ops is None:
+                return
+            ops = [op[1:] for op in ops]
+            failed = len(ops)
+            try:
+                failed = self._send(ops)
+            except Exception as e:
+                # e.g. a value the serializer rejects; the worker keeps going
+                for method, path, data in ops:
+                    self._fail(path, data, e)
+            finally:
+                with self._cond:
+                    self._busy -= 1
+                    self._pending -= len(ops)
+                    self.sent += len(ops) - failed
+                    self._cond.notify_all()
+
+    def _fail(self, path, value, error):
+        result = BulkResult(path, value, error)
+        self.errors.append(result)
+        if self.on_error is not None:
+            try:
+                self.on_error(result)
+            except Exception:
+                logger.exception('on_error callback failed for %s', path)
+
+    def _commit(self, batch, errors):
+        for result in batch.commit().values():
+            if result.error is not None:
+                errors.add(result.path)
+                self._fail(result.path, None, result.error)
+
+    def _send(self, ops):
+        """
+        Coalesces and sends ``ops`` and returns how many of them failed.
+        """
+        ops, counts = _coalesce_counted(ops)
+        batch = WriteBatch(self.app)
+        errors = set()
+        failed = 0
+        for (method, path, data), count in zip(ops, counts):
+            if method == 'POST':
+                # Keys of pushed children are made by the server, so a POST
+                # goes on its own, after the writes queued before it.
+                if len(batch):
+                    self._commit(batch, errors)
+                try:
+                    self.app.post(path, data)
+                except Exception as e:
+                    failed += count
+                    self._fail(path, data, e)
+            elif method == 'PATCH':
+                batch.update(path, data)
+            else:
+                batch.put(path, data)
+        if len(batch):
+            self._commit(batch, errors)
+        for (method, path, data), count in zip(ops, counts):
+            if method != 'POST' and errors.intersection(_written_paths(method, path, data)):
+                failed += count
+        return failed
+
+    def __len__(self):
+        return self._pending
+
+    def flush(self, timeout=None):
+        """
+        Sends the queued writes right away and waits until the queue is
+        empty and every write has been answered. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._pending:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout=None):
+        """
+        Flushes the queue and stops the workers.
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads or ():
+            thread.join(timeout)